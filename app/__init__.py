@@ -4,7 +4,6 @@ from flask_login import LoginManager
 from flask_mail import Mail
 from flask_migrate import Migrate  # 👈 Habilitado para migraciones
 import os
-from flask import send_file
 from authlib.integrations.flask_client import OAuth
 
 db = SQLAlchemy()
@@ -37,6 +36,22 @@ def create_app(config_class='config.Config'):
         client_kwargs={'scope': 'openid email profile'}
     )
     
+    # Conteo y tiempo de las consultas SQL por petición y log de consultas lentas
+    from app.services.monitor_consultas_service import monitor_consultas
+    monitor_consultas.init_app(app)
+    
+    # Métricas de Prometheus por endpoint y del pool de conexiones en /metrics
+    from app.services.metricas_service import metricas_service
+    metricas_service.init_app(app)
+    
+    # Contadores del dashboard en caché, invalidados al confirmar cambios en sus modelos
+    from app.services.tablero_service import tablero_service
+    tablero_service.init_app(app)
+    
+    # Tarjetas del foro y categorías del filtro en caché
+    from app.services.foro_service import foro_service
+    foro_service.init_app(app)
+    
     # Configurar user_loader
     from app.models.usuario import Usuario
     from app.models.mensaje import Mensaje
@@ -45,87 +60,25 @@ def create_app(config_class='config.Config'):
     def load_user(user_id):
         return Usuario.query.get(int(user_id))
     
-    # Ruta para servir imágenes de canchas
+    # Rutas para servir los archivos subidos: URL con la versión del contenido (url_subida),
+    # 304 con ETag y, según ARCHIVOS_ENVIO, entrega por nginx/X-Sendfile
+    from app.services.archivos_service import archivos_service
+    archivos_service.init_app(app)
+
     @app.route('/uploads/canchas/<filename>')
     def servir_imagen_cancha(filename):
-        """Servir imágenes de canchas desde la carpeta uploads"""
-        try:
-            # Construir la ruta completa al archivo
-            uploads_dir = os.path.join(app.root_path, 'static', 'uploads', 'canchas')
-            file_path = os.path.join(uploads_dir, filename)
-            
-            # Verificar que el archivo existe
-            if os.path.exists(file_path):
-                return send_file(file_path)
-            else:
-                # Si no existe, devolver imagen por defecto
-                default_image = os.path.join(app.root_path, 'static', 'images', 'default-cancha.jpg')
-                if os.path.exists(default_image):
-                    return send_file(default_image)
-                else:
-                    # Si no hay imagen por defecto, devolver 404
-                    return 'Imagen no encontrada', 404
-                    
-        except Exception as e:
-            # En caso de error, devolver imagen por defecto
-            try:
-                default_image = os.path.join(app.root_path, 'static', 'images', 'default-cancha.jpg')
-                if os.path.exists(default_image):
-                    return send_file(default_image)
-            except:
-                pass
-            return 'Error al cargar imagen', 500
+        """Servir imágenes de canchas desde la carpeta uploads (la imagen por defecto si no existe)"""
+        return archivos_service.enviar_subida('canchas', filename, por_defecto='images/default-cancha.jpg')
     
-    # Ruta para servir imágenes de perfil de usuarios
     @app.route('/uploads/perfiles/<filename>')
     def servir_imagen_perfil(filename):
-        """Servir imágenes de perfil de usuarios desde la carpeta uploads"""
-        try:
-            # Construir la ruta completa al archivo
-            uploads_dir = os.path.join(app.root_path, 'static', 'uploads', 'perfiles')
-            file_path = os.path.join(uploads_dir, filename)
-            
-            # Verificar que el archivo existe
-            if os.path.exists(file_path):
-                return send_file(file_path)
-            else:
-                # Si no existe, devolver imagen por defecto
-                default_image = os.path.join(app.root_path, 'static', 'images', 'default-user.png')
-                if os.path.exists(default_image):
-                    return send_file(default_image)
-                else:
-                    # Si no hay imagen por defecto, devolver 404
-                    return 'Imagen no encontrada', 404
-                    
-        except Exception as e:
-            # En caso de error, devolver imagen por defecto
-            try:
-                default_image = os.path.join(app.root_path, 'static', 'images', 'default-user.png')
-                if os.path.exists(default_image):
-                    return send_file(default_image)
-            except:
-                pass
-            return 'Error al cargar imagen', 500
+        """Servir imágenes de perfil de usuarios desde la carpeta uploads (la imagen por defecto si no existe)"""
+        return archivos_service.enviar_subida('perfiles', filename, por_defecto='images/default-user.png')
     
-    # Ruta para servir imágenes y videos del foro
     @app.route('/uploads/foro/<path:filename>')
     def servir_multimedia_foro(filename):
         """Servir imágenes y videos del foro desde la carpeta uploads"""
-        try:
-            # Construir la ruta completa al archivo
-            uploads_dir = os.path.join(app.root_path, 'static', 'uploads', 'foro')
-            file_path = os.path.join(uploads_dir, filename)
-            
-            # Verificar que el archivo existe
-            if os.path.exists(file_path):
-                return send_file(file_path)
-            else:
-                # Si no existe, devolver 404
-                return 'Archivo no encontrado', 404
-                    
-        except Exception as e:
-            app.logger.error(f"Error sirviendo archivo del foro '{filename}': {e}")
-            return 'Error al cargar archivo', 500
+        return archivos_service.enviar_subida('foro', filename)
     
     # Registrar blueprints
     from app.routes.main_routes import main_bp
@@ -144,18 +97,9 @@ def create_app(config_class='config.Config'):
     if hasattr(config_class, 'init_app'):
         config_class.init_app(app)
     
-    # Inicializar servicios
-    from app.services.notificacion_service import notificacion_service
-    from app.services.recordatorio_service import recordatorio_service
-    
-    # Inicializar recordatorios automáticamente
-    with app.app_context():
-        try:
-            recordatorio_service.programar_recordatorios_existentes()
-            recordatorio_service.limpiar_recordatorios_antiguos()
-            print("✅ Sistema de recordatorios automáticos inicializado")
-        except Exception as e:
-            print(f"⚠️ Error inicializando recordatorios: {e}")
+    # Servicios de background (notificaciones, planificador): sin hilos ni consultas al crear la app
+    from app.services.servicios_background import servicios_background
+    servicios_background.init_app(app)
     
     return app
     
\ No newline at end of file
@@ -5,6 +5,7 @@ from app.forms.auth_forms import LoginForm, RegistroForm, RecuperarPasswordForm,
 from app.models import Usuario, Rol
 from app import db, oauth
 from app.utils.auth_utils import generate_reset_token, verify_reset_token, send_password_reset_email
+from app.services.imagen_service import imagen_service
 from werkzeug.security import generate_password_hash, check_password_hash
 import requests
 
@@ -109,6 +110,7 @@ def google_callback():
                     with open(save_path, 'wb') as f:
                         f.write(response.content)
                     user.FotoPerfil = filename
+                    imagen_service.encolar(filename)
         except Exception as e:
             current_app.logger.warning(f"No se pudo guardar la foto de Google: {e}")
         try:
@@ -131,6 +133,7 @@ def google_callback():
                 with open(save_path, 'wb') as f:
                     f.write(response.content)
                 user.FotoPerfil = filename
+                imagen_service.encolar(filename)
                 db.session.commit()
         except Exception as e:
             current_app.logger.warning(f"No se pudo actualizar la foto de Google del usuario existente: {e}")
@@ -10,7 +10,13 @@ from .comentario import Comentario
 from .imagen import Imagen
 from .post import Post, Like, ComentarioForo
 from .notificacion import Notificacion
+from .bloqueo_reserva import BloqueoReserva
+from .bloqueo_planificador import BloqueoPlanificador
+from .resumen_reserva import ResumenReservaDiario, ResumenReservaHorario
+from .trabajo_reporte import TrabajoReporte
 
 
 __all__ = ['Usuario', 'Rol', 'Cancha', 'Categoria', 'TipoCancha', 'Reserva', 
-           'Horario', 'Pago', 'Comentario', 'Imagen', 'Post', 'Like', 'ComentarioForo', 'Notificacion']
+           'Horario', 'Pago', 'Comentario', 'Imagen', 'Post', 'Like', 'ComentarioForo', 'Notificacion',
+           'BloqueoReserva', 'BloqueoPlanificador', 'ResumenReservaDiario', 'ResumenReservaHorario',
+           'TrabajoReporte']
@@ -0,0 +1,15 @@
+from app import db
+
+class BloqueoPlanificador(db.Model):
+    """Lease del proceso que ejecuta las tareas programadas.
+
+    Todos los procesos de la app comparten el job store de APScheduler, pero solo
+    el que tiene esta fila vigente (``ExpiraEn`` en el futuro) ejecuta las tareas;
+    la renueva periódicamente y, si se cae, otro proceso la toma al expirar.
+    """
+    __tablename__ = 'BloqueosPlanificador'
+    
+    Id = db.Column(db.Integer, primary_key=True)
+    Nombre = db.Column(db.String(50), nullable=False, unique=True)
+    Propietario = db.Column(db.String(100), nullable=True)
+    ExpiraEn = db.Column(db.DateTime, nullable=True)
@@ -0,0 +1,17 @@
+from app import db
+
+class BloqueoReserva(db.Model):
+    """Fila de bloqueo por cancha y fecha.
+
+    Toda reserva de una cancha en una fecha actualiza primero esta fila, lo que
+    serializa las reservas que compiten por la misma cancha/fecha (bloqueo de fila
+    en MySQL, bloqueo de escritura en SQLite) sin afectar a otras canchas.
+    """
+    __tablename__ = 'BloqueosReserva'
+    
+    Id = db.Column(db.Integer, primary_key=True)
+    CanchaId = db.Column(db.Integer, db.ForeignKey('Canchas.Id'), nullable=False)
+    Fecha = db.Column(db.Date, nullable=False)
+    Version = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (db.UniqueConstraint('CanchaId', 'Fecha', name='unique_bloqueo_cancha_fecha'),)
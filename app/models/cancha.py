@@ -28,3 +28,6 @@ class Cancha(db.Model):
 
     # RELACIÓN CORREGIDA CON RESERVAS
     reservas = db.relationship("Reserva", back_populates="cancha", lazy=True)
+
+    # Conteo calculado en la consulta del listado (perfil 'canchas_admin'); None si no se pidió
+    reservas_confirmadas = db.query_expression()
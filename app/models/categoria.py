@@ -14,6 +14,9 @@ class Categoria(db.Model):
     # Relación sin backref para evitar conflictos
     canchas = db.relationship('Cancha', backref='categoria_rel', overlaps="categoria")
 
+    # Conteo calculado en la consulta del listado (perfil 'categorias_admin'); None si no se pidió
+    total_canchas = db.query_expression()
+
 def __str__(self):
     return self.Nombre
 
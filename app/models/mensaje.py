@@ -3,6 +3,11 @@ from datetime import datetime
 
 class Mensaje(db.Model):
     __tablename__ = 'mensajes'
+    __table_args__ = (
+        # Conversaciones por usuario (último mensaje, historial ordenado) y no leídos
+        db.Index('idx_mensajes_usuario_fecha_leido', 'UsuarioId', 'FechaEnvio', 'Leido'),
+        db.Index('idx_mensajes_leido_usuario', 'Leido', 'UsuarioId'),
+    )
     
     Id = db.Column(db.Integer, primary_key=True)
     UsuarioId = db.Column(db.Integer, db.ForeignKey('Usuarios.Id'), nullable=False)
@@ -3,18 +3,26 @@ from app import db
 
 class Notificacion(db.Model):
     __tablename__ = 'notificaciones'
+    __table_args__ = (
+        db.Index('idx_notificaciones_estado_id', 'estado', 'id'),
+        # Conteo de pendientes con intentos disponibles y purga de enviadas/fallidas antiguas
+        db.Index('idx_notificaciones_estado_intentos', 'estado', 'intentos'),
+        db.Index('idx_notificaciones_estado_fecha_creacion', 'estado', 'fecha_creacion'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('Usuarios.Id'), nullable=False)
     tipo = db.Column(db.String(50), nullable=False)  # 'email', 'push', 'sms', 'in_app'
     titulo = db.Column(db.String(200), nullable=False)
     mensaje = db.Column(db.Text, nullable=False)
-    estado = db.Column(db.String(20), default='pendiente')  # 'pendiente', 'enviado', 'fallido'
+    estado = db.Column(db.String(20), default='pendiente')  # 'pendiente', 'procesando', 'enviado', 'fallido'
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
     fecha_envio = db.Column(db.DateTime, nullable=True)
     intentos = db.Column(db.Integer, default=0)
     max_intentos = db.Column(db.Integer, default=3)
     datos_adicionales = db.Column(db.JSON, nullable=True)
+    lote = db.Column(db.String(32), nullable=True, index=True)  # Token del worker que la reclamó
+    fecha_reclamo = db.Column(db.DateTime, nullable=True)
     
     # Relaciones
     usuario = db.relationship('Usuario', backref='notificaciones')
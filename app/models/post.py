@@ -3,6 +3,15 @@ from datetime import datetime
 
 class Post(db.Model):
     __tablename__ = 'posts'
+    __table_args__ = (
+        # Listados paginados por cursor: gestión del foro (todos), foro (activos) y foro por categoría
+        db.Index('idx_posts_fecha_creacion', 'FechaCreacion'),
+        db.Index('idx_posts_estado_fecha_creacion', 'Estado', 'FechaCreacion'),
+        db.Index('idx_posts_categoria_estado_fecha_creacion', 'Categoria', 'Estado', 'FechaCreacion'),
+        # Orden "popular" del foro (activos, y activos por categoría)
+        db.Index('idx_posts_estado_total_likes', 'Estado', 'TotalLikes'),
+        db.Index('idx_posts_categoria_estado_total_likes', 'Categoria', 'Estado', 'TotalLikes'),
+    )
     
     Id = db.Column(db.Integer, primary_key=True)
     Titulo = db.Column(db.String(200), nullable=False)
@@ -14,6 +23,9 @@ class Post(db.Model):
     UsuarioId = db.Column(db.Integer, db.ForeignKey('Usuarios.Id'), nullable=False)
     Categoria = db.Column(db.String(50), default='General')  # General, Deportes, Eventos, etc.
     Estado = db.Column(db.String(20), default='Activo')  # Activo, Eliminado
+    # Contadores mantenidos por foro_service con incrementos atómicos (comentarios: solo los activos)
+    TotalLikes = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    TotalComentarios = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relaciones
     usuario = db.relationship('Usuario', backref='posts')
@@ -22,14 +34,20 @@ class Post(db.Model):
     
     @property
     def total_likes(self):
-        return len(self.likes)
+        return self.TotalLikes or 0
     
     @property
     def total_comentarios(self):
-        return len(self.comentarios)
+        return self.TotalComentarios or 0
     
     def is_liked_by(self, usuario_id):
-        return any(like.UsuarioId == usuario_id for like in self.likes)
+        # Los posts de un listado traen la respuesta de foro_service.marcar_likes (una consulta para todos)
+        marcados = getattr(self, '_likes_usuario', {})
+        if usuario_id in marcados:
+            return marcados[usuario_id]
+        return db.session.query(
+            Like.query.filter_by(UsuarioId=usuario_id, PostId=self.Id).exists()
+        ).scalar()
     
     @property
     def tiene_multimedia(self):
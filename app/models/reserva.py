@@ -14,6 +14,23 @@ class Reserva(db.Model):
     Estado = db.Column(db.String(20), default='Confirmada')  # Confirmada, Cancelada, Completada
     FechaCreacion = db.Column(db.DateTime, default=datetime.utcnow)
     Observaciones = db.Column(db.Text)
+    # Precio vigente al reservar: los cambios posteriores de precio de la cancha no alteran los ingresos
+    PrecioHora = db.Column(db.Numeric(10, 2), nullable=True)
+    PrecioTotal = db.Column(db.Numeric(12, 2), nullable=True)
+    # Momento en que el barrido de recordatorios envió cada recordatorio (NULL = pendiente)
+    Recordatorio24hEnviadoEn = db.Column(db.DateTime, nullable=True)
+    Recordatorio2hEnviadoEn = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_reservas_fecha_hora_estado', 'Fecha', 'HoraInicio', 'Estado'),
+        db.Index('idx_reservas_fecha_estado_precio', 'Fecha', 'Estado', 'PrecioTotal'),
+        # Cruces de horario, disponibilidad y ocupación por cancha
+        db.Index('idx_reservas_cancha_fecha_estado', 'CanchaId', 'Fecha', 'Estado'),
+        # Reservas de un usuario (mis reservas, reservas activas al eliminar la cuenta)
+        db.Index('idx_reservas_usuario_fecha', 'UsuarioId', 'Fecha'),
+        # Últimas reservas creadas (reportes) y reconstrucción de resúmenes
+        db.Index('idx_reservas_fecha_creacion', 'FechaCreacion'),
+    )
 
     # Relaciones correctas
     usuario = db.relationship('Usuario', backref='reservas')
@@ -26,7 +43,15 @@ class Reserva(db.Model):
         duracion = fin - inicio
         return duracion.total_seconds() / 3600
 
+    def fijar_precio(self, precio_hora):
+        """Guarda el precio por hora vigente y el total de la reserva"""
+        self.PrecioHora = precio_hora
+        total = Decimal(str(precio_hora)) * Decimal(str(self.duracion_horas))
+        self.PrecioTotal = total.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
     @property
     def precio_total(self):
+        if self.PrecioTotal is not None:
+            return self.PrecioTotal
         total = self.cancha.PrecioHora * Decimal(str(self.duracion_horas))
         return total.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
@@ -0,0 +1,45 @@
+from app import db
+
+class ResumenReservaDiario(db.Model):
+    """Acumulados de reservas por cancha y día, para las estadísticas de administración.
+
+    Reservas, Canceladas, HorasReservadas e Ingresos se acumulan en el día jugado
+    (``Reserva.Fecha``); Creadas, en el día en que se hizo la reserva. Horas e
+    ingresos solo cuentan reservas confirmadas. Se actualiza en la misma
+    transacción que crea, confirma o cancela la reserva (``reserva_service``) y se
+    reconstruye con ``reconstruir_resumenes.py``.
+    """
+    __tablename__ = 'ResumenReservasDiario'
+    
+    Id = db.Column(db.Integer, primary_key=True)
+    CanchaId = db.Column(db.Integer, db.ForeignKey('Canchas.Id'), nullable=False)
+    Fecha = db.Column(db.Date, nullable=False)
+    Reservas = db.Column(db.Integer, nullable=False, default=0)
+    Canceladas = db.Column(db.Integer, nullable=False, default=0)
+    Creadas = db.Column(db.Integer, nullable=False, default=0)
+    HorasReservadas = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    Ingresos = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('CanchaId', 'Fecha', name='unique_resumen_diario_cancha_fecha'),
+        db.Index('idx_resumen_diario_fecha', 'Fecha'),
+    )
+
+
+class ResumenReservaHorario(db.Model):
+    """Acumulados de reservas por cancha, día y hora de inicio (heatmap semanal)"""
+    __tablename__ = 'ResumenReservasHorario'
+    
+    Id = db.Column(db.Integer, primary_key=True)
+    CanchaId = db.Column(db.Integer, db.ForeignKey('Canchas.Id'), nullable=False)
+    Fecha = db.Column(db.Date, nullable=False)
+    Hora = db.Column(db.Integer, nullable=False)
+    Reservas = db.Column(db.Integer, nullable=False, default=0)
+    Canceladas = db.Column(db.Integer, nullable=False, default=0)
+    HorasReservadas = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    Ingresos = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('CanchaId', 'Fecha', 'Hora', name='unique_resumen_horario_cancha_fecha_hora'),
+        db.Index('idx_resumen_horario_fecha', 'Fecha'),
+    )
@@ -9,6 +9,9 @@ class TipoCancha(db.Model):
     
     # Relación sin backref para evitar conflictos
     canchas = db.relationship('Cancha', backref='tipo_cancha_rel', overlaps="tipo_cancha")
+
+    # Conteo calculado en la consulta del listado (perfil 'tipos_cancha_admin'); None si no se pidió
+    total_canchas = db.query_expression()
     
 def __str__(self):
     return self.Nombre
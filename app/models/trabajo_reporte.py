@@ -0,0 +1,36 @@
+from datetime import datetime
+from app import db
+
+class TrabajoReporte(db.Model):
+    """Generación en background de un reporte descargable.
+
+    ``Clave`` es el hash del tipo de reporte y de su HTML: hay una sola fila
+    por clave, así que peticiones con los mismos datos comparten el mismo trabajo
+    y el mismo archivo mientras no venza (``ExpiraEn``).
+    """
+    __tablename__ = 'TrabajosReporte'
+    __table_args__ = (
+        db.Index('idx_trabajos_reporte_estado_id', 'Estado', 'Id'),
+        db.Index('idx_trabajos_reporte_expira', 'ExpiraEn'),
+    )
+    
+    Id = db.Column(db.Integer, primary_key=True)
+    Clave = db.Column(db.String(64), nullable=False, unique=True)
+    Tipo = db.Column(db.String(50), nullable=False)
+    Parametros = db.Column(db.JSON, nullable=True)
+    Estado = db.Column(db.String(20), nullable=False, default='pendiente')  # 'pendiente', 'procesando', 'listo', 'fallido'
+    Archivo = db.Column(db.String(255), nullable=True)
+    NombreDescarga = db.Column(db.String(255), nullable=True)
+    Error = db.Column(db.Text, nullable=True)
+    SolicitadoPor = db.Column(db.Integer, db.ForeignKey('Usuarios.Id'), nullable=True)
+    FechaCreacion = db.Column(db.DateTime, default=datetime.utcnow)
+    FechaReclamo = db.Column(db.DateTime, nullable=True)
+    FechaFin = db.Column(db.DateTime, nullable=True)
+    ExpiraEn = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<TrabajoReporte {self.Tipo} {self.Estado}>'
+    
+    @property
+    def vencido(self):
+        return self.ExpiraEn is not None and self.ExpiraEn < datetime.utcnow()
@@ -1,6 +1,5 @@
 from urllib import response
 from flask import render_template, make_response
-from xhtml2pdf import pisa
 import io
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_file
 from flask_login import login_required, current_user
@@ -10,14 +9,17 @@ from werkzeug.utils import secure_filename
 from sqlalchemy import func
 import os
 from app import db
-from app.models import Usuario, Cancha, Reserva, Categoria, TipoCancha, Rol
+from app.models import Usuario, Cancha, Reserva, Categoria, TipoCancha, Rol, TrabajoReporte
 from app.auth.decorators import admin_required
 from sqlalchemy import func, extract
-from app.utils.pdf_utils import generar_pdf
-from app.utils.generar_excel import generar_excel_usuarios
 from app.models.mensaje import Mensaje
 from app.utils.filters import format_currency
 from app.models import Post, Like, ComentarioForo
+from app.services.ocupacion_service import occupancy_index
+from app.services.reserva_service import reserva_service, ConflictoReservaError
+from app.services.imagen_service import imagen_service
+from app.utils.paginacion import paginar, quiere_json, respuesta_pagina
+from app.utils.perfiles_consulta import con_perfil
 
 
 
@@ -38,69 +40,15 @@ def agregar_cabeceras_no_cache(response):
 @login_required
 @admin_required
 def dashboard():
-    # Métricas principales
-    total_canchas = Cancha.query.count()
-    total_reservas = Reserva.query.count()
-    total_usuarios = Usuario.query.count()
-    reservas_hoy = Reserva.query.filter(Reserva.Fecha == datetime.now().date()).count()
-
-    # Estadísticas del foro
-    total_posts_foro = Post.query.count()
-    total_comentarios_foro = ComentarioForo.query.count()
-    total_likes_foro = Like.query.count()
-    
-    # Posts pendientes (ocultos + eliminados)
-    posts_ocultos = Post.query.filter_by(Estado='Oculto').count()
-    posts_eliminados = Post.query.filter_by(Estado='Eliminado').count()
-    posts_pendientes_foro = posts_ocultos + posts_eliminados
-
-    # Últimas 5 reservas
-    ultimas_reservas = Reserva.query.order_by(Reserva.FechaCreacion.desc()).limit(5).all()
-
-    # 🔹 Cálculo de canchas populares con reservas, ingresos y ocupación
-    canchas_populares = db.session.query(
-        Cancha.Nombre.label('Nombre'),
-        func.count(Reserva.Id).label('total_reservas'),
-        func.sum(Cancha.PrecioHora).label('ingresos'),
-        (func.count(Reserva.Id) * 100 / func.sum(func.count(Reserva.Id)).over()).label('ocupacion')
-    ).join(Reserva).group_by(Cancha.Id).order_by(
-        func.count(Reserva.Id).desc()
-    ).limit(5).all()
-
-    # Actividad reciente (ejemplo: últimas 5 reservas confirmadas)
-    actividades = db.session.query(
-        Reserva.Id.label('id'),
-        Usuario.Nombre.label('usuario'),
-        Cancha.Nombre.label('cancha'),
-        Reserva.Estado.label('estado'),
-        Reserva.FechaCreacion.label('fecha')
-    ).join(Usuario).join(Cancha).order_by(Reserva.FechaCreacion.desc()).limit(5).all()
-
-    # Ingresos totales
-    ingresos_totales = db.session.query(
-        func.coalesce(func.sum(Cancha.PrecioHora), 0)
-    ).join(Reserva).scalar()
-
-    response = make_response(render_template(
-    'admin/dashboard.html',
-    total_canchas=total_canchas,
-    total_reservas=total_reservas,
-    total_usuarios=total_usuarios,
-    reservas_hoy=reservas_hoy,
-    ultimas_reservas=ultimas_reservas,
-    canchas_populares=canchas_populares,
-    actividades=actividades,
-    ingresos_totales=ingresos_totales,
-    format_currency=format_currency,
-    total_posts_foro=total_posts_foro,
-    total_comentarios_foro=total_comentarios_foro,
-    total_likes_foro=total_likes_foro,
-    posts_pendientes_foro=posts_pendientes_foro
-))
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
-    return response
+    from app.services.tablero_service import tablero_service
+
+    # Contadores, canchas populares y últimas reservas desde la instantánea en caché;
+    # las cabeceras no-cache las pone agregar_cabeceras_no_cache para todo el panel
+    return render_template(
+        'admin/dashboard.html',
+        format_currency=format_currency,
+        **tablero_service.instantanea()
+    )
 
 
 @admin_bp.route('/reportes')
@@ -141,7 +89,7 @@ def canchas():
     tipo_filter = request.args.get('tipo', type=int)
 
 
-    query = Cancha.query
+    query = con_perfil(Cancha.query, 'canchas_admin')
 
     if nombre_filter:
         query = query.filter(Cancha.Nombre.ilike(f"%{nombre_filter}%"))
@@ -199,6 +147,7 @@ def nueva_cancha():
                 ruta_guardado = os.path.join(ruta_directorio, filename)
                 imagen.save(ruta_guardado)
                 cancha.Imagen = f'uploads/canchas/{filename}'
+                imagen_service.encolar(cancha.Imagen)
 
             db.session.add(cancha)
             db.session.commit()
@@ -260,6 +209,7 @@ def editar_cancha(cancha_id):
                 ruta_guardado = os.path.join(ruta_directorio, filename)
                 imagen.save(ruta_guardado)
                 cancha.Imagen = f'uploads/canchas/{filename}'
+                imagen_service.encolar(cancha.Imagen)
 
             db.session.commit()
             flash('Cancha actualizada exitosamente', 'success')
@@ -330,7 +280,7 @@ def reservas():
     cancha_filter = request.args.get('cancha', '', type=str)
     fecha_filter = request.args.get('fecha', '', type=str)
 
-    query = Reserva.query.join(Usuario).join(Cancha)
+    query = con_perfil(Reserva.query.join(Usuario).join(Cancha), 'reservas_admin')
 
     if cliente_filter:
         query = query.filter(Usuario.Nombre.ilike(f"%{cliente_filter}%"))
@@ -343,25 +293,17 @@ def reservas():
         except ValueError:
             pass
 
-    reservas = query.order_by(Reserva.FechaCreacion.desc()).all()
-    canchas = [c.Nombre for c in Cancha.query.order_by(Cancha.Nombre).all()]
+    pagina = paginar(query, [Reserva.FechaCreacion.desc(), Reserva.Id.desc()], cursor=request.args.get('cursor'))
+    if quiere_json():
+        return respuesta_pagina(pagina, 'admin/_filas_reservas.html', reservas=pagina.elementos,
+                                format_currency=format_currency)
 
-    # Debug: imprimir información de las reservas y usuarios
-    print(f"DEBUG ADMIN RESERVAS - Total reservas: {len(reservas)}")
-    if reservas:
-        for i, reserva in enumerate(reservas[:3]):  # Solo las primeras 3 para debug
-            print(f"DEBUG ADMIN RESERVAS - Reserva {i+1}:")
-            print(f"  - ID: {reserva.Id}")
-            print(f"  - Usuario ID: {reserva.usuario.Id}")
-            print(f"  - Usuario Nombre: {reserva.usuario.Nombre}")
-            print(f"  - Usuario FotoPerfil: {reserva.usuario.FotoPerfil}")
-            print(f"  - Usuario Email: {reserva.usuario.Email}")
-            print(f"  - Cancha: {reserva.cancha.Nombre}")
-            print(f"  - Fecha: {reserva.Fecha}")
+    canchas = [c.Nombre for c in Cancha.query.order_by(Cancha.Nombre).all()]
 
     response = make_response(render_template(
         'admin/reservas.html',
-        reservas=reservas,
+        reservas=pagina.elementos,
+        pagina=pagina,
         canchas=canchas,
         cliente_filter=cliente_filter,
         cancha_filter=cancha_filter,
@@ -380,8 +322,8 @@ def cancelar_reserva(reserva_id):
     reserva = Reserva.query.get_or_404(reserva_id)
     try:
         # Cambiar estado a cancelada
-        reserva.Estado = 'Cancelada'
-        db.session.commit()
+        reserva_service.cancelar_reserva(reserva)
+        occupancy_index.liberar_reserva(reserva)
         
         # Enviar notificación de cancelación por email
         try:
@@ -390,10 +332,6 @@ def cancelar_reserva(reserva_id):
             # Crear notificación de cancelación
             notificacion_service.notificar_cancelacion_reserva(reserva.Id)
             
-            # Cancelar recordatorios automáticos
-            from app.services.recordatorio_service import recordatorio_service
-            recordatorio_service.cancelar_recordatorios_reserva(reserva.Id)
-            
             flash('Reserva cancelada exitosamente y cliente notificado por email', 'success')
             
         except Exception as e:
@@ -417,9 +355,9 @@ def cancelar_reserva(reserva_id):
 def confirmar_reserva(reserva_id):
     reserva = Reserva.query.get_or_404(reserva_id)
     try:
-        # Cambiar estado a confirmada
-        reserva.Estado = 'Confirmada'
-        db.session.commit()
+        # Cambiar estado a confirmada (verificando que no se cruce con otra reserva)
+        reserva_service.confirmar_reserva(reserva)
+        occupancy_index.registrar_reserva(reserva)
         
         # Enviar notificación de confirmación por email
         try:
@@ -428,16 +366,14 @@ def confirmar_reserva(reserva_id):
             # Crear notificación de confirmación
             notificacion_service.notificar_reserva_confirmada(reserva.Id)
             
-            # Programar recordatorios automáticos
-            from app.services.recordatorio_service import recordatorio_service
-            recordatorio_service.programar_recordatorios_reserva(reserva.Id)
-            
             flash('Reserva confirmada exitosamente y cliente notificado por email', 'success')
             
         except Exception as e:
             # Si falla la notificación, no fallar la confirmación
             flash(f'Reserva confirmada exitosamente, pero error al enviar notificación: {str(e)}', 'warning')
             
+    except ConflictoReservaError:
+        flash('No se puede confirmar: la cancha ya tiene otra reserva confirmada en ese horario', 'error')
     except Exception as e:
         db.session.rollback()
         flash(f'Error al confirmar reserva: {str(e)}', 'error')
@@ -465,7 +401,7 @@ def usuarios():
     email_filter = request.args.get('email', '', type=str)
     estado_filter = request.args.get('estado', '', type=str)
 
-    query = Usuario.query.join(Rol)
+    query = con_perfil(Usuario.query.join(Rol), 'usuarios_admin')
     if nombre_filter:
         query = query.filter(Usuario.Nombre.ilike(f"%{nombre_filter}%"))
     if email_filter:
@@ -475,11 +411,16 @@ def usuarios():
     elif estado_filter == 'inactivo':
         query = query.filter(Usuario.Estado == False)
 
-    usuarios = query.order_by(Usuario.FechaRegistro.desc()).all()
+    # Más recientes primero por Id (crece con el registro): FechaRegistro la pone la base
+    # de datos sin microsegundos y muchos usuarios comparten el mismo valor
+    pagina = paginar(query, [Usuario.Id.desc()], cursor=request.args.get('cursor'))
+    if quiere_json():
+        return respuesta_pagina(pagina, 'admin/_filas_usuarios.html', usuarios=pagina.elementos)
 
     response = make_response(render_template(
         'admin/usuarios.html',
-        usuarios=usuarios,
+        usuarios=pagina.elementos,
+        pagina=pagina,
         nombre_filter=nombre_filter,
         email_filter=email_filter,
         estado_filter=estado_filter
@@ -614,7 +555,7 @@ def cambiar_estado_usuario(usuario_id):
 @admin_required
 def ver_usuario(usuario_id):
     usuario = Usuario.query.get_or_404(usuario_id)
-    reservas_usuario = Reserva.query.filter_by(
+    reservas_usuario = con_perfil(Reserva.query, 'reservas_usuario').filter_by(
         UsuarioId=usuario_id
     ).order_by(Reserva.FechaCreacion.desc()).all()
     return render_template('admin/ver_usuario.html', usuario=usuario, reservas=reservas_usuario, format_currency=format_currency)
@@ -623,30 +564,20 @@ def ver_usuario(usuario_id):
 @login_required
 @admin_required
 def exportar_usuarios_pdf():
-    from datetime import datetime
-    import os
-    usuarios = Usuario.query.all()
-    total_usuarios = len(usuarios)
-    usuarios_activos = sum(1 for u in usuarios if u.Estado)
-    fecha_generacion = datetime.now().strftime('%d/%m/%Y')
-    # Ruta absoluta para el logo
-    logo_path = os.path.join(current_app.root_path, 'static', 'images', 'logo.png')
-    # Renderizamos la plantilla de usuarios para PDF
-    html = render_template(
-        'admin/usuarios_pdf.html',
-        usuarios=usuarios,
-        total_usuarios=total_usuarios,
-        usuarios_=usuarios_activos,
-        fecha_generacion=fecha_generacion,
-        logo_path=logo_path
-    )
-    return generar_pdf(html, filename="usuarios_registrados.pdf")
+    return _solicitar_reporte_pdf('usuarios_pdf')
 
 @admin_bp.route('/admin/usuarios/excel')
 @login_required
 @admin_required
 def exportar_usuarios_excel():
-    usuarios = Usuario.query.all()
+    from app.utils.generar_excel import generar_excel_usuarios
+    usuarios = db.session.execute(
+        db.select(Usuario.Id, Usuario.Nombre, Usuario.Email, Usuario.Telefono, Rol.Nombre.label('Rol'))
+        # outerjoin: los usuarios cuyo rol ya no existe también se exportan (como 'Sin rol')
+        .outerjoin(Rol, Usuario.RolId == Rol.Id)
+        .order_by(Usuario.Id)
+        .execution_options(yield_per=1000)
+    )
     return generar_excel_usuarios(usuarios)
 
 # ---------------------- CRUD CATEGORIAS ----------------------
@@ -654,7 +585,7 @@ def exportar_usuarios_excel():
 @login_required
 @admin_required
 def categorias():
-    categorias = Categoria.query.all()
+    categorias = con_perfil(Categoria.query, 'categorias_admin').all()
     return render_template('admin/categorias.html', categorias=categorias)
 
 @admin_bp.route('/categoria/nueva', methods=['GET', 'POST'])
@@ -722,551 +653,80 @@ def eliminar_categoria(categoria_id):
 @login_required
 @admin_required
 def exportar_categorias_pdf():
-    from datetime import datetime
-    import os
-    categorias = Categoria.query.all()
-    total_categorias = len(categorias)
-    categorias_con_canchas = sum(1 for c in categorias if c.canchas and len(c.canchas) > 0)
-    fecha_generacion = datetime.now().strftime('%d/%m/%Y')
-    # Ruta absoluta para el logo
-    logo_path = os.path.join(current_app.root_path, 'static', 'images', 'logo.png')
-    # Renderizamos la plantilla de categorías para PDF
-    html = render_template(
-        'admin/categorias_pdf.html',
-        categorias=categorias,
-        total_categorias=total_categorias,
-        categorias_con_canchas=categorias_con_canchas,
-        fecha_generacion=fecha_generacion,
-        logo_path=logo_path
-    )
-    return generar_pdf(html, filename="categorias_registradas.pdf")
+    return _solicitar_reporte_pdf('categorias_pdf')
 
 @admin_bp.route('/reportes/exportar/pdf')
 @login_required
 @admin_required
 def exportar_reportes_pdf():
-    from datetime import datetime
-    import os
-    from sqlalchemy import extract
-    
-    # Obtener todos los tipos de filtros
-    filtro_rapido = request.args.get('filtro_rapido')
-    filtro_dia = request.args.get('filtro_dia')
-    filtro_mes = request.args.get('filtro_mes')
-    filtro_año = request.args.get('filtro_año')
-    fecha_inicio = request.args.get('inicio')
-    fecha_fin = request.args.get('fin')
-    
-    # Usar EXACTAMENTE la misma lógica que la API de estadísticas
-    hoy = datetime.now().date()
-    
-    query_reservas = Reserva.query
-    
-    # Aplicar filtros según prioridad (misma lógica que la API)
-    if filtro_rapido:
-        # Filtros rápidos
-        if filtro_rapido == 'hoy':
-            query_reservas = query_reservas.filter(Reserva.Fecha == hoy)
-        elif filtro_rapido == 'ayer':
-            ayer = hoy - timedelta(days=1)
-            query_reservas = query_reservas.filter(Reserva.Fecha == ayer)
-        elif filtro_rapido == 'semana':
-            inicio_semana = hoy - timedelta(days=hoy.weekday())
-            fin_semana = inicio_semana + timedelta(days=6)
-            query_reservas = query_reservas.filter(
-                Reserva.Fecha >= inicio_semana,
-                Reserva.Fecha <= fin_semana
-            )
-        elif filtro_rapido == 'mes':
-            inicio_mes = hoy.replace(day=1)
-            fin_mes = (inicio_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            query_reservas = query_reservas.filter(
-                Reserva.Fecha >= inicio_mes,
-                Reserva.Fecha <= fin_mes
-            )
-        elif filtro_rapido == 'trimestre':
-            trimestre = (hoy.month - 1) // 3
-            inicio_trimestre = hoy.replace(month=trimestre * 3 + 1, day=1)
-            fin_trimestre = (inicio_trimestre + timedelta(days=93)).replace(day=1) - timedelta(days=1)
-            query_reservas = query_reservas.filter(
-                Reserva.Fecha >= inicio_trimestre,
-                Reserva.Fecha <= fin_trimestre
-            )
-        elif filtro_rapido == 'año':
-            inicio_año = hoy.replace(month=1, day=1)
-            fin_año = hoy.replace(month=12, day=31)
-            query_reservas = query_reservas.filter(
-                Reserva.Fecha >= inicio_año,
-                Reserva.Fecha <= fin_año
-            )
-    elif filtro_dia:
-        # Filtro por día específico
-        query_reservas = query_reservas.filter(Reserva.Fecha == filtro_dia)
-    elif filtro_mes:
-        # Filtro por mes específico
-        año, mes = filtro_mes.split('-')
-        query_reservas = query_reservas.filter(
-            extract('year', Reserva.Fecha) == int(año),
-            extract('month', Reserva.Fecha) == int(mes)
-        )
-    elif filtro_año:
-        # Filtro por año específico
-        query_reservas = query_reservas.filter(extract('year', Reserva.Fecha) == int(filtro_año))
-    elif fecha_inicio and fecha_fin:
-        # Filtro por rango personalizado
-        query_reservas = query_reservas.filter(
-            Reserva.Fecha >= fecha_inicio,
-            Reserva.Fecha <= fecha_fin
-        )
-    
-    # --- Totales ---
-    total_usuarios = Usuario.query.count()
-    total_canchas = Cancha.query.count()
-    total_reservas = query_reservas.count()
-    reservas_hoy = (
-        db.session.query(func.count(Reserva.Id))
-        .filter(func.date(Reserva.FechaCreacion) == hoy)
-        .scalar()
-    )
-    
-    # --- Reservas por mes + ingresos (EXACTO como la API) ---
-    reservas_por_mes = []
-    ingresos_por_mes = []
-    meses_labels = []
-    for mes in range(1, 13):
-        count_mes = query_reservas.filter(extract('month', Reserva.Fecha) == mes).count()
-        ingresos_mes = (
-            db.session.query(func.coalesce(func.sum(Cancha.PrecioHora), 0))
-            .join(Reserva, Reserva.CanchaId == Cancha.Id)
-            .filter(extract('month', Reserva.Fecha) == mes)
-        )
-        if fecha_inicio and fecha_fin:
-            ingresos_mes = ingresos_mes.filter(
-                Reserva.Fecha >= fecha_inicio,
-                Reserva.Fecha <= fecha_fin
-            )
-        ingresos_mes = ingresos_mes.scalar() or 0
+    parametros = {
+        clave: request.args[clave]
+        for clave in ('filtro_rapido', 'filtro_dia', 'filtro_mes', 'filtro_año', 'inicio', 'fin')
+        if request.args.get(clave)
+    }
+    # Los filtros relativos (hoy, semana, ...) cambian con la fecha
+    parametros['fecha'] = date.today().isoformat()
+    return _solicitar_reporte_pdf('reportes_pdf', parametros)
 
-        reservas_por_mes.append(count_mes)
-        ingresos_por_mes.append(float(ingresos_mes))
-        meses_labels.append(datetime(2025, mes, 1).strftime('%b'))  # Usar %b como la API
-    
-    # --- Ocupación por cancha (EXACTO como la API) ---
-    canchas_populares_query = (
-        db.session.query(
-            Cancha.Nombre.label('nombre'),
-            func.count(Reserva.Id).label('total_reservas'),
-            func.coalesce(func.sum(Cancha.PrecioHora), 0).label('ingresos')
-        )
-        .join(Reserva, Cancha.Id == Reserva.CanchaId)
-        .group_by(Cancha.Id)
-        .order_by(func.count(Reserva.Id).desc())
-        .limit(5)
-        .all()
-    )
-    
-    ocupacion_labels = []
-    ocupacion_values = []
-    for c in canchas_populares_query:
-        ocupacion_labels.append(c.nombre)
-        ocupacion_porcentaje = round((c.total_reservas / max(1, total_reservas)) * 100, 2)
-        ocupacion_values.append(ocupacion_porcentaje)
-    
-    # --- Heatmap semanal (EXACTO como la API) ---
-    reservas_semana = Reserva.query.filter(
-        Reserva.Fecha >= hoy - timedelta(days=6),
-        Reserva.Fecha <= hoy
-    ).all()
-
-    heatmap = []
-    for day in range(7):  
-        for hour in range(24):
-            heatmap.append({"x": hour, "y": day, "v": 0})
-    for r in reservas_semana:
-        day_index = r.Fecha.weekday()  # lunes=0
-        hour_index = r.HoraInicio.hour
-        idx = day_index * 24 + hour_index
-        heatmap[idx]["v"] += 1
-    
-    fecha_generacion = datetime.now().strftime('%d/%m/%Y')
-    logo_path = os.path.join(current_app.root_path, 'static', 'images', 'logo.png')
-    
-    html = render_template(
-        'admin/reportes_pdf.html',
-        total_usuarios=total_usuarios,
-        total_canchas=total_canchas,
-        total_reservas=total_reservas,
-        reservas_hoy=reservas_hoy,
-        meses=meses_labels,
-        reservas_por_mes=reservas_por_mes,
-        ingresos_por_mes=ingresos_por_mes,
-        ocupacion_labels=ocupacion_labels,
-        ocupacion_values=ocupacion_values,
-        heatmap=heatmap,
-        fecha_generacion=fecha_generacion,
-        logo_path=logo_path,
-        fecha_inicio=fecha_inicio,
-        fecha_fin=fecha_fin
+def _solicitar_reporte_pdf(tipo, parametros=None):
+    """Encola (o reutiliza) el trabajo del reporte y muestra su avance, o lo descarga si ya está listo"""
+    from app.services.trabajo_reporte_service import trabajo_reporte_service
+
+    trabajo = trabajo_reporte_service.solicitar(tipo, parametros, usuario_id=current_user.Id)
+    if trabajo.Estado == 'listo':
+        return redirect(url_for('admin.descargar_trabajo_reporte', trabajo_id=trabajo.Id))
+    return render_template('admin/trabajo_reporte.html', trabajo=trabajo)
+
+@admin_bp.route('/reportes/trabajos/<int:trabajo_id>')
+@login_required
+@admin_required
+def estado_trabajo_reporte(trabajo_id):
+    """Estado de un trabajo de reporte para la página de espera"""
+    trabajo = TrabajoReporte.query.get_or_404(trabajo_id)
+    return jsonify({
+        'id': trabajo.Id,
+        'estado': trabajo.Estado,
+        'error': trabajo.Error,
+        'url_descarga': url_for('admin.descargar_trabajo_reporte', trabajo_id=trabajo.Id)
+        if trabajo.Estado == 'listo' else None
+    })
+
+@admin_bp.route('/reportes/trabajos/<int:trabajo_id>/descargar')
+@login_required
+@admin_required
+def descargar_trabajo_reporte(trabajo_id):
+    from app.services.trabajo_reporte_service import trabajo_reporte_service
+
+    trabajo = TrabajoReporte.query.get_or_404(trabajo_id)
+    if trabajo.Estado != 'listo' or not trabajo_reporte_service.vigente(trabajo):
+        # Vencido o todavía en proceso: se vuelve a pedir con los mismos parámetros
+        trabajo = trabajo_reporte_service.solicitar(trabajo.Tipo, trabajo.Parametros, usuario_id=current_user.Id)
+        if trabajo.Estado != 'listo':
+            return render_template('admin/trabajo_reporte.html', trabajo=trabajo)
+    return send_file(
+        trabajo_reporte_service.ruta(trabajo),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=trabajo.NombreDescarga
     )
-    return generar_pdf(html, filename="reportes_generales.pdf")
 
 @admin_bp.route('/reportes/exportar/excel')
 @login_required
 @admin_required
 def exportar_reportes_excel():
-    from datetime import datetime
-    import os
-    from sqlalchemy import extract
-    import pandas as pd
-    from io import BytesIO
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils.dataframe import dataframe_to_rows
-    from openpyxl.worksheet.dimensions import ColumnDimension
-    from openpyxl.worksheet.worksheet import Worksheet
-    
-    # Obtener todos los tipos de filtros
-    filtro_rapido = request.args.get('filtro_rapido')
-    filtro_dia = request.args.get('filtro_dia')
-    filtro_mes = request.args.get('filtro_mes')
-    filtro_año = request.args.get('filtro_año')
-    fecha_inicio = request.args.get('inicio')
-    fecha_fin = request.args.get('fin')
-    
-    # Usar EXACTAMENTE la misma lógica que la API de estadísticas
-    hoy = datetime.now().date()
-    
-    query_reservas = Reserva.query
-    
-    # Aplicar filtros según prioridad (misma lógica que la API)
-    if filtro_rapido:
-        # Filtros rápidos
-        if filtro_rapido == 'hoy':
-            query_reservas = query_reservas.filter(Reserva.Fecha == hoy)
-        elif filtro_rapido == 'ayer':
-            ayer = hoy - timedelta(days=1)
-            query_reservas = query_reservas.filter(Reserva.Fecha == ayer)
-        elif filtro_rapido == 'semana':
-            inicio_semana = hoy - timedelta(days=hoy.weekday())
-            fin_semana = inicio_semana + timedelta(days=6)
-            query_reservas = query_reservas.filter(
-                Reserva.Fecha >= inicio_semana,
-                Reserva.Fecha <= fin_semana
-            )
-        elif filtro_rapido == 'mes':
-            inicio_mes = hoy.replace(day=1)
-            fin_mes = (inicio_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            query_reservas = query_reservas.filter(
-                Reserva.Fecha >= inicio_mes,
-                Reserva.Fecha <= fin_mes
-            )
-        elif filtro_rapido == 'trimestre':
-            trimestre = (hoy.month - 1) // 3
-            inicio_trimestre = hoy.replace(month=trimestre * 3 + 1, day=1)
-            fin_trimestre = (inicio_trimestre + timedelta(days=93)).replace(day=1) - timedelta(days=1)
-            query_reservas = query_reservas.filter(
-                Reserva.Fecha >= inicio_trimestre,
-                Reserva.Fecha <= fin_trimestre
-            )
-        elif filtro_rapido == 'año':
-            inicio_año = hoy.replace(month=1, day=1)
-            fin_año = hoy.replace(month=12, day=31)
-            query_reservas = query_reservas.filter(
-                Reserva.Fecha >= inicio_año,
-                Reserva.Fecha <= fin_año
-            )
-    elif filtro_dia:
-        # Filtro por día específico
-        query_reservas = query_reservas.filter(Reserva.Fecha == filtro_dia)
-    elif filtro_mes:
-        # Filtro por mes específico
-        año, mes = filtro_mes.split('-')
-        query_reservas = query_reservas.filter(
-            extract('year', Reserva.Fecha) == int(año),
-            extract('month', Reserva.Fecha) == int(mes)
-        )
-    elif filtro_año:
-        # Filtro por año específico
-        query_reservas = query_reservas.filter(extract('year', Reserva.Fecha) == int(filtro_año))
-    elif fecha_inicio and fecha_fin:
-        # Filtro por rango personalizado
-        query_reservas = query_reservas.filter(
-            Reserva.Fecha >= fecha_inicio,
-            Reserva.Fecha <= fecha_fin
-        )
-    
-    # Obtener datos para Excel
-    reservas_data = []
-    for reserva in query_reservas.join(Usuario).join(Cancha).all():
-        reservas_data.append({
-            'ID': reserva.Id,
-            'Usuario': reserva.usuario.Nombre,
-            'Cancha': reserva.cancha.Nombre,
-            'Fecha': reserva.Fecha.strftime('%d/%m/%Y'),
-            'Hora Inicio': reserva.HoraInicio.strftime('%H:%M'),
-            'Hora Fin': reserva.HoraFin.strftime('%H:%M'),
-            'Duración (horas)': reserva.duracion_horas,
-            'Estado': reserva.Estado,
-            'Precio Total': float(reserva.precio_total),
-            'Fecha Creación': reserva.FechaCreacion.strftime('%d/%m/%Y %H:%M')
-        })
-    
-    # Crear archivo Excel con openpyxl para mejor control del diseño
-    wb = Workbook()
-    
-    # Eliminar hoja por defecto
-    wb.remove(wb.active)
-    
-    # ==================== HOJA DE RESERVAS ====================
-    ws_reservas = wb.create_sheet("Reservas")
-    
-    # Definir estilos
-    header_font = Font(name='Arial', size=12, bold=True, color='FFFFFF')
-    header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-    header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    
-    data_font = Font(name='Arial', size=10)
-    data_alignment = Alignment(horizontal='left', vertical='center')
-    center_alignment = Alignment(horizontal='center', vertical='center')
-    right_alignment = Alignment(horizontal='right', vertical='center')
-    
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Definir encabezados
-    headers = [
-        'ID', 'Usuario', 'Cancha', 'Fecha', 'Hora Inicio', 'Hora Fin',
-        'Duración (horas)', 'Estado', 'Precio Total (COP)', 'Fecha Creación'
-    ]
-    
-    # Escribir encabezados
-    for col, header in enumerate(headers, 1):
-        cell = ws_reservas.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = border
-    
-    # Escribir datos
-    for row, reserva in enumerate(reservas_data, 2):
-        for col, (key, value) in enumerate(reserva.items(), 1):
-            cell = ws_reservas.cell(row=row, column=col, value=value)
-            cell.font = data_font
-            cell.border = border
-            
-            # Aplicar formato específico según el tipo de dato
-            if key == 'ID':
-                cell.alignment = center_alignment
-            elif key in ['Hora Inicio', 'Hora Fin']:
-                cell.alignment = center_alignment
-            elif key == 'Duración (horas)':
-                cell.alignment = center_alignment
-                cell.number_format = '0.0'
-            elif key == 'Estado':
-                cell.alignment = center_alignment
-                # Aplicar color según el estado
-                if value == 'Confirmada':
-                    cell.fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
-                elif value == 'Pendiente':
-                    cell.fill = PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid')
-                elif value == 'Cancelada':
-                    cell.fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
-            elif key == 'Precio Total':
-                cell.alignment = right_alignment
-                cell.number_format = '#,##0'
-            elif key == 'Fecha Creación':
-                cell.alignment = center_alignment
-            else:
-                cell.alignment = data_alignment
-    
-    # Ajustar ancho de columnas
-    column_widths = [8, 25, 20, 12, 12, 12, 15, 12, 18, 20]
-    for col, width in enumerate(column_widths, 1):
-        ws_reservas.column_dimensions[ws_reservas.cell(row=1, column=col).column_letter].width = width
-    
-    # Añadir título y filtros aplicados
-    ws_reservas.insert_rows(1, 3)
-    
-    # Título principal
-    title_cell = ws_reservas.cell(row=1, column=1, value="REPORTE DE RESERVAS - FLASH RESERVER")
-    title_cell.font = Font(name='Arial', size=16, bold=True, color='366092')
-    title_cell.alignment = Alignment(horizontal='left', vertical='center')
-    ws_reservas.merge_cells('A1:J1')
-    
-    # Filtros aplicados
-    filtro_texto = "Filtros aplicados: "
-    if filtro_rapido:
-        filtro_texto += f"Filtro rápido: {filtro_rapido.title()}"
-    elif filtro_dia:
-        filtro_texto += f"Día: {filtro_dia}"
-    elif filtro_mes:
-        filtro_texto += f"Mes: {filtro_mes}"
-    elif filtro_año:
-        filtro_texto += f"Año: {filtro_año}"
-    elif fecha_inicio and fecha_fin:
-        filtro_texto += f"Rango: {fecha_inicio} a {fecha_fin}"
-    else:
-        filtro_texto += "Todos los registros"
-    
-    filtro_cell = ws_reservas.cell(row=2, column=1, value=filtro_texto)
-    filtro_cell.font = Font(name='Arial', size=11, italic=True, color='666666')
-    filtro_cell.alignment = Alignment(horizontal='left', vertical='center')
-    ws_reservas.merge_cells('A2:J2')
-    
-    # Fecha de generación
-    fecha_gen = ws_reservas.cell(row=3, column=1, value=f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-    fecha_gen.font = Font(name='Arial', size=10, color='666666')
-    fecha_gen.alignment = Alignment(horizontal='left', vertical='center')
-    ws_reservas.merge_cells('A3:J3')
-    
-    # Ajustar encabezados de datos (ahora en fila 4)
-    for col in range(1, len(headers) + 1):
-        cell = ws_reservas.cell(row=4, column=col)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = border
-    
-    # ==================== HOJA DE ESTADÍSTICAS ====================
-    ws_stats = wb.create_sheet("Estadísticas")
-    
-    # Título
-    title_cell = ws_stats.cell(row=1, column=1, value="ESTADÍSTICAS GENERALES")
-    title_cell.font = Font(name='Arial', size=16, bold=True, color='366092')
-    title_cell.alignment = Alignment(horizontal='center', vertical='center')
-    ws_stats.merge_cells('A1:C1')
-    
-    # Encabezados de estadísticas
-    stats_headers = ['Métrica', 'Valor', 'Descripción']
-    for col, header in enumerate(stats_headers, 1):
-        cell = ws_stats.cell(row=3, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = border
-    
-    # Datos de estadísticas
-    stats_data = [
-        ('Total Usuarios', Usuario.query.count(), 'Número total de usuarios registrados'),
-        ('Total Canchas', Cancha.query.count(), 'Número total de canchas disponibles'),
-        ('Total Reservas', len(reservas_data), 'Número total de reservas en el período'),
-        ('Reservas Hoy', Reserva.query.filter(Reserva.Fecha == hoy).count(), 'Reservas realizadas hoy'),
-        ('Ingresos Totales (COP)', sum(r['Precio Total'] for r in reservas_data), 'Ingresos totales en el período'),
-        ('Promedio por Reserva', round(sum(r['Precio Total'] for r in reservas_data) / len(reservas_data) if reservas_data else 0, 0), 'Precio promedio por reserva'),
-        ('Cancha Más Popular', '', 'Cancha con más reservas'),
-        ('Usuario Más Activo', '', 'Usuario con más reservas')
-    ]
-    
-    # Obtener cancha más popular
-    if reservas_data:
-        cancha_counts = {}
-        for r in reservas_data:
-            cancha_counts[r['Cancha']] = cancha_counts.get(r['Cancha'], 0) + 1
-        cancha_popular = max(cancha_counts, key=cancha_counts.get)
-        stats_data[6] = (stats_data[6][0], cancha_popular, stats_data[6][2])
-    
-    # Obtener usuario más activo
-    if reservas_data:
-        usuario_counts = {}
-        for r in reservas_data:
-            usuario_counts[r['Usuario']] = usuario_counts.get(r['Usuario'], 0) + 1
-        usuario_activo = max(usuario_counts, key=usuario_counts.get)
-        stats_data[7] = (stats_data[7][0], usuario_activo, stats_data[7][2])
-    
-    # Escribir estadísticas
-    for row, (metrica, valor, descripcion) in enumerate(stats_data, 4):
-        # Métrica
-        cell = ws_stats.cell(row=row, column=1, value=metrica)
-        cell.font = Font(name='Arial', size=11, bold=True)
-        cell.border = border
-        cell.alignment = data_alignment
-        
-        # Valor
-        cell = ws_stats.cell(row=row, column=2, value=valor)
-        cell.font = data_font
-        cell.border = border
-        if 'Precio' in metrica or 'Ingresos' in metrica:
-            cell.number_format = '#,##0'
-            cell.alignment = right_alignment
-        else:
-            cell.alignment = center_alignment
-        
-        # Descripción
-        cell = ws_stats.cell(row=row, column=3, value=descripcion)
-        cell.font = Font(name='Arial', size=10, italic=True, color='666666')
-        cell.border = border
-        cell.alignment = data_alignment
-    
-    # Ajustar ancho de columnas
-    ws_stats.column_dimensions['A'].width = 25
-    ws_stats.column_dimensions['B'].width = 20
-    ws_stats.column_dimensions['C'].width = 50
-    
-    # ==================== HOJA DE RESUMEN ====================
-    ws_resumen = wb.create_sheet("Resumen")
-    
-    # Título
-    title_cell = ws_resumen.cell(row=1, column=1, value="RESUMEN EJECUTIVO")
-    title_cell.font = Font(name='Arial', size=16, bold=True, color='366092')
-    title_cell.alignment = Alignment(horizontal='center', vertical='center')
-    ws_resumen.merge_cells('A1:D1')
-    
-    # Información del reporte
-    info_data = [
-        ('Período del Reporte', filtro_texto.replace('Filtros aplicados: ', '')),
-        ('Total de Registros', len(reservas_data)),
-        ('Fecha de Generación', datetime.now().strftime('%d/%m/%Y %H:%M:%S')),
-        ('Generado por', current_user.Nombre if current_user else 'Sistema')
-    ]
-    
-    for row, (label, value) in enumerate(info_data, 3):
-        # Label
-        cell = ws_resumen.cell(row=row, column=1, value=label)
-        cell.font = Font(name='Arial', size=11, bold=True)
-        cell.border = border
-        cell.fill = PatternFill(start_color='F0F0F0', end_color='F0F0F0', fill_type='solid')
-        
-        # Valor
-        cell = ws_resumen.cell(row=row, column=2, value=value)
-        cell.font = data_font
-        cell.border = border
-        cell.alignment = data_alignment
-        
-        ws_resumen.merge_cells(f'A{row}:B{row}')
-    
-    # Ajustar ancho de columnas
-    ws_resumen.column_dimensions['A'].width = 30
-    ws_resumen.column_dimensions['B'].width = 40
-    
-    # Guardar archivo en memoria
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    # Generar nombre de archivo
-    filtro_applied = ""
-    if filtro_rapido:
-        filtro_applied = f"_{filtro_rapido}"
-    elif filtro_dia:
-        filtro_applied = f"_dia_{filtro_dia}"
-    elif filtro_mes:
-        filtro_applied = f"_mes_{filtro_mes}"
-    elif filtro_año:
-        filtro_applied = f"_año_{filtro_año}"
-    elif fecha_inicio and fecha_fin:
-        filtro_applied = f"_desde_{fecha_inicio}_hasta_{fecha_fin}"
-    
-    filename = f"reportes_reservas{filtro_applied}.xlsx"
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
+    from app.services.reporte_service import FiltroReporte, reporte_service
+    from app.utils.generar_excel import generar_excel_reservas
+
+    filtro = FiltroReporte.desde_args(request.args)
+    estadisticas = reporte_service.calcular(filtro)
+
+    return generar_excel_reservas(
+        reporte_service.reservas_exportacion(filtro),
+        estadisticas,
+        usuario_mas_activo=reporte_service.usuario_mas_activo(filtro),
+        descripcion_filtro=filtro.descripcion,
+        generado_por=current_user.Nombre if current_user else 'Sistema',
+        nombre_archivo=f"reportes_reservas{filtro.sufijo_archivo}.xlsx"
     )
 
 # ---------------------- CRUD TIPOS DE CANCHA ----------------------
@@ -1274,7 +734,7 @@ def exportar_reportes_excel():
 @login_required
 @admin_required
 def tipos_cancha():
-    tipos = TipoCancha.query.all()
+    tipos = con_perfil(TipoCancha.query, 'tipos_cancha_admin').all()
     return render_template('admin/tipos_cancha.html', tipos=tipos)
 
 @admin_bp.route('/tipo-cancha/nuevo', methods=['GET', 'POST'])
@@ -1373,6 +833,7 @@ def editar_perfil():
             ruta_guardado = os.path.join(ruta_directorio, filename)
             foto.save(ruta_guardado)
             usuario.FotoPerfil = f'uploads/perfiles/{filename}'
+            imagen_service.encolar(usuario.FotoPerfil)
 
         db.session.commit()
         flash('Perfil actualizado exitosamente', 'success')
@@ -1390,100 +851,16 @@ def editar_perfil():
 @admin_required
 def api_estadisticas():
     try:
-        from sqlalchemy import extract
-
-        hoy = datetime.now().date()
-        
-        # Obtener todos los tipos de filtros
-        filtro_rapido = request.args.get('filtro_rapido')
-        filtro_dia = request.args.get('filtro_dia')
-        filtro_mes = request.args.get('filtro_mes')
-        filtro_año = request.args.get('filtro_año')
-        inicio = request.args.get('inicio')
-        fin = request.args.get('fin')
-
-        query_reservas = Reserva.query
-        
-        # Aplicar filtros según prioridad
-        if filtro_rapido:
-            # Filtros rápidos
-            if filtro_rapido == 'hoy':
-                query_reservas = query_reservas.filter(Reserva.Fecha == hoy)
-            elif filtro_rapido == 'ayer':
-                ayer = hoy - timedelta(days=1)
-                query_reservas = query_reservas.filter(Reserva.Fecha == ayer)
-            elif filtro_rapido == 'semana':
-                inicio_semana = hoy - timedelta(days=hoy.weekday())
-                fin_semana = inicio_semana + timedelta(days=6)
-                query_reservas = query_reservas.filter(
-                    Reserva.Fecha >= inicio_semana,
-                    Reserva.Fecha <= fin_semana
-                )
-            elif filtro_rapido == 'mes':
-                inicio_mes = hoy.replace(day=1)
-                fin_mes = (inicio_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-                query_reservas = query_reservas.filter(
-                    Reserva.Fecha >= inicio_mes,
-                    Reserva.Fecha <= fin_mes
-                )
-            elif filtro_rapido == 'trimestre':
-                trimestre = (hoy.month - 1) // 3
-                inicio_trimestre = hoy.replace(month=trimestre * 3 + 1, day=1)
-                fin_trimestre = (inicio_trimestre + timedelta(days=93)).replace(day=1) - timedelta(days=1)
-                query_reservas = query_reservas.filter(
-                    Reserva.Fecha >= inicio_trimestre,
-                    Reserva.Fecha <= fin_trimestre
-                )
-            elif filtro_rapido == 'año':
-                inicio_año = hoy.replace(month=1, day=1)
-                fin_año = hoy.replace(month=12, day=31)
-                query_reservas = query_reservas.filter(
-                    Reserva.Fecha >= inicio_año,
-                    Reserva.Fecha <= fin_año
-                )
-        elif filtro_dia:
-            # Filtro por día específico
-            query_reservas = query_reservas.filter(Reserva.Fecha == filtro_dia)
-        elif filtro_mes:
-            # Filtro por mes específico
-            año, mes = filtro_mes.split('-')
-            query_reservas = query_reservas.filter(
-                extract('year', Reserva.Fecha) == int(año),
-                extract('month', Reserva.Fecha) == int(mes)
-            )
-        elif filtro_año:
-            # Filtro por año específico
-            query_reservas = query_reservas.filter(extract('year', Reserva.Fecha) == int(filtro_año))
-        elif inicio and fin:
-            # Filtro por rango personalizado
-            query_reservas = query_reservas.filter(
-                Reserva.Fecha >= inicio,
-                Reserva.Fecha <= fin
-            )
+        from app.services.reporte_service import FiltroReporte, reporte_service
+        from app.services.tablero_service import tablero_service
 
-        # --- Totales ---
-        total_usuarios = Usuario.query.count()
-        total_canchas = Cancha.query.count()
-        total_reservas = query_reservas.count()
-        reservas_hoy = (
-            db.session.query(func.count(Reserva.Id))
-            .filter(func.date(Reserva.FechaCreacion) == hoy)
-            .scalar()
-        )
-
-
-        # --- Ingresos totales ---
-        ingresos_totales = (
-            db.session.query(func.coalesce(func.sum(Cancha.PrecioHora), 0))
-            .join(Reserva, Reserva.CanchaId == Cancha.Id)
-            .filter(Reserva.Estado == "Confirmada")
-        )
-        if inicio and fin:
-            ingresos_totales = ingresos_totales.filter(
-                Reserva.Fecha >= inicio,
-                Reserva.Fecha <= fin
-            )
-        ingresos_totales = ingresos_totales.scalar() or 0
+        # Auto-refresco del dashboard (?tablero=1): instantánea en caché. Sin filtros es el
+        # reporte completo que carga admin/reportes.html, con las series de los gráficos
+        if request.args.get('tablero'):
+            return jsonify(tablero_service.instantanea())
+
+        filtro = FiltroReporte.desde_args(request.args)
+        estadisticas = reporte_service.calcular(filtro, recientes=5)
 
         # --- Últimas reservas ---
         ultimas_reservas = [
@@ -1494,33 +871,7 @@ def api_estadisticas():
                 "fecha": r.Fecha.strftime('%d/%m/%Y %H:%M'),
                 "estado": r.Estado
             }
-            for r in query_reservas.join(Usuario).join(Cancha)
-            .order_by(Reserva.FechaCreacion.desc())
-            .limit(5)
-        ]
-
-        # --- Canchas más populares ---
-        canchas_populares_query = (
-            db.session.query(
-                Cancha.Nombre.label('nombre'),
-                func.count(Reserva.Id).label('total_reservas'),
-                func.coalesce(func.sum(Cancha.PrecioHora), 0).label('ingresos')
-            )
-            .join(Reserva, Cancha.Id == Reserva.CanchaId)
-            .group_by(Cancha.Id)
-            .order_by(func.count(Reserva.Id).desc())
-            .limit(5)
-            .all()
-        )
-
-        canchas_populares = [
-            {
-                "nombre": c.nombre,
-                "total_reservas": c.total_reservas,
-                "ingresos": float(c.ingresos),
-                "ocupacion": round((c.total_reservas / max(1, total_reservas)) * 100, 2)
-            }
-            for c in canchas_populares_query
+            for r in estadisticas.recientes
         ]
 
         # --- Actividad reciente ---
@@ -1530,73 +881,29 @@ def api_estadisticas():
                 "accion": f"Realizó una reserva en {a.cancha.Nombre}" if a.Estado == "Confirmada" else f"Reserva {a.Estado}",
                 "fecha": a.FechaCreacion.strftime('%d/%m/%Y %H:%M')
             }
-            for a in query_reservas.join(Usuario)
-            .order_by(Reserva.FechaCreacion.desc())
-            .limit(5)
+            for a in estadisticas.recientes
         ]
 
-        # --- Reservas por mes + ingresos ---
-        reservas_por_mes = []
-        ingresos_por_mes = []
-        meses_labels = []
-        for mes in range(1, 13):
-            count_mes = query_reservas.filter(extract('month', Reserva.Fecha) == mes).count()
-            ingresos_mes = (
-                db.session.query(func.coalesce(func.sum(Cancha.PrecioHora), 0))
-                .join(Reserva, Reserva.CanchaId == Cancha.Id)
-                .filter(extract('month', Reserva.Fecha) == mes)
-            )
-            if inicio and fin:
-                ingresos_mes = ingresos_mes.filter(
-                    Reserva.Fecha >= inicio,
-                    Reserva.Fecha <= fin
-                )
-            ingresos_mes = ingresos_mes.scalar() or 0
-
-            reservas_por_mes.append(count_mes)
-            ingresos_por_mes.append(float(ingresos_mes))
-            meses_labels.append(datetime(2025, mes, 1).strftime('%b'))
-
-        # --- Ocupación para gráfico de barras ---
-        ocupacion_labels = [c['nombre'] for c in canchas_populares]
-        ocupacion_values = [c['ocupacion'] for c in canchas_populares]
-
-        # --- Heatmap semanal ---
-        reservas_semana = Reserva.query.filter(
-            Reserva.Fecha >= hoy - timedelta(days=6),
-            Reserva.Fecha <= hoy
-        ).all()
-
-        heatmap = []
-        for day in range(7):  
-            for hour in range(24):
-                heatmap.append({"x": hour, "y": day, "v": 0})
-        for r in reservas_semana:
-            day_index = r.Fecha.weekday()  # lunes=0
-            hour_index = r.HoraInicio.hour
-            idx = day_index * 24 + hour_index
-            heatmap[idx]["v"] += 1
-
         return jsonify({
-            "total_usuarios": total_usuarios,
-            "total_canchas": total_canchas,
-            "total_reservas": total_reservas,
-            "reservas_hoy": reservas_hoy,
-            "ingresos_totales": float(ingresos_totales),
+            **estadisticas.como_dict(),
             "ultimas_reservas": ultimas_reservas,
-            "canchas_populares": canchas_populares,
-            "actividades": actividades,
-            "meses": meses_labels,
-            "reservas_por_mes": reservas_por_mes,
-            "ingresos_por_mes": ingresos_por_mes,
-            "ocupacion_labels": ocupacion_labels,
-            "ocupacion_values": ocupacion_values,
-            "heatmap": heatmap
+            "actividades": actividades
         })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@admin_bp.route('/api/notificaciones/metricas')
+@login_required
+@admin_required
+def metricas_notificaciones():
+    """Pendientes, lotes y latencias de entrega de notificaciones"""
+    try:
+        from app.services.notificacion_service import notificacion_service
+        return jsonify({'success': True, 'metricas': notificacion_service.obtener_metricas()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @admin_bp.route('/notificaciones')
 @login_required
 @admin_required
@@ -1622,7 +929,7 @@ def obtener_notificaciones():
         ).group_by(Mensaje.UsuarioId).subquery()
         
         # Obtener los mensajes más recientes de cada usuario
-        mensajes_recientes = db.session.query(Mensaje).join(
+        mensajes_recientes = con_perfil(db.session.query(Mensaje), 'mensajes_remitente').join(
             subquery,
             db.and_(
                 Mensaje.UsuarioId == subquery.c.UsuarioId,
@@ -1630,17 +937,20 @@ def obtener_notificaciones():
             )
         ).order_by(Mensaje.FechaEnvio.desc()).all()
         
+        # Total y no leídos de cada usuario en una sola consulta
+        conteos = {
+            usuario_id: (total, no_leidos or 0)
+            for usuario_id, total, no_leidos in db.session.query(
+                Mensaje.UsuarioId,
+                func.count(Mensaje.Id),
+                func.sum(db.case((Mensaje.Leido.is_(False), 1), else_=0))
+            ).group_by(Mensaje.UsuarioId)
+        }
+        
         notifications = []
         for mensaje in mensajes_recientes:
             try:
-                # Contar mensajes no leídos de este usuario
-                mensajes_no_leidos = Mensaje.query.filter_by(
-                    UsuarioId=mensaje.UsuarioId,
-                    Leido=False
-                ).count()
-                
-                # Obtener todos los mensajes de este usuario para el conteo
-                total_mensajes_usuario = Mensaje.query.filter_by(UsuarioId=mensaje.UsuarioId).count()
+                total_mensajes_usuario, mensajes_no_leidos = conteos.get(mensaje.UsuarioId, (0, 0))
                 
                 # Verificar que el usuario existe
                 if not mensaje.usuario:
@@ -1782,11 +1092,13 @@ def marcar_mensaje_leido():
 @admin_required
 def obtener_conversacion(usuario_id):
     try:
-        # Obtener todos los mensajes del usuario ordenados por fecha
-        mensajes = Mensaje.query.filter_by(UsuarioId=usuario_id).order_by(Mensaje.FechaEnvio).all()
+        # Últimos mensajes del usuario; el cursor pide los anteriores (scroll hacia arriba)
+        pagina = paginar(Mensaje.query.filter_by(UsuarioId=usuario_id),
+                         [Mensaje.FechaEnvio.desc(), Mensaje.Id.desc()],
+                         cursor=request.args.get('cursor'), contar=False)
         
         conversacion = []
-        for mensaje in mensajes:
+        for mensaje in reversed(pagina.elementos):
             conversacion.append({
                 'id': mensaje.Id,
                 'mensaje': mensaje.Mensaje,
@@ -1798,7 +1110,9 @@ def obtener_conversacion(usuario_id):
         
         return jsonify({
             'success': True,
-            'conversacion': conversacion
+            'conversacion': conversacion,
+            'siguiente_cursor': pagina.siguiente_cursor,
+            'hay_mas': pagina.hay_mas
         })
         
     except Exception as e:
@@ -1872,10 +1186,30 @@ def admin_gestionar_posts():
     
     print("Acceso permitido - Usuario es administrador")
     
-    # Obtener todos los posts (activos e inactivos)
-    posts = Post.query.order_by(Post.FechaCreacion.desc()).all()
-    
-    return render_template('admin/admin_gestionar_posts.html', posts=posts)
+    estado_filter = request.args.get('estado', '', type=str)
+    categoria_filter = request.args.get('categoria', '', type=str)
+    texto_filter = request.args.get('q', '', type=str).strip()
+
+    # Todos los posts (activos e inactivos) con los filtros de la página
+    query = con_perfil(Post.query, 'posts_listado')
+    if estado_filter:
+        query = query.filter(Post.Estado == estado_filter)
+    if categoria_filter:
+        query = query.filter(Post.Categoria == categoria_filter)
+    if texto_filter:
+        query = query.filter(db.or_(Post.Titulo.ilike(f"%{texto_filter}%"),
+                                    Post.Contenido.ilike(f"%{texto_filter}%")))
+
+    pagina = paginar(query, [Post.FechaCreacion.desc(), Post.Id.desc()], cursor=request.args.get('cursor'))
+    if quiere_json():
+        return respuesta_pagina(pagina, 'admin/_filas_posts.html', posts=pagina.elementos)
+
+    return render_template('admin/admin_gestionar_posts.html',
+                           posts=pagina.elementos,
+                           pagina=pagina,
+                           estado_filter=estado_filter,
+                           categoria_filter=categoria_filter,
+                           texto_filter=texto_filter)
 
 @admin_bp.route('/admin_estadisticas_foro')
 @login_required
@@ -1913,11 +1247,9 @@ def admin_estadisticas_foro():
     total_likes = Like.query.count()
     
     # Posts más populares
-    posts_populares = db.session.query(Post, func.count(Like.Id).label('total_likes')).\
-        outerjoin(Like).\
+    posts_populares = con_perfil(db.session.query(Post, Post.TotalLikes.label('total_likes')), 'posts_populares').\
         filter(Post.Estado == 'Activo').\
-        group_by(Post.Id).\
-        order_by(func.count(Like.Id).desc()).\
+        order_by(Post.TotalLikes.desc(), Post.Id.desc()).\
         limit(5).all()
     
     # Usuarios más activos
@@ -1955,6 +1287,40 @@ def admin_estadisticas_foro():
                          posts_populares=posts_populares,
                          usuarios_activos=usuarios_activos)
 
+@admin_bp.route('/consultas-sql')
+@login_required
+@admin_required
+def consultas_sql():
+    """Sentencias SQL con más tiempo acumulado en este proceso y consultas lentas recientes"""
+    from app.services.monitor_consultas_service import monitor_consultas
+
+    orden = request.args.get('orden', 'tiempo_total')
+    if orden not in ('tiempo_total', 'llamadas', 'tiempo_max', 'lentas'):
+        orden = 'tiempo_total'
+    huellas = monitor_consultas.top_huellas(limite=request.args.get('limite', 50, type=int), orden=orden)
+    lentas = monitor_consultas.lentas_recientes()
+    resumen = monitor_consultas.resumen()
+
+    if quiere_json():
+        return jsonify({
+            'success': True,
+            'resumen': {**resumen, 'desde': resumen['desde'].isoformat()},
+            'huellas': huellas,
+            'lentas': [{**lenta, 'fecha': lenta['fecha'].isoformat()} for lenta in lentas],
+        })
+    return render_template('admin/consultas_sql.html', huellas=huellas, lentas=lentas, resumen=resumen,
+                           orden=orden, activo=monitor_consultas.activo)
+
+@admin_bp.route('/consultas-sql/reiniciar', methods=['POST'])
+@login_required
+@admin_required
+def reiniciar_consultas_sql():
+    from app.services.monitor_consultas_service import monitor_consultas
+
+    monitor_consultas.reiniciar()
+    flash('Estadísticas de consultas reiniciadas', 'success')
+    return redirect(url_for('admin.consultas_sql'))
+
 @admin_bp.route('/debug_usuario_foro')
 @login_required
 @admin_required
@@ -2051,6 +1417,7 @@ def actualizar_perfil():
                     
                     # Actualizar ruta en la base de datos
                     current_user.FotoPerfil = f'uploads/{filename}'
+                    imagen_service.encolar(current_user.FotoPerfil)
                     image_url = url_for('static', filename=current_user.FotoPerfil)
         
         # Actualizar datos del usuario
@@ -12,6 +12,11 @@ from app.models.mensaje import Mensaje
 from app.utils.filters import format_currency
 from app.models.usuario import Usuario
 from werkzeug.security import generate_password_hash
+from app.services.ocupacion_service import occupancy_index
+from app.services.reserva_service import reserva_service, ConflictoReservaError
+from app.services.imagen_service import imagen_service
+from app.utils.paginacion import paginar, quiere_json, respuesta_pagina
+from app.utils.perfiles_consulta import con_perfil
 
 client_bp = Blueprint('client', __name__)
 @client_bp.after_request
@@ -39,7 +44,7 @@ def ver_canchas():
     categoria_filter = request.args.get('categoria', '')
     
     # Query base - todas las canchas excepto mantenimiento
-    query = Cancha.query.filter(Cancha.Estado != 'Mantenimiento')
+    query = con_perfil(Cancha.query, 'canchas_cliente').filter(Cancha.Estado != 'Mantenimiento')
     
     # Aplicar filtros
     if nombre_filter:
@@ -54,72 +59,10 @@ def ver_canchas():
     # Obtener canchas con filtros aplicados
     canchas = query.all()
     
-    # Calcular disponibilidad real para cada cancha (OPTIMIZADO)
-    from datetime import datetime, timedelta
-    fecha_actual = datetime.now().date()
-    fecha_fin = fecha_actual + timedelta(days=30)  # Próximo mes
-    
-    # Obtener todas las reservas confirmadas de una vez
-    reservas_confirmadas = Reserva.query.filter(
-        Reserva.Estado == 'Confirmada',
-        Reserva.Fecha >= fecha_actual,
-        Reserva.Fecha <= fecha_fin
-    ).all()
-    
-    # Crear un diccionario para acceso rápido
-    reservas_por_cancha = {}
-    for reserva in reservas_confirmadas:
-        if reserva.CanchaId not in reservas_por_cancha:
-            reservas_por_cancha[reserva.CanchaId] = []
-        reservas_por_cancha[reserva.CanchaId].append(reserva)
-    
+    # Disponibilidad de los próximos 30 días desde el índice de ocupación (sin consultar Reservas)
     canchas_con_disponibilidad = []
-    
     for cancha in canchas:
-        # Contar slots disponibles en los próximos 30 días
-        slots_totales = 30 * 16  # 30 días × 16 horas por día
-        slots_ocupados = 0
-        
-        # Obtener reservas de esta cancha
-        reservas_cancha = reservas_por_cancha.get(cancha.Id, [])
-        
-        # Contar slots ocupados
-        for reserva in reservas_cancha:
-            # Calcular duración de la reserva en horas
-            inicio = datetime.combine(datetime.min, reserva.HoraInicio)
-            fin = datetime.combine(datetime.min, reserva.HoraFin)
-            if fin <= inicio:  # Si pasa de medianoche
-                fin = datetime.combine(datetime.min, reserva.HoraFin) + timedelta(days=1)
-            
-            duracion_horas = (fin - inicio).total_seconds() / 3600
-            
-            # Solo contar si está en horario operativo (6:00-22:00)
-            hora_inicio = reserva.HoraInicio.hour
-            hora_fin = reserva.HoraFin.hour if reserva.HoraFin.hour > 0 else 24
-            
-            # Ajustar a horario operativo
-            if hora_inicio < 6:
-                hora_inicio = 6
-            if hora_fin > 22:
-                hora_fin = 22
-            
-            # Contar horas ocupadas
-            horas_ocupadas = max(0, hora_fin - hora_inicio)
-            slots_ocupados += horas_ocupadas
-        
-        # Calcular porcentaje de disponibilidad
-        porcentaje_disponibilidad = ((slots_totales - slots_ocupados) / slots_totales * 100) if slots_totales > 0 else 100
-        
-        # Determinar si la cancha está completamente ocupada
-        completamente_ocupada = porcentaje_disponibilidad <= 5  # 5% o menos disponible
-        
-        canchas_con_disponibilidad.append({
-            'cancha': cancha,
-            'porcentaje_disponibilidad': porcentaje_disponibilidad,
-            'completamente_ocupada': completamente_ocupada,
-            'slots_disponibles': slots_totales - slots_ocupados,
-            'slots_totales': slots_totales
-        })
+        canchas_con_disponibilidad.append({'cancha': cancha, **occupancy_index.resumen(cancha.Id)})
     
     # Ordenar por disponibilidad (más disponibles primero)
     canchas_con_disponibilidad.sort(key=lambda x: x['porcentaje_disponibilidad'], reverse=True)
@@ -146,79 +89,29 @@ def ver_canchas():
 @usuario_activo_required
 def ver_cancha(cancha_id):
     """Ver detalles de una cancha específica con información de disponibilidad"""
-    cancha = Cancha.query.get_or_404(cancha_id)
+    cancha = con_perfil(Cancha.query, 'cancha_detalle').get_or_404(cancha_id)
     
     # Bloquear acceso solo si está en mantenimiento
     if cancha.Estado == 'Mantenimiento':
         flash('Esta cancha está en mantenimiento actualmente', 'warning')
         return redirect(url_for('client.ver_canchas'))
 
-    # Calcular disponibilidad real de la cancha (OPTIMIZADO)
-    from datetime import datetime, timedelta
-    fecha_actual = datetime.now().date()
-    fecha_fin = fecha_actual + timedelta(days=30)  # Próximo mes
-    
-    slots_totales = 30 * 16  # 30 días × 16 horas por día
-    slots_ocupados = 0
-    
-    # Obtener todas las reservas confirmadas de esta cancha
-    reservas_cancha = Reserva.query.filter(
-        Reserva.CanchaId == cancha_id,
-        Reserva.Estado == 'Confirmada',
-        Reserva.Fecha >= fecha_actual,
-        Reserva.Fecha <= fecha_fin
-    ).all()
-    
-    # Contar slots ocupados
-    for reserva in reservas_cancha:
-        # Solo contar si está en horario operativo (6:00-22:00)
-        hora_inicio = reserva.HoraInicio.hour
-        hora_fin = reserva.HoraFin.hour if reserva.HoraFin.hour > 0 else 24
-        
-        # Ajustar a horario operativo
-        if hora_inicio < 6:
-            hora_inicio = 6
-        if hora_fin > 22:
-            hora_fin = 22
-        
-        # Contar horas ocupadas
-        horas_ocupadas = max(0, hora_fin - hora_inicio)
-        slots_ocupados += horas_ocupadas
-    
-    # Calcular porcentaje de disponibilidad
-    porcentaje_disponibilidad = (slots_totales - slots_ocupados) / slots_totales * 100 if slots_totales > 0 else 100
-    completamente_ocupada = porcentaje_disponibilidad <= 5  # 5% o menos disponible
+    # Calcular disponibilidad de los próximos 30 días desde el índice de ocupación
+    ocupacion = occupancy_index.resumen(cancha_id)
+    porcentaje_disponibilidad = ocupacion['porcentaje_disponibilidad']
+    completamente_ocupada = ocupacion['completamente_ocupada']
 
-    comentarios = Comentario.query.filter_by(
+    comentarios = con_perfil(Comentario.query, 'comentarios_cancha').filter_by(
         CanchaId=cancha_id
     ).order_by(Comentario.FechaCreacion.desc()).limit(5).all()
 
     # Canchas similares (excluyendo mantenimiento)
-    similares = Cancha.query.filter(
+    similares = con_perfil(Cancha.query, 'canchas_cliente').filter(
         Cancha.CategoriaId == cancha.CategoriaId,
         Cancha.Id != cancha.Id,
         Cancha.Estado != 'Mantenimiento'
     ).limit(12).all()
 
-    # Debug: imprimir información de la cancha
-    print(f"DEBUG - Cancha ID: {cancha.Id}")
-    print(f"DEBUG - Cancha Nombre: {cancha.Nombre}")
-    print(f"DEBUG - Cancha Imagen: {cancha.Imagen}")
-    print(f"DEBUG - Cancha imagen (relación): {cancha.imagen}")
-    if cancha.imagen:
-        for img in cancha.imagen:
-            print(f"DEBUG - Imagen Ruta: {img.Ruta}")
-    
-    # Debug: imprimir información de comentarios y usuarios
-    if comentarios:
-        print(f"DEBUG - Total comentarios: {len(comentarios)}")
-        for i, comentario in enumerate(comentarios):
-            print(f"DEBUG - Comentario {i+1}:")
-            print(f"  - Usuario ID: {comentario.usuario.Id}")
-            print(f"  - Usuario Nombre: {comentario.usuario.Nombre}")
-            print(f"  - Usuario FotoPerfil: {comentario.usuario.FotoPerfil}")
-            print(f"  - Usuario Email: {comentario.usuario.Email}")
-    
     return render_template(
         'client/cancha_detalle.html',
         cancha=cancha,
@@ -227,8 +120,8 @@ def ver_cancha(cancha_id):
         format_currency=format_currency,
         porcentaje_disponibilidad=porcentaje_disponibilidad,
         completamente_ocupada=completamente_ocupada,
-        slots_disponibles=slots_totales - slots_ocupados,
-        slots_totales=slots_totales
+        slots_disponibles=ocupacion['slots_disponibles'],
+        slots_totales=ocupacion['slots_totales']
     )
 
 @client_bp.route('/reservar/<int:cancha_id>', methods=['GET', 'POST'])
@@ -243,40 +136,8 @@ def reservar(cancha_id):
         flash('No se puede reservar esta cancha porque está en mantenimiento', 'danger')
         return redirect(url_for('client.ver_canchas'))
 
-    # Verificar disponibilidad real de la cancha (OPTIMIZADO)
-    from datetime import datetime, timedelta
-    fecha_actual = datetime.now().date()
-    fecha_fin = fecha_actual + timedelta(days=30)  # Próximo mes
-    
-    slots_totales = 30 * 16  # 30 días × 16 horas por día
-    slots_ocupados = 0
-    
-    # Obtener todas las reservas confirmadas de esta cancha
-    reservas_cancha = Reserva.query.filter(
-        Reserva.CanchaId == cancha_id,
-        Reserva.Estado == 'Confirmada',
-        Reserva.Fecha >= fecha_actual,
-        Reserva.Fecha <= fecha_fin
-    ).all()
-    
-    # Contar slots ocupados
-    for reserva in reservas_cancha:
-        # Solo contar si está en horario operativo (6:00-22:00)
-        hora_inicio = reserva.HoraInicio.hour
-        hora_fin = reserva.HoraFin.hour if reserva.HoraFin.hour > 0 else 24
-        
-        # Ajustar a horario operativo
-        if hora_inicio < 6:
-            hora_inicio = 6
-        if hora_fin > 22:
-            hora_fin = 22
-        
-        # Contar horas ocupadas
-        horas_ocupadas = max(0, hora_fin - hora_inicio)
-        slots_ocupados += horas_ocupadas
-    
-    # Calcular porcentaje de disponibilidad
-    porcentaje_disponibilidad = ((slots_totales - slots_ocupados) / slots_totales * 100) if slots_totales > 0 else 100
+    # Verificar disponibilidad de la cancha desde el índice de ocupación
+    porcentaje_disponibilidad = occupancy_index.resumen(cancha_id)['porcentaje_disponibilidad']
     
     # Si la cancha está completamente ocupada (5% o menos disponible), no permitir reservas
     if porcentaje_disponibilidad <= 5:
@@ -289,42 +150,27 @@ def reservar(cancha_id):
         hora_fin = datetime.strptime(request.form['hora_fin'], '%H:%M').time()
         observaciones = request.form.get('observaciones', '')
 
-        # Verificar si hay un cruce de horario con una reserva existente
-        reserva_existente = Reserva.query.filter_by(
-            CanchaId=cancha_id,
-            Fecha=fecha,
-            Estado='Confirmada'
-        ).filter(
-            ((Reserva.HoraInicio < hora_fin) & (Reserva.HoraFin > hora_inicio))
-        ).first()
-
-        if reserva_existente:
+        # Crear la reserva verificando el cruce de horario de forma atómica
+        try:
+            nueva_reserva = reserva_service.crear_reserva(
+                usuario_id=current_user.Id,
+                cancha_id=cancha_id,
+                fecha=fecha,
+                hora_inicio=hora_inicio,
+                hora_fin=hora_fin,
+                observaciones=observaciones
+            )
+        except ConflictoReservaError:
             # Solo mostrar alerta, NO crear la reserva
             flash('¡Atención! Ya existe una reserva en ese horario. Por favor elige otro horario.', 'warning')
             return redirect(url_for('client.reservar', cancha_id=cancha_id))
 
-        # Crear la reserva solo si no hay cruce
-        nueva_reserva = Reserva(
-            UsuarioId=current_user.Id,
-            CanchaId=cancha_id,
-            Fecha=fecha,
-            HoraInicio=hora_inicio,
-            HoraFin=hora_fin,
-            Observaciones=observaciones,
-            Estado='Confirmada'
-        )
-
-        db.session.add(nueva_reserva)
-        db.session.commit()
+        occupancy_index.registrar_reserva(nueva_reserva)
 
         # Enviar notificación de confirmación por email
         try:
             from app.services.notificacion_service import notificacion_service
             notificacion_service.notificar_reserva_confirmada(nueva_reserva.Id)
-            
-            # Programar recordatorios automáticos
-            from app.services.recordatorio_service import recordatorio_service
-            recordatorio_service.programar_recordatorios_reserva(nueva_reserva.Id)
         except Exception as e:
             # Si falla la notificación, no fallar la creación de la reserva
             pass
@@ -363,40 +209,25 @@ def api_reservar():
     if hora_fin <= hora_inicio:
         return jsonify({'success': False, 'message': 'La hora final debe ser mayor que la inicial'}), 400
 
-    # Verificar conflicto con reservas existentes
-    conflicto = Reserva.query.filter_by(
-        CanchaId=cancha_id,
-        Fecha=fecha,
-        Estado='Confirmada'
-    ).filter(
-        (Reserva.HoraInicio < hora_fin) & (Reserva.HoraFin > hora_inicio)
-    ).first()
-
-    if conflicto:
+    # Crear la reserva verificando el cruce de horario de forma atómica
+    try:
+        nueva_reserva = reserva_service.crear_reserva(
+            usuario_id=current_user.Id,
+            cancha_id=cancha_id,
+            fecha=fecha,
+            hora_inicio=hora_inicio,
+            hora_fin=hora_fin,
+            observaciones=observaciones
+        )
+    except ConflictoReservaError:
         return jsonify({'success': False, 'message': 'La cancha ya tiene una reserva en ese horario'}), 400
 
-    # Crear la reserva
-    nueva_reserva = Reserva(
-        UsuarioId=current_user.Id,
-        CanchaId=cancha_id,
-        Fecha=fecha,
-        HoraInicio=hora_inicio,
-        HoraFin=hora_fin,
-        Observaciones=observaciones,
-        Estado='Confirmada'
-    )
-
-    db.session.add(nueva_reserva)
-    db.session.commit()
+    occupancy_index.registrar_reserva(nueva_reserva)
 
     # Enviar notificación de confirmación por email
     try:
         from app.services.notificacion_service import notificacion_service
         notificacion_service.notificar_reserva_confirmada(nueva_reserva.Id)
-        
-        # Programar recordatorios automáticos
-        from app.services.recordatorio_service import recordatorio_service
-        recordatorio_service.programar_recordatorios_reserva(nueva_reserva.Id)
     except Exception as e:
         # Si falla la notificación, no fallar la creación de la reserva
         pass
@@ -415,9 +246,9 @@ def mis_reservas():
     categoria_filter = request.args.get('categoria', '')
     
     # Query base - reservas del usuario actual
-    query = db.session.query(Reserva).filter_by(
+    query = con_perfil(db.session.query(Reserva).filter_by(
         UsuarioId=current_user.Id
-    ).join(Cancha).join(Categoria).join(TipoCancha)
+    ).join(Cancha).join(Categoria).join(TipoCancha), 'reservas_cliente')
     
     # Aplicar filtros
     if nombre_filter:
@@ -429,24 +260,20 @@ def mis_reservas():
     if categoria_filter:
         query = query.filter(Categoria.Id == categoria_filter)
     
-    # Obtener reservas con filtros aplicados
-    reservas = query.order_by(Reserva.Fecha.desc()).all()
-    
-    # Cargar las imágenes de las canchas
-    for reserva in reservas:
-        # Cargar la relación de imágenes si existe
-        if hasattr(reserva.cancha, 'imagen'):
-            db.session.refresh(reserva.cancha)
-            # Forzar la carga de la relación imagen
-            _ = reserva.cancha.imagen
+    # Página de reservas con filtros aplicados (las imágenes de la cancha se cargan al mostrarlas)
+    pagina = paginar(query, [Reserva.Fecha.desc(), Reserva.Id.desc()], cursor=request.args.get('cursor'))
+    reservas = pagina.elementos
+    today = datetime.now().date()
+    if quiere_json():
+        return respuesta_pagina(pagina, 'client/_reservas.html', reservas=reservas, today=today)
     
     # Obtener tipos de cancha y categorías para los filtros
     tipos_cancha = TipoCancha.query.all()
     categorias = Categoria.query.all()
     
-    today = datetime.now().date()
     return render_template('client/mis_reservas.html', 
                          reservas=reservas, 
+                         pagina=pagina,
                          today=today,
                          tipos_cancha=tipos_cancha,
                          categorias=categorias,
@@ -471,17 +298,13 @@ def cancelar_reserva(reserva_id):
         flash('No se puede cancelar una reserva del día actual o pasada', 'danger')
         return redirect(url_for('client.mis_reservas'))
     
-    reserva.Estado = 'Cancelada'
-    db.session.commit()
+    reserva_service.cancelar_reserva(reserva)
+    occupancy_index.liberar_reserva(reserva)
 
     # Enviar notificación de cancelación por email
     try:
         from app.services.notificacion_service import notificacion_service
         notificacion_service.notificar_cancelacion_reserva(reserva.Id)
-        
-        # Cancelar recordatorios automáticos
-        from app.services.recordatorio_service import recordatorio_service
-        recordatorio_service.cancelar_recordatorios_reserva(reserva.Id)
     except Exception as e:
         # Si falla la notificación, no fallar la cancelación
         pass
@@ -662,7 +485,7 @@ def api_canchas():
     precio_min = request.args.get('precio_min', type=float)
     precio_max = request.args.get('precio_max', type=float)
     
-    query = Cancha.query.filter(Cancha.Estado != 'Mantenimiento')
+    query = con_perfil(Cancha.query, 'canchas_cliente').filter(Cancha.Estado != 'Mantenimiento')
     
     if categoria_id:
         query = query.filter(Cancha.CategoriaId == categoria_id)
@@ -832,7 +655,7 @@ def api_disponibilidad_mensual():
     """API para obtener la disponibilidad mensual de todas las canchas"""
     try:
         from datetime import datetime, timedelta
-        from sqlalchemy import extract, func
+        from app.services.disponibilidad_service import disponibilidad_service
         
         # Obtener fechas del mes actual y los próximos 2 meses
         fecha_actual = datetime.now().date()
@@ -841,49 +664,8 @@ def api_disponibilidad_mensual():
         # Obtener todas las canchas
         canchas = Cancha.query.filter(Cancha.Estado != 'Mantenimiento').all()
         
-        disponibilidad = []
-        
-        for cancha in canchas:
-            # Generar slots de tiempo para cada día
-            fecha_actual_iter = fecha_actual
-            while fecha_actual_iter <= fecha_fin:
-                # Generar slots de 1 hora desde 6:00 AM hasta 10:00 PM
-                for hora in range(6, 22):
-                    hora_inicio = f"{hora:02d}:00"
-                    hora_fin = f"{hora+1:02d}:00"
-                    
-                    # Verificar si hay reserva en este slot
-                    reserva = Reserva.query.filter_by(
-                        CanchaId=cancha.Id,
-                        Fecha=fecha_actual_iter,
-                        Estado='Confirmada'
-                    ).filter(
-                        ((Reserva.HoraInicio < hora_fin) & (Reserva.HoraFin > hora_inicio))
-                    ).first()
-                    
-                    # Determinar estado
-                    if reserva:
-                        estado = 'ocupado'
-                        cliente = reserva.usuario.Nombre
-                    else:
-                        estado = 'disponible'
-                        cliente = None
-                    
-                    # Formatear fecha
-                    fecha_formateada = fecha_actual_iter.strftime('%d/%m/%Y')
-                    
-                    disponibilidad.append({
-                        'cancha_id': cancha.Id,
-                        'cancha_nombre': cancha.Nombre,
-                        'fecha': fecha_actual_iter.strftime('%Y-%m-%d'),
-                        'fecha_formateada': fecha_formateada,
-                        'hora_inicio': hora_inicio,
-                        'hora_fin': hora_fin,
-                        'estado': estado,
-                        'cliente': cliente
-                    })
-                
-                fecha_actual_iter += timedelta(days=1)
+        # Una sola consulta de reservas para todo el rango, rasterizada por cancha
+        disponibilidad = disponibilidad_service.disponibilidad_mensual(canchas, fecha_actual, fecha_fin)
         
         return jsonify({
             'success': True,
@@ -1011,6 +793,7 @@ def actualizar_perfil():
                 ruta_guardado = os.path.join(ruta_directorio, filename)
                 imagen.save(ruta_guardado)
                 current_user.FotoPerfil = f'uploads/usuarios/{filename}'
+                imagen_service.encolar(current_user.FotoPerfil)
                 image_url = url_for('static', filename=current_user.FotoPerfil)
         
         db.session.commit()
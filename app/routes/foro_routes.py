@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_from_directory
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
 from app.models import Post, Like, ComentarioForo, Usuario
 from app import db
@@ -6,60 +6,45 @@ from werkzeug.utils import secure_filename
 import os
 from datetime import datetime
 from app.auth.decorators import usuario_activo_required
+from app.utils.paginacion import paginar, quiere_json, respuesta_pagina
+from app.utils.perfiles_consulta import con_perfil
+from app.services.foro_service import foro_service
+from app.services.imagen_service import imagen_service
+from app.services.archivos_service import archivos_service
 
 foro_bp = Blueprint('foro', __name__, url_prefix='/foro')
 
+@foro_bp.context_processor
+def agregar_fragmentos_post():
+    """Tarjetas del listado: las partes fijas de cada post salen de la caché de foro_service"""
+    return {'fragmentos_post': foro_service.fragmentos}
+
 # Ruta para servir archivos multimedia del foro
 @foro_bp.route('/media/<path:filename>')
 @login_required
 @usuario_activo_required
 def servir_multimedia(filename):
     """Sirve archivos multimedia del foro (imágenes y videos)"""
-    try:
-        # Verificar que el archivo esté en la ruta correcta del foro
-        if not filename.startswith('uploads/foro/'):
-            return "Ruta de archivo no válida", 400
-        
-        # Extraer la ruta relativa y el directorio base
-        relative_path = filename.replace('uploads/foro/', '')
-        base_directory = os.path.join(current_app.root_path, 'static', 'uploads', 'foro',)
-
-        # Verificar que el archivo existe
-        full_path = os.path.join(base_directory, relative_path)
-        if not os.path.exists(full_path):
-            return "Archivo no encontrado", 404
-        
-        # Determinar el tipo de archivo para el Content-Type
-        file_extension = os.path.splitext(relative_path)[1].lower()
-        
-        # Mapear extensiones a tipos MIME
-        mime_types = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.mp4': 'video/mp4',
-            '.avi': 'video/x-msvideo',
-            '.mov': 'video/quicktime',
-            '.webm': 'video/webm',
-            '.ogg': 'video/ogg'
-        }
-        
-        content_type = mime_types.get(file_extension, 'application/octet-stream')
-        
-        # Servir el archivo con el tipo MIME correcto
-        response = send_from_directory(base_directory, relative_path)
-        response.headers['Content-Type'] = content_type
-        
-        # Agregar headers para cache y seguridad
-        response.headers['Cache-Control'] = 'public, max-age=3600'  # Cache por 1 hora
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        
-        return response
-        
-    except Exception as e:
-        current_app.logger.error(f"Error sirviendo archivo multimedia '{filename}': {e}")
-        return "Error interno del servidor", 500
+    # Verificar que el archivo esté en la ruta correcta del foro
+    if not filename.startswith('uploads/foro/'):
+        return "Ruta de archivo no válida", 400
+    
+    # Mapear extensiones a tipos MIME
+    mime_types = {
+        '.jpg': 'image/jpeg',
+        '.jpeg': 'image/jpeg',
+        '.png': 'image/png',
+        '.gif': 'image/gif',
+        '.mp4': 'video/mp4',
+        '.avi': 'video/x-msvideo',
+        '.mov': 'video/quicktime',
+        '.webm': 'video/webm',
+        '.ogg': 'video/ogg'
+    }
+    content_type = mime_types.get(os.path.splitext(filename)[1].lower(), 'application/octet-stream')
+    
+    # Privado (requiere sesión); inmutable si la URL trae la versión actual (?v=)
+    return archivos_service.enviar_subida('foro', filename[len('uploads/foro/'):], mimetype=content_type, privado=True)
 
 @foro_bp.route('/')
 @login_required
@@ -70,29 +55,29 @@ def index():
     orden = request.args.get('orden', 'reciente')  # reciente, popular, antiguo
     
     # Query base
-    query = Post.query.filter(Post.Estado == 'Activo')
+    query = con_perfil(Post.query, 'posts_listado').filter(Post.Estado == 'Activo')
     
     # Aplicar filtros
     if categoria_filter and categoria_filter != 'Todas':
         query = query.filter(Post.Categoria == categoria_filter)
     
-    # Aplicar ordenamiento
+    # Aplicar ordenamiento (siempre con Id al final para que el cursor sea único)
     if orden == 'popular':
-        query = query.order_by(db.func.count(Like.Id).desc())
+        criterios = [Post.TotalLikes.desc(), Post.Id.desc()]
     elif orden == 'antiguo':
-        query = query.order_by(Post.FechaCreacion.asc())
+        criterios = [Post.FechaCreacion.asc(), Post.Id.asc()]
     else:  # reciente
-        query = query.order_by(Post.FechaCreacion.desc())
+        criterios = [Post.FechaCreacion.desc(), Post.Id.desc()]
     
-    posts = query.all()
-    
-    # Obtener categorías únicas para el filtro
-    categorias = db.session.query(Post.Categoria).distinct().all()
-    categorias = [cat[0] for cat in categorias if cat[0]]
+    pagina = paginar(query, criterios, cursor=request.args.get('cursor'))
+    posts = foro_service.marcar_likes(pagina.elementos, current_user.Id)
+    if quiere_json():
+        return respuesta_pagina(pagina, 'foro/_posts.html', posts=posts)
     
     return render_template('foro/index.html', 
                          posts=posts,
-                         categorias=categorias,
+                         pagina=pagina,
+                         categorias=foro_service.categorias(),
                          categoria_filter=categoria_filter,
                          orden=orden)
 
@@ -118,6 +103,7 @@ def nuevo_post():
                 ruta_guardado = os.path.join(ruta_directorio, filename)
                 imagen.save(ruta_guardado)
                 post.Imagen = f'uploads/foro/imagenes/{filename}'
+                imagen_service.encolar(post.Imagen)
             
             # Manejo de video
             video = request.files.get('video')
@@ -145,38 +131,24 @@ def nuevo_post():
 @login_required
 @usuario_activo_required
 def ver_post(post_id):
-    post = Post.query.get_or_404(post_id)
+    post = con_perfil(Post.query, 'post_detalle').get_or_404(post_id)
+    foro_service.marcar_likes([post], current_user.Id)
     return render_template('foro/ver_post.html', post=post)
 
 @foro_bp.route('/post/<int:post_id>/like', methods=['POST'])
 @login_required
 @usuario_activo_required
 def toggle_like(post_id):
-    post = Post.query.get_or_404(post_id)
+    Post.query.get_or_404(post_id)
     
-    # Verificar si ya existe el like
-    like_existente = Like.query.filter_by(
-        UsuarioId=current_user.Id,
-        PostId=post_id
-    ).first()
-    
-    if like_existente:
-        # Quitar like
-        db.session.delete(like_existente)
-        mensaje = 'Like removido'
-    else:
-        # Agregar like
-        nuevo_like = Like(UsuarioId=current_user.Id, PostId=post_id)
-        db.session.add(nuevo_like)
-        mensaje = 'Like agregado'
-    
-    db.session.commit()
+    # Agrega o quita el like y actualiza el contador del post en la misma transacción
+    le_gusta, total_likes = foro_service.alternar_like(post_id, current_user.Id)
     
     return jsonify({
         'success': True,
-        'total_likes': post.total_likes,
-        'is_liked': post.is_liked_by(current_user.Id),
-        'mensaje': mensaje
+        'total_likes': total_likes,
+        'is_liked': le_gusta,
+        'mensaje': 'Like agregado' if le_gusta else 'Like removido'
     })
 
 @foro_bp.route('/post/<int:post_id>/comentar', methods=['POST'])
@@ -191,14 +163,7 @@ def comentar(post_id):
         return redirect(url_for('foro.ver_post', post_id=post_id))
     
     try:
-        comentario = ComentarioForo(
-            Contenido=contenido,
-            UsuarioId=current_user.Id,
-            PostId=post_id
-        )
-        
-        db.session.add(comentario)
-        db.session.commit()
+        foro_service.comentar(post_id, current_user.Id, contenido)
         flash('¡Comentario agregado exitosamente! Tu opinión ha sido publicada.', 'success')
         
     except Exception as e:
@@ -234,6 +199,7 @@ def editar_post(post_id):
                 ruta_guardado = os.path.join(ruta_directorio, filename)
                 imagen.save(ruta_guardado)
                 post.Imagen = f'uploads/foro/imagenes/{filename}'
+                imagen_service.encolar(post.Imagen)
             
             # Manejo de video
             video = request.files.get('video')
@@ -284,7 +250,7 @@ def eliminar_post(post_id):
 @usuario_activo_required
 def comentarios_recientes():
     # Obtener los 10 comentarios más recientes
-    comentarios = ComentarioForo.query.filter(
+    comentarios = con_perfil(ComentarioForo.query, 'comentarios_foro_recientes').filter(
         ComentarioForo.Estado == 'Activo'
     ).order_by(ComentarioForo.FechaCreacion.desc()).limit(10).all()
     
@@ -315,14 +281,7 @@ def comentar_ajax(post_id):
         return jsonify({'success': False, 'error': 'El comentario no puede estar vacío'})
     
     try:
-        comentario = ComentarioForo(
-            Contenido=contenido,
-            UsuarioId=current_user.Id,
-            PostId=post_id
-        )
-        
-        db.session.add(comentario)
-        db.session.commit()
+        comentario = foro_service.comentar(post_id, current_user.Id, contenido)
         
         return jsonify({
             'success': True,
@@ -355,8 +314,7 @@ def eliminar_comentario(comentario_id):
         return redirect(url_for('foro.ver_post', post_id=comentario.PostId))
     
     try:
-        comentario.Estado = 'Eliminado'
-        db.session.commit()
+        foro_service.cambiar_estado_comentario(comentario, 'Eliminado')
         flash('¡Comentario eliminado exitosamente! El comentario ha sido removido.', 'success')
         
     except Exception as e:
@@ -447,8 +405,7 @@ def admin_toggle_comentario_estado(comentario_id):
     nuevo_estado = 'Activo' if comentario.Estado != 'Activo' else 'Oculto'
     
     try:
-        comentario.Estado = nuevo_estado
-        db.session.commit()
+        foro_service.cambiar_estado_comentario(comentario, nuevo_estado)
         
         return jsonify({
             'success': True,
@@ -476,8 +433,7 @@ def admin_eliminar_comentario_permanentemente(comentario_id):
     post_id = comentario.PostId
     
     try:
-        db.session.delete(comentario)
-        db.session.commit()
+        foro_service.eliminar_comentario(comentario)
         
         flash('¡Comentario eliminado permanentemente!', 'success')
         return redirect(url_for('foro.ver_post', post_id=post_id))
@@ -1,5 +1,4 @@
-from .notificacion_service import notificacion_service
-from .websocket_service import websocket_service
-from .scheduler_service import scheduler_service
-
-__all__ = ['notificacion_service', 'websocket_service', 'scheduler_service']
+# Los servicios no se importan al cargar el paquete: algunos arrastran dependencias pesadas
+# (flask_socketio, APScheduler) que un worker web puede no necesitar nunca. Cada instancia se
+# importa desde su módulo, p. ej. ``from app.services.reserva_service import reserva_service``;
+# el paquete no las reexporta porque el módulo y la instancia comparten el nombre.
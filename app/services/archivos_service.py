@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import quote
+from flask import abort, current_app, request, send_file, url_for
+from werkzeug.security import safe_join
+
+logger = logging.getLogger(__name__)
+
+# Modos de envío de los archivos: Flask lee y transmite el archivo, o lo entrega el servidor web
+ENVIOS = ('flask', 'x-accel-redirect', 'x-sendfile')
+# Carpetas de static/uploads con ruta propia -> endpoint que las sirve (parámetro ``filename``)
+ENDPOINTS_SUBIDAS = {
+    'uploads/canchas/': 'servir_imagen_cancha',
+    'uploads/perfiles/': 'servir_imagen_perfil',
+    'uploads/foro/': 'servir_multimedia_foro',
+}
+TAMANO_BLOQUE = 1024 * 1024
+
+
+class ArchivosService:
+    """Entrega de archivos subidos con versión de contenido y GET condicional.
+
+    Las plantillas piden la URL de un archivo subido con ``url_subida(ruta)``,
+    que agrega ``?v=`` con un hash del contenido (se calcula una vez por
+    archivo y se guarda mientras no cambien su fecha de modificación ni su
+    tamaño). Si la ``v`` de la petición coincide con el contenido actual la
+    respuesta es ``public, max-age=ARCHIVOS_MAX_AGE_INMUTABLE, immutable``: al
+    reemplazar el archivo cambia la URL, así que el navegador nunca guarda una
+    versión vieja. Sin ``v`` (o con una vieja) se revalida con el ETag, que es
+    el mismo hash, y un archivo sin cambios responde 304 sin cuerpo.
+
+    Con ``ARCHIVOS_ENVIO = 'x-accel-redirect'`` la respuesta no lleva el
+    archivo sino la cabecera ``X-Accel-Redirect`` hacia una ubicación interna
+    de nginx (``ARCHIVOS_PREFIJO_INTERNO`` + nombre de la raíz registrada)::
+
+        location /_archivos/static/   { internal; alias /srv/flash_reserver/app/static/; }
+        location /_archivos/imagenes/ { internal; alias /srv/flash_reserver/instance/imagenes/; }
+
+    Con ``'x-sendfile'`` se usa ``USE_X_SENDFILE`` de Flask (Apache con
+    mod_xsendfile, lighttpd). En ambos casos los workers de Python solo
+    validan la ruta y las cabeceras; el servidor web transmite los bytes.
+    """
+
+    def __init__(self):
+        self.envio = 'flask'
+        self.prefijo_interno = '/_archivos'
+        self.max_age_inmutable = 31536000
+        self.max_versiones = 5000
+        # nombre -> directorio absoluto que nginx expone en prefijo_interno/nombre/
+        self._raices = {}
+        self._lock = threading.Lock()
+        # ruta absoluta -> ((mtime_ns, tamaño), versión)
+        self._versiones = OrderedDict()
+
+    def init_app(self, app):
+        self.envio = app.config.get('ARCHIVOS_ENVIO', 'flask')
+        if self.envio not in ENVIOS:
+            raise ValueError(f"ARCHIVOS_ENVIO debe ser uno de {ENVIOS}, no '{self.envio}'")
+        self.prefijo_interno = app.config.get('ARCHIVOS_PREFIJO_INTERNO', '/_archivos').rstrip('/')
+        self.max_age_inmutable = app.config.get('ARCHIVOS_MAX_AGE_INMUTABLE', 31536000)
+        self.max_versiones = app.config.get('ARCHIVOS_MAX_VERSIONES', 5000)
+        if self.envio == 'x-sendfile':
+            app.config['USE_X_SENDFILE'] = True
+
+        self.registrar_raiz('static', app.static_folder)
+        app.add_template_global(self.url_subida, 'url_subida')
+
+    def registrar_raiz(self, nombre, directorio):
+        """Directorio cuyos archivos se entregan por ``X-Accel-Redirect`` en ``prefijo_interno/nombre/``"""
+        self._raices[nombre] = os.path.realpath(directorio)
+
+    # ---------------------- Versiones ----------------------
+    def version(self, ruta):
+        """Hash corto del contenido del archivo ``ruta`` (absoluta); None si no existe"""
+        try:
+            estado = os.stat(ruta)
+        except (OSError, TypeError):
+            return None
+        clave = (estado.st_mtime_ns, estado.st_size)
+        with self._lock:
+            guardada = self._versiones.get(ruta)
+            if guardada is not None and guardada[0] == clave:
+                self._versiones.move_to_end(ruta)
+                return guardada[1]
+
+        resumen = hashlib.sha256()
+        try:
+            with open(ruta, 'rb') as archivo:
+                for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b''):
+                    resumen.update(bloque)
+        except OSError:
+            return None
+        version = resumen.hexdigest()[:16]
+        with self._lock:
+            self._versiones[ruta] = (clave, version)
+            self._versiones.move_to_end(ruta)
+            while len(self._versiones) > self.max_versiones:
+                self._versiones.popitem(last=False)
+        return version
+
+    def ruta_subida(self, ruta):
+        """Ruta absoluta de un archivo subido (``ruta`` relativa a static, como se guarda en la base de datos)"""
+        return safe_join(current_app.static_folder, ruta) if ruta else None
+
+    def url_subida(self, ruta):
+        """URL versionada (``?v=``) de un archivo de static/uploads; la de static si no tiene ruta propia"""
+        if not ruta:
+            return ''
+        for carpeta, endpoint in ENDPOINTS_SUBIDAS.items():
+            if ruta.startswith(carpeta):
+                version = self.version(self.ruta_subida(ruta))
+                return url_for(endpoint, filename=ruta[len(carpeta):], **({'v': version} if version else {}))
+        return url_for('static', filename=ruta)
+
+    # ---------------------- Entrega ----------------------
+    def enviar(self, ruta, mimetype=None, version=None, max_age=0, privado=False):
+        """Respuesta con el archivo ``ruta`` (absoluta y ya validada) o 404.
+
+        Es inmutable si la ``v`` de la petición es ``version`` (por defecto la
+        del propio archivo; '' para no permitirlo nunca); si no, se guarda
+        ``max_age`` segundos y luego se revalida con el ETag.
+        """
+        etag = self.version(ruta)
+        if etag is None:
+            abort(404)
+        if version is None:
+            version = etag
+        mimetype = mimetype or mimetypes.guess_type(ruta)[0] or 'application/octet-stream'
+
+        interna = self._ruta_interna(ruta) if self.envio == 'x-accel-redirect' else None
+        if interna:
+            respuesta = current_app.response_class(mimetype=mimetype)
+            respuesta.headers['X-Accel-Redirect'] = interna
+            respuesta.set_etag(etag)
+            respuesta.last_modified = int(os.path.getmtime(ruta))
+            respuesta = respuesta.make_conditional(request)
+        else:
+            respuesta = send_file(ruta, mimetype=mimetype, etag=etag, conditional=True)
+        if respuesta.status_code == 304:
+            # El servidor web no debe entregar el archivo en un 304
+            respuesta.headers.pop('X-Accel-Redirect', None)
+            respuesta.headers.pop('X-Sendfile', None)
+
+        pedida = request.args.get('v')
+        cache = respuesta.cache_control
+        cache.no_cache = None
+        cache.private = True if privado else None
+        cache.public = None if privado else True
+        respuesta.expires = None
+        if pedida and pedida == version:
+            cache.max_age = self.max_age_inmutable
+            cache.immutable = True
+        elif max_age:
+            cache.max_age = max_age
+        else:
+            cache.no_cache = True
+        respuesta.headers['X-Content-Type-Options'] = 'nosniff'
+        return respuesta
+
+    def enviar_subida(self, carpeta, nombre, por_defecto=None, **opciones):
+        """Archivo ``nombre`` de static/uploads/``carpeta``; si no existe, ``por_defecto`` (relativa a static) o 404"""
+        ruta = safe_join(current_app.static_folder, 'uploads', carpeta, nombre)
+        if ruta and os.path.isfile(ruta):
+            return self.enviar(ruta, **opciones)
+        defecto = safe_join(current_app.static_folder, por_defecto) if por_defecto else None
+        if defecto and os.path.isfile(defecto):
+            # Nunca inmutable: la URL es la del archivo que falta
+            return self.enviar(defecto, version='')
+        abort(404)
+
+    def _ruta_interna(self, ruta):
+        """URI de la ubicación interna de nginx para ``ruta``; None si no está en ninguna raíz registrada"""
+        real = os.path.realpath(ruta)
+        for nombre, raiz in self._raices.items():
+            if os.path.commonpath([real, raiz]) == raiz:
+                relativa = os.path.relpath(real, raiz).replace(os.sep, '/')
+                return quote(f"{self.prefijo_interno}/{nombre}/{relativa}")
+        return None
+
+# Instancia global del servicio
+archivos_service = ArchivosService()
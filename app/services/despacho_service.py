@@ -0,0 +1,329 @@
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, select, update
+from app import db
+from app.models.notificacion import Notificacion
+
+logger = logging.getLogger(__name__)
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+class MetricasDespacho:
+    """Contadores y latencias de entrega de notificaciones (en memoria, por proceso)"""
+
+    def __init__(self, muestras=1000):
+        self._lock = threading.Lock()
+        self.avisos = 0
+        self.lotes = 0
+        self.reclamadas = 0
+        self.enviadas = 0
+        self.fallidas = 0
+        self.reintentos = 0
+        self.reclamos_liberados = 0
+        self._latencias_entrega = deque(maxlen=muestras)
+        self._duraciones_lote = deque(maxlen=muestras)
+
+    def incrementar(self, contador, cantidad=1):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + cantidad)
+
+    def registrar_lote(self, reclamadas, enviadas, fallidas, reintentos, latencias, duracion):
+        with self._lock:
+            self.lotes += 1
+            self.reclamadas += reclamadas
+            self.enviadas += enviadas
+            self.fallidas += fallidas
+            self.reintentos += reintentos
+            self._latencias_entrega.extend(latencias)
+            self._duraciones_lote.append(duracion)
+
+    def resumen(self):
+        with self._lock:
+            latencias = list(self._latencias_entrega)
+            duraciones = list(self._duraciones_lote)
+            datos = {
+                'avisos': self.avisos,
+                'lotes': self.lotes,
+                'reclamadas': self.reclamadas,
+                'enviadas': self.enviadas,
+                'fallidas': self.fallidas,
+                'reintentos': self.reintentos,
+                'reclamos_liberados': self.reclamos_liberados,
+            }
+
+        def en_ms(valor):
+            return round(valor * 1000, 1) if valor is not None else None
+
+        datos['latencia_entrega_ms'] = {
+            'p50': en_ms(_percentil(latencias, 50)),
+            'p95': en_ms(_percentil(latencias, 95)),
+            'max': en_ms(max(latencias) if latencias else None)
+        }
+        datos['duracion_lote_ms'] = {
+            'p50': en_ms(_percentil(duraciones, 50)),
+            'p95': en_ms(_percentil(duraciones, 95)),
+            'max': en_ms(max(duraciones) if duraciones else None)
+        }
+        return datos
+
+
+class DespachadorNotificaciones:
+    """Entrega notificaciones en background reclamándolas por lotes.
+
+    Cada worker reclama hasta ``tamano_lote`` notificaciones 'pendiente' con un
+    UPDATE condicional que las pasa a 'procesando' con un token propio; solo las
+    filas que el UPDATE alcanzó a cambiar son suyas, así que varios workers (y
+    varios procesos) pueden trabajar sobre la misma tabla sin duplicar envíos.
+    ``entregar_lote(notificaciones)`` devuelve los ids enviados y fallidos, y los
+    estados se actualizan con dos UPDATE en un solo commit.
+
+    Los workers duermen hasta que ``encolar`` los despierta o pasa
+    ``intervalo_barrido`` (reintentos). El primer worker de cada proceso, además,
+    busca pendientes cada ``intervalo_sondeo`` segundos (un SELECT con LIMIT
+    sobre el índice de estado): así llegan las notificaciones creadas por otros
+    procesos, que no pueden despertar a estos workers. Los reclamos de un worker
+    caído se liberan después de ``tiempo_reclamo`` segundos.
+
+    Si el proceso no tiene workers (modo web), ``encolar`` solo deja la fila
+    'pendiente' para el proceso que sí los tiene, que la entrega a más tardar
+    en ``intervalo_sondeo`` segundos; con ``en_linea`` (scripts, pruebas) la
+    entrega se hace en el momento.
+    """
+
+    def __init__(self, entregar_lote, workers=2, tamano_lote=100, intervalo_barrido=30, tiempo_reclamo=600,
+                 en_linea=True, intervalo_sondeo=1):
+        self.entregar_lote = entregar_lote
+        self.en_linea = en_linea
+        self.workers = workers
+        self.tamano_lote = tamano_lote
+        self.intervalo_barrido = intervalo_barrido
+        self.intervalo_sondeo = intervalo_sondeo
+        self.tiempo_reclamo = tiempo_reclamo
+        self.metricas = MetricasDespacho()
+        self.activo = False
+        self._app = None
+        self._hilos = []
+        self._ocupados = 0
+        self._lock = threading.Lock()
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._ultima_liberacion = 0.0
+
+    def configurar(self, workers=None, tamano_lote=None, intervalo_barrido=None, tiempo_reclamo=None,
+                   en_linea=None, intervalo_sondeo=None):
+        if workers is not None:
+            self.workers = workers
+        if tamano_lote is not None:
+            self.tamano_lote = tamano_lote
+        if intervalo_barrido is not None:
+            self.intervalo_barrido = intervalo_barrido
+        if tiempo_reclamo is not None:
+            self.tiempo_reclamo = tiempo_reclamo
+        if en_linea is not None:
+            self.en_linea = en_linea
+        if intervalo_sondeo is not None:
+            self.intervalo_sondeo = intervalo_sondeo
+
+    def iniciar(self, app):
+        """Inicia los workers (una sola vez por proceso)"""
+        if self.activo:
+            return
+        self._app = app
+        self._detener.clear()
+        self._hilos = [
+            threading.Thread(target=self._worker, args=(i == 0,), name=f'notificaciones-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+        self.activo = True
+        # Lo que haya quedado pendiente de un arranque anterior se procesa de inmediato
+        self._hay_trabajo.set()
+        logger.info(f"Despachador de notificaciones iniciado con {self.workers} workers "
+                    f"(lotes de {self.tamano_lote})")
+
+    def detener(self, timeout=5):
+        """Detiene los workers después de terminar el lote en curso"""
+        if not self.activo:
+            return
+        self._detener.set()
+        self._hay_trabajo.set()
+        for hilo in self._hilos:
+            hilo.join(timeout)
+        self.activo = False
+        logger.info("Despachador de notificaciones detenido")
+
+    def esperar(self, timeout=None, intervalo=0.1):
+        """Bloquea hasta que no quedan notificaciones pendientes ni workers ocupados"""
+        limite = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._app.app_context():
+                restantes = self.contar_por_estado().get('pendiente', 0)
+                db.session.remove()
+            with self._lock:
+                ocupados = self._ocupados
+            if not restantes and not ocupados:
+                return True
+            if limite is not None and time.monotonic() > limite:
+                return False
+            time.sleep(intervalo)
+
+    def contar_por_estado(self):
+        """Notificaciones 'pendiente' (con intentos disponibles) y 'procesando' en la base de datos"""
+        filas = db.session.query(Notificacion.estado, func.count(Notificacion.id)).filter(
+            Notificacion.estado.in_(['pendiente', 'procesando']),
+            Notificacion.intentos < Notificacion.max_intentos
+        ).group_by(Notificacion.estado).all()
+        return dict(filas)
+
+    def encolar(self, notificacion_id):
+        """Avisa a los workers que hay una notificación nueva, sin bloquear la petición"""
+        return self.encolar_lote([notificacion_id])
+
+    def encolar_lote(self, notificacion_ids):
+        """Como ``encolar`` para varias notificaciones ya guardadas"""
+        if not notificacion_ids:
+            return True
+        if self.activo:
+            self.metricas.incrementar('avisos')
+            self._hay_trabajo.set()
+        elif self.en_linea:
+            for inicio in range(0, len(notificacion_ids), self.tamano_lote):
+                self.procesar_lote(ids=notificacion_ids[inicio:inicio + self.tamano_lote])
+        return True
+
+    def _worker(self, sondea=False):
+        while not self._detener.is_set():
+            procesadas = 0
+            with self._lock:
+                self._ocupados += 1
+            try:
+                with self._app.app_context():
+                    procesadas = self.procesar_lote()
+                    if not procesadas:
+                        self._liberar_reclamos_vencidos()
+            except Exception as e:
+                logger.error(f"Error en worker de notificaciones: {e}")
+            finally:
+                with self._lock:
+                    self._ocupados -= 1
+
+            if procesadas:
+                if sondea:
+                    # Encontró trabajo de otro proceso: los demás workers ayudan con el resto
+                    self._hay_trabajo.set()
+                continue
+            self._hay_trabajo.wait(self.intervalo_sondeo if sondea else self.intervalo_barrido)
+            self._hay_trabajo.clear()
+
+    def _reclamar(self, ids=None):
+        """Pasa hasta ``tamano_lote`` notificaciones a 'procesando' y devuelve las reclamadas"""
+        for _ in range(3):
+            candidatos = select(Notificacion.id).where(
+                Notificacion.estado == 'pendiente',
+                Notificacion.intentos < Notificacion.max_intentos
+            ).order_by(Notificacion.id).limit(self.tamano_lote)
+            if ids is not None:
+                candidatos = candidatos.where(Notificacion.id.in_(ids))
+            candidatos = db.session.execute(candidatos).scalars().all()
+            if not candidatos:
+                db.session.rollback()
+                return None, []
+
+            token = uuid.uuid4().hex
+            # El WHERE estado = 'pendiente' hace que cada fila la gane un solo worker
+            resultado = db.session.execute(
+                update(Notificacion)
+                .where(Notificacion.id.in_(candidatos), Notificacion.estado == 'pendiente')
+                .values(estado='procesando', lote=token, fecha_reclamo=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            if resultado.rowcount:
+                return token, Notificacion.query.filter_by(lote=token).all()
+        return None, []
+
+    def procesar_lote(self, ids=None):
+        """Reclama, entrega y cierra un lote. Devuelve la cantidad de notificaciones reclamadas."""
+        token, notificaciones = self._reclamar(ids)
+        if not notificaciones:
+            return 0
+
+        inicio = time.perf_counter()
+        try:
+            enviadas, fallidas = self.entregar_lote(notificaciones)
+        except Exception as e:
+            logger.error(f"Error entregando lote de notificaciones: {e}")
+            db.session.rollback()
+            enviadas, fallidas = [], [n.id for n in notificaciones]
+        duracion = time.perf_counter() - inicio
+
+        ahora = datetime.utcnow()
+        creacion = {n.id: n.fecha_creacion for n in notificaciones}
+        reintentos = sum(1 for n in notificaciones if n.intentos)
+        enviadas = set(enviadas)
+        fallidas = set(fallidas) - enviadas
+        # Lo que entregar_lote no reportó se trata como fallido para no dejarlo reclamado
+        fallidas |= set(creacion) - enviadas
+
+        if enviadas:
+            db.session.execute(
+                update(Notificacion)
+                .where(Notificacion.id.in_(enviadas), Notificacion.lote == token)
+                .values(estado='enviado', fecha_envio=ahora, lote=None, fecha_reclamo=None)
+                .execution_options(synchronize_session=False)
+            )
+        if fallidas:
+            # estado va antes que intentos: MySQL evalúa el SET de izquierda a derecha
+            db.session.execute(
+                update(Notificacion)
+                .where(Notificacion.id.in_(fallidas), Notificacion.lote == token)
+                .ordered_values(
+                    (Notificacion.estado, case(
+                        (Notificacion.intentos + 1 >= Notificacion.max_intentos, 'fallido'),
+                        else_='pendiente'
+                    )),
+                    (Notificacion.intentos, Notificacion.intentos + 1),
+                    (Notificacion.lote, None),
+                    (Notificacion.fecha_reclamo, None)
+                )
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+
+        latencias = [(ahora - creacion[i]).total_seconds() for i in enviadas if creacion.get(i)]
+        self.metricas.registrar_lote(len(notificaciones), len(enviadas), len(fallidas),
+                                     reintentos, latencias, duracion)
+        if fallidas:
+            logger.warning(f"Lote de notificaciones: {len(enviadas)} enviadas, {len(fallidas)} fallidas")
+        return len(notificaciones)
+
+    def _liberar_reclamos_vencidos(self):
+        """Devuelve a 'pendiente' los lotes reclamados por un worker que no terminó"""
+        with self._lock:
+            if time.monotonic() - self._ultima_liberacion < self.intervalo_barrido:
+                return
+            self._ultima_liberacion = time.monotonic()
+
+        limite = datetime.utcnow() - timedelta(seconds=self.tiempo_reclamo)
+        resultado = db.session.execute(
+            update(Notificacion)
+            .where(Notificacion.estado == 'procesando', Notificacion.fecha_reclamo < limite)
+            .values(estado='pendiente', lote=None, fecha_reclamo=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if resultado.rowcount:
+            self.metricas.incrementar('reclamos_liberados', resultado.rowcount)
+            logger.warning(f"Se liberaron {resultado.rowcount} notificaciones con reclamo vencido")
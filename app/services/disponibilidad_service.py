@@ -0,0 +1,123 @@
+import logging
+from array import array
+from datetime import timedelta
+from sqlalchemy.orm import joinedload
+from app.models.reserva import Reserva
+
+logger = logging.getLogger(__name__)
+
+# Horario operativo de las canchas (slots de 1 hora de 6:00 a 22:00)
+HORA_APERTURA = 6
+HORA_CIERRE = 22
+HORAS_POR_DIA = HORA_CIERRE - HORA_APERTURA
+
+
+def rango_horas_reserva(hora_inicio, hora_fin):
+    """Retorna el rango [inicio, fin) de horas operativas que toca una reserva.
+
+    Un slot ``h`` se considera ocupado si la reserva se cruza con ``[h:00, h+1:00)``,
+    igual que el filtro ``HoraInicio < fin_slot AND HoraFin > inicio_slot``.
+    """
+    inicio = hora_inicio.hour
+    fin = hora_fin.hour + (1 if (hora_fin.minute or hora_fin.second) else 0)
+    return max(inicio, HORA_APERTURA), min(fin, HORA_CIERRE)
+
+
+class GrillaDisponibilidad:
+    """Rasteriza reservas en un arreglo compacto de slots por cancha.
+
+    Cada cancha tiene un ``array('I')`` de ``dias * HORAS_POR_DIA`` posiciones;
+    0 indica slot libre y ``n`` indica que el slot está ocupado por la reserva
+    ``reservas[n - 1]``.
+    """
+
+    def __init__(self, cancha_ids, fecha_inicio, dias):
+        self.fecha_inicio = fecha_inicio
+        self.dias = dias
+        self.reservas = []
+        self.slots = {
+            cancha_id: array('I', bytes(4 * dias * HORAS_POR_DIA))
+            for cancha_id in cancha_ids
+        }
+
+    def ocupar(self, reserva):
+        """Marca los slots de una reserva (el primer ocupante de un slot se conserva)"""
+        slots = self.slots.get(reserva.CanchaId)
+        if slots is None:
+            return
+
+        dia = (reserva.Fecha - self.fecha_inicio).days
+        if dia < 0 or dia >= self.dias:
+            return
+
+        inicio, fin = rango_horas_reserva(reserva.HoraInicio, reserva.HoraFin)
+        if fin <= inicio:
+            return
+
+        self.reservas.append(reserva)
+        marca = len(self.reservas)
+        base = dia * HORAS_POR_DIA - HORA_APERTURA
+        for hora in range(inicio, fin):
+            if not slots[base + hora]:
+                slots[base + hora] = marca
+
+    def reserva_en(self, cancha_id, dia, hora):
+        """Retorna la reserva que ocupa el slot o None si está libre"""
+        marca = self.slots[cancha_id][dia * HORAS_POR_DIA + hora - HORA_APERTURA]
+        return self.reservas[marca - 1] if marca else None
+
+
+class DisponibilidadService:
+    def cargar_grilla(self, cancha_ids, fecha_inicio, fecha_fin):
+        """Carga en una sola consulta las reservas confirmadas del rango y las rasteriza"""
+        dias = (fecha_fin - fecha_inicio).days + 1
+        grilla = GrillaDisponibilidad(cancha_ids, fecha_inicio, dias)
+        if not cancha_ids or dias <= 0:
+            return grilla
+
+        reservas = Reserva.query.options(
+            joinedload(Reserva.usuario)
+        ).filter(
+            Reserva.CanchaId.in_(cancha_ids),
+            Reserva.Estado == 'Confirmada',
+            Reserva.Fecha >= fecha_inicio,
+            Reserva.Fecha <= fecha_fin
+        ).order_by(Reserva.Fecha, Reserva.HoraInicio, Reserva.Id).all()
+
+        for reserva in reservas:
+            grilla.ocupar(reserva)
+
+        logger.debug(f"Grilla de disponibilidad: {len(cancha_ids)} canchas, {dias} días, {len(reservas)} reservas")
+        return grilla
+
+    def disponibilidad_mensual(self, canchas, fecha_inicio, fecha_fin):
+        """Genera la lista de slots (disponible/ocupado) por cancha, día y hora"""
+        grilla = self.cargar_grilla([cancha.Id for cancha in canchas], fecha_inicio, fecha_fin)
+
+        # Textos precalculados: no dependen de la cancha
+        horas = [(hora, f"{hora:02d}:00", f"{hora + 1:02d}:00") for hora in range(HORA_APERTURA, HORA_CIERRE)]
+        fechas = []
+        for dia in range(grilla.dias):
+            fecha = fecha_inicio + timedelta(days=dia)
+            fechas.append((dia, fecha.strftime('%Y-%m-%d'), fecha.strftime('%d/%m/%Y')))
+
+        disponibilidad = []
+        for cancha in canchas:
+            for dia, fecha_iso, fecha_formateada in fechas:
+                for hora, hora_inicio, hora_fin in horas:
+                    reserva = grilla.reserva_en(cancha.Id, dia, hora)
+                    disponibilidad.append({
+                        'cancha_id': cancha.Id,
+                        'cancha_nombre': cancha.Nombre,
+                        'fecha': fecha_iso,
+                        'fecha_formateada': fecha_formateada,
+                        'hora_inicio': hora_inicio,
+                        'hora_fin': hora_fin,
+                        'estado': 'ocupado' if reserva else 'disponible',
+                        'cliente': reserva.usuario.Nombre if reserva else None
+                    })
+
+        return disponibilidad
+
+# Instancia global del servicio
+disponibilidad_service = DisponibilidadService()
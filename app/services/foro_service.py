@@ -0,0 +1,200 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from flask import get_template_attribute
+from sqlalchemy import delete, event, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import ComentarioForo, Like, Post
+
+logger = logging.getLogger(__name__)
+
+# Macros con las partes de la tarjeta de un post que no dependen del usuario
+PLANTILLA_TARJETA = 'foro/_tarjeta_post.html'
+PARTES_TARJETA = ('cabecera', 'cuerpo')
+
+
+class ForoService:
+    """Likes y comentarios del foro con los contadores de ``Post``.
+
+    ``Post.TotalLikes`` y ``Post.TotalComentarios`` (comentarios activos) se
+    actualizan en la misma transacción que el like o el comentario con
+    ``UPDATE posts SET Total = Total + delta``: dos peticiones simultáneas no
+    se pisan el valor. Los cambios de estado de un comentario (eliminar,
+    ocultar, reactivar) ajustan el contador solo si entra o sale de 'Activo'.
+
+    El listado del foro reutiliza el HTML de cada tarjeta (título, autor,
+    texto y multimedia) mientras no cambien ``FechaActualizacion`` del post, el
+    nombre del autor ni el contenido de su imagen o video; likes, comentarios y las acciones del usuario se
+    renderizan en cada petición. Las categorías del filtro se guardan
+    ``FORO_CATEGORIAS_TTL`` segundos y se descartan cuando una sesión confirma
+    posts nuevos, borrados o con otra categoría. Ambas cachés son de cada
+    proceso.
+    """
+
+    def __init__(self):
+        self.max_fragmentos = 2000
+        self.ttl_categorias = 300
+        self._lock = threading.Lock()
+        # post_id -> (firma, partes renderizadas)
+        self._fragmentos = OrderedDict()
+        self._categorias = None
+        self._vencen_categorias = 0.0
+        self._version_categorias = 0
+
+    def init_app(self, app):
+        self.max_fragmentos = app.config.get('FORO_FRAGMENTOS_MAX', 2000)
+        self.ttl_categorias = app.config.get('FORO_CATEGORIAS_TTL', 300)
+        if not event.contains(db.session, 'after_flush', self._despues_flush):
+            event.listen(db.session, 'after_flush', self._despues_flush)
+            event.listen(db.session, 'do_orm_execute', self._sentencia_orm)
+            event.listen(db.session, 'after_commit', self._despues_commit)
+            event.listen(db.session, 'after_soft_rollback', self._despues_rollback)
+
+    def _sumar(self, columna, post_id, delta):
+        if delta:
+            # Sin tocar FechaActualizacion (onupdate): un like no es una edición ni invalida la tarjeta
+            db.session.execute(
+                update(Post).where(Post.Id == post_id)
+                .values({columna: columna + delta, Post.FechaActualizacion: Post.FechaActualizacion})
+                .execution_options(synchronize_session=False, foro_contador=True)
+            )
+
+    def alternar_like(self, post_id, usuario_id):
+        """Pone o quita el like del usuario; devuelve (le_gusta, total_likes)"""
+        quitados = db.session.execute(
+            delete(Like).where(Like.PostId == post_id, Like.UsuarioId == usuario_id)
+        ).rowcount
+        if quitados:
+            self._sumar(Post.TotalLikes, post_id, -quitados)
+        else:
+            try:
+                db.session.add(Like(UsuarioId=usuario_id, PostId=post_id))
+                db.session.flush()
+                self._sumar(Post.TotalLikes, post_id, 1)
+            except IntegrityError:
+                # Doble clic: otra petición ya agregó el like (índice único usuario-post)
+                db.session.rollback()
+                logger.debug(f"Like duplicado del usuario {usuario_id} en el post {post_id}")
+        total = db.session.scalar(select(Post.TotalLikes).where(Post.Id == post_id))
+        db.session.commit()
+        return not quitados, total
+
+    def comentar(self, post_id, usuario_id, contenido):
+        comentario = ComentarioForo(Contenido=contenido, UsuarioId=usuario_id, PostId=post_id)
+        db.session.add(comentario)
+        self._sumar(Post.TotalComentarios, post_id, 1)
+        db.session.commit()
+        return comentario
+
+    def cambiar_estado_comentario(self, comentario, nuevo_estado):
+        """Cambia el estado si nadie lo cambió desde que se leyó el comentario; devuelve si lo cambió"""
+        anterior = comentario.Estado
+        # UPDATE condicional: de dos moderadores simultáneos solo uno ajusta el contador
+        cambiados = db.session.execute(
+            update(ComentarioForo)
+            .where(ComentarioForo.Id == comentario.Id, ComentarioForo.Estado.isnot_distinct_from(anterior))
+            .values(Estado=nuevo_estado)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if cambiados:
+            self._sumar(Post.TotalComentarios, comentario.PostId, (nuevo_estado == 'Activo') - (anterior == 'Activo'))
+        db.session.commit()
+        return bool(cambiados)
+
+    def eliminar_comentario(self, comentario):
+        """Borra el comentario de la base de datos (el contador solo baja si estaba activo al borrarlo)"""
+        activos = db.session.execute(
+            delete(ComentarioForo).where(ComentarioForo.Id == comentario.Id, ComentarioForo.Estado == 'Activo')
+        ).rowcount
+        if activos:
+            self._sumar(Post.TotalComentarios, comentario.PostId, -activos)
+        else:
+            db.session.execute(delete(ComentarioForo).where(ComentarioForo.Id == comentario.Id))
+        db.session.commit()
+
+    def marcar_likes(self, posts, usuario_id):
+        """Precarga ``post.is_liked_by(usuario_id)`` de todos los posts con una consulta"""
+        if not posts:
+            return posts
+        con_like = set(db.session.scalars(
+            select(Like.PostId).where(Like.UsuarioId == usuario_id, Like.PostId.in_([post.Id for post in posts]))
+        ))
+        for post in posts:
+            if not hasattr(post, '_likes_usuario'):
+                post._likes_usuario = {}
+            post._likes_usuario[usuario_id] = post.Id in con_like
+        return posts
+
+    # ---------------------- Tarjetas del listado ----------------------
+    def fragmentos(self, post):
+        """HTML de las partes fijas de la tarjeta del post (``PARTES_TARJETA``), desde la caché si sigue vigente"""
+        from app.services.archivos_service import archivos_service
+
+        # Las URL de la imagen y el video llevan la versión del contenido (?v=): un archivo
+        # reemplazado con el mismo nombre no cambia ninguna columna pero sí la tarjeta
+        firma = (post.FechaActualizacion, post.usuario.Nombre,
+                 *(archivos_service.version(archivos_service.ruta_subida(ruta)) if ruta else None
+                   for ruta in (post.Imagen, post.Video)))
+        with self._lock:
+            guardado = self._fragmentos.get(post.Id)
+            if guardado is not None and guardado[0] == firma:
+                self._fragmentos.move_to_end(post.Id)
+                return guardado[1]
+
+        partes = {parte: get_template_attribute(PLANTILLA_TARJETA, parte)(post) for parte in PARTES_TARJETA}
+        with self._lock:
+            self._fragmentos[post.Id] = (firma, partes)
+            self._fragmentos.move_to_end(post.Id)
+            while len(self._fragmentos) > self.max_fragmentos:
+                self._fragmentos.popitem(last=False)
+        return partes
+
+    # ---------------------- Categorías ----------------------
+    def categorias(self):
+        """Categorías con algún post, para el filtro del foro"""
+        with self._lock:
+            if self._categorias is not None and time.monotonic() < self._vencen_categorias:
+                return self._categorias
+            version = self._version_categorias
+
+        categorias = [categoria for categoria in db.session.scalars(
+            select(Post.Categoria).distinct().order_by(Post.Categoria)
+        ) if categoria]
+        with self._lock:
+            if version == self._version_categorias:
+                self._categorias = categorias
+                self._vencen_categorias = time.monotonic() + self.ttl_categorias
+        return categorias
+
+    def _despues_flush(self, session, flush_context):
+        if session.info.get('foro_categorias'):
+            return
+        for post in (*session.new, *session.deleted):
+            if isinstance(post, Post):
+                session.info['foro_categorias'] = True
+                return
+        for post in session.dirty:
+            if isinstance(post, Post) and inspect(post).attrs.Categoria.history.has_changes():
+                session.info['foro_categorias'] = True
+                return
+
+    def _sentencia_orm(self, estado):
+        if (estado.is_insert or estado.is_delete or estado.is_update) and estado.bind_mapper is not None:
+            # Los contadores (_sumar) son UPDATE masivos de posts que no cambian la categoría
+            if estado.bind_mapper.class_ is Post and not estado.execution_options.get('foro_contador'):
+                estado.session.info['foro_categorias'] = True
+
+    def _despues_commit(self, session):
+        if session.info.pop('foro_categorias', False):
+            with self._lock:
+                self._categorias = None
+                self._version_categorias += 1
+
+    def _despues_rollback(self, session, transaccion_anterior):
+        if transaccion_anterior.parent is None:
+            session.info.pop('foro_categorias', None)
+
+# Instancia global del servicio
+foro_service = ForoService()
@@ -0,0 +1,279 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from flask import abort, request, url_for
+from werkzeug.security import safe_join
+from app.services.archivos_service import archivos_service
+
+logger = logging.getLogger(__name__)
+
+# Imágenes subidas (rutas relativas a static) que tienen variantes; los GIF se sirven
+# siempre originales para no perder la animación
+DIRECTORIO_SUBIDAS = 'uploads'
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png', '.webp')
+# Extensión de la variante -> (formato de Pillow, tipo MIME)
+FORMATOS_VARIANTE = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+
+
+class ImagenService:
+    """Variantes redimensionadas de las imágenes subidas (canchas, perfiles, foro).
+
+    Por cada imagen de ``static/uploads`` se generan versiones de los anchos de
+    ``IMAGENES_ANCHOS`` en WebP y JPEG (nunca más grandes que el original) en
+    ``IMAGENES_DIRECTORIO``. Las plantillas piden la imagen con
+    ``imagen_url(ruta, ancho)`` o ``imagen_srcset(ruta)`` y la ruta
+    ``/imagenes/<ancho>/<ruta>`` entrega el WebP si el navegador lo acepta y si
+    no el JPEG; mientras la variante no exista entrega el original. Las URL
+    llevan la versión del original y la calidad (``?v=``) y se entregan con
+    ``archivos_service`` (inmutables, 304 con ETag, X-Accel-Redirect).
+
+    Las variantes se generan en los workers de este servicio: al subir una
+    imagen se encola, y cada ``IMAGENES_INTERVALO_BARRIDO`` segundos se buscan
+    originales sin variantes o más nuevos que ellas (subidos en un proceso web,
+    reemplazados con el mismo nombre). Con ``IMAGENES_ASINCRONAS = False``
+    (pruebas, scripts) se generan en el momento. Para las imágenes que ya
+    existían: ``python generar_variantes_imagenes.py``.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.directorio = None
+        self.raiz_static = None
+        self.anchos = (160, 480, 960, 1600)
+        self.calidad = 80
+        self.max_age = 86400
+        self.workers = 1
+        self.intervalo_barrido = 300
+        self.en_linea = True
+        self.activo = False
+        self._hilos = []
+        self._cola = queue.Queue()
+        self._encoladas = set()
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._ultimo_barrido = 0.0
+
+    def init_app(self, app):
+        """Lee la configuración y registra la ruta y las funciones de plantilla; no inicia hilos"""
+        self.app = app
+        self.directorio = app.config.get('IMAGENES_DIRECTORIO') or os.path.join(app.instance_path, 'imagenes')
+        self.raiz_static = app.static_folder
+        self.anchos = tuple(sorted(app.config.get('IMAGENES_ANCHOS', self.anchos)))
+        self.calidad = app.config.get('IMAGENES_CALIDAD', 80)
+        self.max_age = app.config.get('IMAGENES_MAX_AGE', 86400)
+        self.workers = app.config.get('IMAGENES_WORKERS', 1)
+        self.intervalo_barrido = app.config.get('IMAGENES_INTERVALO_BARRIDO', 300)
+        self.en_linea = not app.config.get('IMAGENES_ASINCRONAS', True)
+
+        archivos_service.registrar_raiz('imagenes', self.directorio)
+        app.add_url_rule('/imagenes/<int:ancho>/<path:ruta>', 'imagen_variante', self.servir)
+        app.add_template_global(self.url, 'imagen_url')
+        app.add_template_global(self.srcset, 'imagen_srcset')
+
+    def iniciar(self, app):
+        """Inicia los workers de imágenes en este proceso (una sola vez)"""
+        if self.activo or self.en_linea:
+            return
+        self.app = app
+        self._detener.clear()
+        self._hilos = [
+            threading.Thread(target=self._worker, name=f'imagenes-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+        self.activo = True
+        logger.info(f"Workers de imágenes iniciados ({self.workers}), variantes en {self.directorio}")
+
+    def detener(self, timeout=5):
+        if not self.activo:
+            return
+        self._detener.set()
+        for _ in self._hilos:
+            self._cola.put(None)
+        for hilo in self._hilos:
+            hilo.join(timeout)
+        self.activo = False
+        logger.info("Workers de imágenes detenidos")
+
+    # ---------------------- Rutas de archivos ----------------------
+    def es_imagen(self, ruta):
+        return bool(ruta) and ruta.startswith(DIRECTORIO_SUBIDAS + '/') and ruta.lower().endswith(EXTENSIONES_IMAGEN)
+
+    def ruta_original(self, ruta):
+        return safe_join(self.raiz_static, ruta)
+
+    def ruta_variante(self, ruta, ancho, extension):
+        return safe_join(self.directorio, f"{os.path.splitext(ruta)[0]}.{ancho}.{extension}")
+
+    def al_dia(self, ruta):
+        """Todas las variantes existen y no son más viejas que el original"""
+        try:
+            modificado = os.path.getmtime(self.ruta_original(ruta))
+            return all(os.path.getmtime(self.ruta_variante(ruta, ancho, extension)) >= modificado
+                       for ancho in self.anchos for extension in FORMATOS_VARIANTE)
+        except OSError:
+            return False
+
+    def pendientes(self, todas=False):
+        """Rutas (relativas a static) de las imágenes subidas sin variantes al día, o todas"""
+        for carpeta, _, archivos in os.walk(os.path.join(self.raiz_static, DIRECTORIO_SUBIDAS)):
+            relativa = os.path.relpath(carpeta, self.raiz_static).replace(os.sep, '/')
+            for archivo in archivos:
+                ruta = f"{relativa}/{archivo}"
+                if self.es_imagen(ruta) and (todas or not self.al_dia(ruta)):
+                    yield ruta
+
+    # ---------------------- Generación ----------------------
+    def generar(self, ruta):
+        """Genera las variantes de una imagen subida; devuelve cuántos archivos escribió"""
+        from PIL import Image, ImageOps
+
+        origen = self.ruta_original(ruta)
+        with Image.open(origen) as imagen:
+            # JPEG: decodificar ya reducido (1/2, 1/4, 1/8) cuando el ancho mayor lo permite
+            imagen.draft('RGB', (self.anchos[-1], self.anchos[-1]))
+            imagen = ImageOps.exif_transpose(imagen)
+            if imagen.mode not in ('RGB', 'RGBA'):
+                imagen = imagen.convert('RGBA' if 'transparency' in imagen.info or imagen.mode in ('LA', 'PA') else 'RGB')
+
+            escritos = 0
+            # Del ancho mayor al menor: cada variante se reduce desde la anterior
+            actual = imagen
+            for ancho in reversed(self.anchos):
+                if actual.width > ancho:
+                    alto = max(1, round(actual.height * ancho / actual.width))
+                    actual = actual.resize((ancho, alto), Image.Resampling.LANCZOS, reducing_gap=3.0)
+                for extension, (formato, _) in FORMATOS_VARIANTE.items():
+                    self._guardar(actual, self.ruta_variante(ruta, ancho, extension), formato)
+                    escritos += 1
+        return escritos
+
+    def _guardar(self, imagen, destino, formato):
+        from PIL import Image
+
+        # Se escribe a un temporal y se renombra para no servir nunca una variante a medias
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporal = f"{destino}.{uuid.uuid4().hex[:8]}.tmp"
+        if formato == 'JPEG':
+            if imagen.mode == 'RGBA':
+                # JPEG no tiene transparencia: fondo blanco como en las tarjetas
+                fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+                fondo.paste(imagen, mask=imagen.getchannel('A'))
+                imagen = fondo
+            imagen.save(temporal, formato, quality=self.calidad, optimize=True, progressive=True)
+        else:
+            imagen.save(temporal, formato, quality=self.calidad, method=4)
+        os.replace(temporal, destino)
+
+    def _generar_seguro(self, ruta):
+        inicio = time.perf_counter()
+        try:
+            escritos = self.generar(ruta)
+            logger.info(f"Variantes de {ruta}: {escritos} archivos en {time.perf_counter() - inicio:.2f}s")
+            return True
+        except FileNotFoundError:
+            logger.warning(f"La imagen {ruta} ya no existe")
+        except Exception as e:
+            logger.error(f"Error generando las variantes de {ruta}: {e}")
+        return False
+
+    def encolar(self, ruta):
+        """Pide las variantes de una imagen recién subida (no hace nada si no es una imagen de uploads)"""
+        if not self.es_imagen(ruta):
+            return
+        if self.en_linea:
+            self._generar_seguro(ruta)
+            return
+        if not self.activo:
+            # Proceso web sin workers: el barrido del proceso worker la encuentra
+            return
+        with self._lock:
+            if ruta in self._encoladas:
+                return
+            self._encoladas.add(ruta)
+        self._cola.put(ruta)
+
+    def _worker(self):
+        while not self._detener.is_set():
+            try:
+                ruta = self._cola.get(timeout=self.intervalo_barrido)
+            except queue.Empty:
+                self._barrido()
+                continue
+            if ruta is None:
+                return
+            with self._lock:
+                self._encoladas.discard(ruta)
+            self._generar_seguro(ruta)
+
+    def _barrido(self):
+        """Encola los originales sin variantes al día (a lo sumo un worker a la vez)"""
+        with self._lock:
+            if time.monotonic() - self._ultimo_barrido < self.intervalo_barrido:
+                return
+            self._ultimo_barrido = time.monotonic()
+        try:
+            for ruta in self.pendientes():
+                self.encolar(ruta)
+        except Exception as e:
+            logger.error(f"Error buscando imágenes sin variantes: {e}")
+
+    # ---------------------- Entrega ----------------------
+    def ancho_variante(self, ancho):
+        """El menor ancho configurado que cubre ``ancho`` (o el mayor)"""
+        return next((configurado for configurado in self.anchos if configurado >= ancho), self.anchos[-1])
+
+    def version(self, ruta):
+        """Versión de las variantes de ``ruta``: la del contenido del original y la calidad"""
+        original = archivos_service.version(self.ruta_original(ruta))
+        return f"{original}.{self.calidad}" if original else None
+
+    def _parametros(self, ruta):
+        version = self.version(ruta)
+        return {'ruta': ruta, 'v': version} if version else {'ruta': ruta}
+
+    def url(self, ruta, ancho):
+        """URL de la variante de ``ruta`` para mostrarla a ``ancho`` píxeles; el original si no es una imagen subida"""
+        if not self.es_imagen(ruta):
+            return url_for('static', filename=ruta) if ruta else ''
+        return url_for('imagen_variante', ancho=self.ancho_variante(ancho), **self._parametros(ruta))
+
+    def srcset(self, ruta):
+        """Valor de ``srcset`` con todas las variantes de ``ruta``"""
+        if not self.es_imagen(ruta):
+            return ''
+        parametros = self._parametros(ruta)
+        return ', '.join(f"{url_for('imagen_variante', ancho=ancho, **parametros)} {ancho}w" for ancho in self.anchos)
+
+    def servir(self, ancho, ruta):
+        if ancho not in self.anchos or not self.es_imagen(ruta):
+            abort(404)
+        # Solo si lo anuncia explícitamente (los navegadores con WebP lo hacen); */* no basta
+        extension = 'webp' if any(tipo == 'image/webp' for tipo, _ in request.accept_mimetypes) else 'jpg'
+        variante = self.ruta_variante(ruta, ancho, extension)
+        original = self.ruta_original(ruta)
+        try:
+            al_dia = os.path.getmtime(variante) >= os.path.getmtime(original)
+        except (OSError, TypeError):
+            al_dia = False
+        if al_dia:
+            respuesta = archivos_service.enviar(variante, mimetype=FORMATOS_VARIANTE[extension][1],
+                                                version=self.version(ruta), max_age=self.max_age)
+        else:
+            if not original or not os.path.isfile(original):
+                abort(404)
+            self.encolar(ruta)
+            # Nunca inmutable: la próxima vez puede estar la variante (o la del original nuevo)
+            respuesta = archivos_service.enviar(original, version='')
+        respuesta.vary.add('Accept')
+        return respuesta
+
+# Instancia global del servicio
+imagen_service = ImagenService()
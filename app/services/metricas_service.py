@@ -0,0 +1,201 @@
+import logging
+import os
+import time
+from flask import Response, current_app, g, request
+from sqlalchemy import column, event, func, table
+
+logger = logging.getLogger(__name__)
+
+# Endpoints sin blueprint (archivos estáticos, imágenes subidas) o sin ruta (404)
+ENDPOINT_DESCONOCIDO = 'ninguno'
+# Espera de una conexión del pool: casi siempre sub-milisegundo; los buckets altos indican pool agotado
+BUCKETS_ESPERA_POOL = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_tabla_tareas = table('apscheduler_jobs', column('next_run_time'))
+
+
+class ColectorEstado:
+    """Gauges que se leen de la base de datos en cada scrape.
+
+    Son valores del despliegue (no de cada proceso): cola de notificaciones y
+    tareas del planificador, compartidas en la base de datos por todos los
+    workers. Se calculan en el proceso que atiende ``/metrics``.
+    """
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+        from app import db
+        from app.services.notificacion_service import notificacion_service
+
+        cola = GaugeMetricFamily('flash_notificaciones_en_cola',
+                                 'Notificaciones por entregar en la base de datos', labels=['estado'])
+        try:
+            por_estado = notificacion_service.despachador.contar_por_estado()
+            for estado in ('pendiente', 'procesando'):
+                cola.add_metric([estado], por_estado.get(estado, 0))
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error contando la cola de notificaciones: {e}")
+        yield cola
+
+        tareas = GaugeMetricFamily('flash_planificador_tareas', 'Tareas programadas en el job store')
+        retraso = GaugeMetricFamily('flash_planificador_retraso_segundos',
+                                    'Retraso de la tarea más atrasada (0 si ninguna está vencida)')
+        try:
+            total, proxima = db.session.query(
+                func.count(), func.min(_tabla_tareas.c.next_run_time)
+            ).select_from(_tabla_tareas).one()
+            tareas.add_metric([], total)
+            retraso.add_metric([], max(0.0, time.time() - proxima) if proxima is not None else 0.0)
+        except Exception:
+            # Sin job store (SCHEDULER_MODO='desactivado' o el planificador nunca arrancó)
+            db.session.rollback()
+        yield tareas
+        yield retraso
+
+
+class MetricasService:
+    """Métricas de Prometheus de las peticiones y del pool de la base de datos.
+
+    Por cada endpoint (``client.*``, ``admin.*``, ``foro.*``, ``auth.*``...):
+    histograma de latencia, peticiones por código de estado y peticiones en
+    curso. Del pool: conexiones en uso y espera para obtener una. Se exponen
+    en ``/metrics`` junto a los gauges de ``ColectorEstado``.
+
+    Con gunicorn cada worker es un proceso con sus propios contadores: si está
+    definido ``METRICAS_DIRECTORIO`` (``PROMETHEUS_MULTIPROC_DIR``) los valores
+    se escriben en archivos mapeados en memoria de ese directorio y el scrape
+    los suma entre todos los workers (ver ``gunicorn.conf.py``). Debe
+    definirse antes de crear la app y vaciarse al reiniciar el servidor.
+
+    ``prometheus_client`` es opcional: sin él no se registran métricas y
+    ``/metrics`` responde 503.
+    """
+
+    def __init__(self):
+        self.activo = False
+        self.multiproceso = False
+        self.token = None
+        self.peticiones = None
+        self.duracion = None
+        self.en_curso = None
+        self.conexiones_en_uso = None
+        self.espera_conexion = None
+
+    def init_app(self, app):
+        self.token = app.config.get('METRICAS_TOKEN')
+        app.add_url_rule('/metrics', 'metricas', self.exponer)
+        if not app.config.get('METRICAS_ACTIVAS', True):
+            return
+
+        directorio = app.config.get('METRICAS_DIRECTORIO')
+        if directorio:
+            # prometheus_client elige el almacenamiento de los valores al importarse
+            os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', directorio)
+            os.makedirs(directorio, exist_ok=True)
+        try:
+            self._crear_metricas()
+        except ImportError:
+            logger.warning("prometheus_client no está instalado: métricas desactivadas")
+            return
+        self.multiproceso = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+        self.activo = True
+
+        app.before_request(self._inicio_peticion)
+        app.after_request(self._fin_respuesta)
+        app.teardown_request(self._fin_peticion)
+        with app.app_context():
+            from app import db
+            engines = list(db.engines.values())
+        for engine in engines:
+            self._instrumentar_pool(engine)
+
+    def _crear_metricas(self):
+        from prometheus_client import Counter, Gauge, Histogram
+
+        # Una sola vez por proceso aunque se creen varias apps (los nombres son globales)
+        if self.peticiones is not None:
+            return
+        self.peticiones = Counter('flash_peticiones_total', 'Peticiones atendidas',
+                                  ['endpoint', 'metodo', 'estado'])
+        self.duracion = Histogram('flash_peticion_duracion_segundos', 'Duración de las peticiones',
+                                  ['endpoint', 'metodo'])
+        self.en_curso = Gauge('flash_peticiones_en_curso', 'Peticiones en curso', ['endpoint'],
+                              multiprocess_mode='livesum')
+        self.conexiones_en_uso = Gauge('flash_bd_conexiones_en_uso', 'Conexiones del pool en uso',
+                                       multiprocess_mode='livesum')
+        self.espera_conexion = Histogram('flash_bd_espera_conexion_segundos',
+                                         'Tiempo para obtener una conexión del pool (incluye abrirla)',
+                                         buckets=BUCKETS_ESPERA_POOL)
+
+    # ---------------------- Peticiones ----------------------
+    def _inicio_peticion(self):
+        g.metricas_inicio = time.perf_counter()
+        g.metricas_endpoint = request.endpoint or ENDPOINT_DESCONOCIDO
+        self.en_curso.labels(g.metricas_endpoint).inc()
+
+    def _fin_respuesta(self, response):
+        g.metricas_estado = response.status_code
+        return response
+
+    def _fin_peticion(self, error=None):
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is None:
+            return
+        endpoint = g.pop('metricas_endpoint')
+        # Sin respuesta registrada la petición terminó con una excepción no manejada
+        estado = g.pop('metricas_estado', 500)
+        self.en_curso.labels(endpoint).dec()
+        self.duracion.labels(endpoint, request.method).observe(time.perf_counter() - inicio)
+        self.peticiones.labels(endpoint, request.method, str(estado)).inc()
+
+    # ---------------------- Pool de conexiones ----------------------
+    def _instrumentar_pool(self, engine):
+        if event.contains(engine, 'engine_disposed', self._medir_espera):
+            return
+        # Los eventos del pool se conservan cuando engine.dispose() lo reemplaza; el envoltorio de connect no
+        event.listen(engine.pool, 'checkout', lambda *_: self.conexiones_en_uso.inc())
+        event.listen(engine.pool, 'checkin', lambda *_: self.conexiones_en_uso.dec())
+        event.listen(engine, 'engine_disposed', self._medir_espera)
+        self._medir_espera(engine)
+
+    def _medir_espera(self, engine):
+        pool = engine.pool
+        conectar = pool.connect
+
+        def connect():
+            inicio = time.perf_counter()
+            try:
+                return conectar()
+            finally:
+                self.espera_conexion.observe(time.perf_counter() - inicio)
+
+        pool.connect = connect
+
+    # ---------------------- Exposición ----------------------
+    def exponer(self):
+        """Formato de texto de Prometheus con las métricas de todos los workers"""
+        if self.token and request.headers.get('Authorization') != f'Bearer {self.token}':
+            return Response('No autorizado\n', status=401, mimetype='text/plain')
+        if not self.activo:
+            return Response('Métricas desactivadas\n', status=503, mimetype='text/plain')
+
+        from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+        from prometheus_client import multiprocess
+
+        if self.multiproceso:
+            procesos = CollectorRegistry()
+            multiprocess.MultiProcessCollector(procesos)
+        else:
+            procesos = REGISTRY
+        estado = CollectorRegistry()
+        estado.register(ColectorEstado())
+        try:
+            salida = generate_latest(procesos) + generate_latest(estado)
+        except Exception as e:
+            current_app.logger.error(f"Error generando las métricas: {e}")
+            return Response('Error generando las métricas\n', status=500, mimetype='text/plain')
+        return Response(salida, content_type=CONTENT_TYPE_LATEST)
+
+# Instancia global del servicio
+metricas_service = MetricasService()
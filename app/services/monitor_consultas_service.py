@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import g, has_request_context
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Consultas lentas recientes que se conservan para la página de admin
+MAX_LENTAS_RECIENTES = 50
+# Frames de la app que se muestran como origen de una consulta
+FRAMES_ORIGEN = 3
+# Envoltorios que no dicen nada del origen (decoradores de acceso)
+ARCHIVOS_OMITIDOS = (os.path.join('auth', 'decorators.py'),)
+
+_LITERALES = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%\(\w+\)s|%s|(?<!:):\w+\b'), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    # Listas de IN y filas de VALUES de cualquier largo
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),
+    (re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+'), '(?)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def normalizar_sentencia(sentencia):
+    """Sentencia sin literales ni parámetros: la misma consulta con otros valores da el mismo texto"""
+    for patron, reemplazo in _LITERALES:
+        sentencia = patron.sub(reemplazo, sentencia)
+    return sentencia.strip()
+
+
+def huella_sentencia(normalizada):
+    return hashlib.sha1(normalizada.encode('utf-8')).hexdigest()[:12]
+
+
+class MonitorConsultas:
+    """Instrumentación de las consultas SQL de cada proceso.
+
+    Escucha ``before/after_cursor_execute`` de los engines de la app y:
+
+    - acumula por petición el número de consultas y el tiempo en la base de
+      datos; con ``CONSULTAS_CABECERAS`` se devuelven en ``X-Query-Count`` y
+      ``Server-Timing``;
+    - agrupa las sentencias por huella (el texto sin literales) con llamadas,
+      tiempo total y máximo, desde que arrancó el proceso;
+    - registra en el log las consultas que superan ``CONSULTAS_LENTAS_MS``
+      con su huella y el código de la app que las lanzó.
+
+    Las estadísticas son de cada proceso y se pierden al reiniciarlo.
+    """
+
+    def __init__(self):
+        self.activo = False
+        self.cabeceras = False
+        self.umbral_lenta = 0.1
+        self.max_huellas = 500
+        self.raiz_app = None
+        self.desde = datetime.now()
+        self.huellas_descartadas = 0
+        self._lock = threading.Lock()
+        # huella -> estadísticas de la sentencia
+        self._huellas = {}
+        self._lentas = deque(maxlen=MAX_LENTAS_RECIENTES)
+
+    def init_app(self, app):
+        """Escucha los engines de la app; no abre conexiones"""
+        from app import db
+
+        self.activo = app.config.get('CONSULTAS_INSTRUMENTACION', True)
+        self.cabeceras = app.config.get('CONSULTAS_CABECERAS', False)
+        self.umbral_lenta = app.config.get('CONSULTAS_LENTAS_MS', 100) / 1000
+        self.max_huellas = app.config.get('CONSULTAS_MAX_HUELLAS', 500)
+        self.raiz_app = app.root_path + os.sep
+        if not self.activo:
+            return
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            if not event.contains(engine, 'before_cursor_execute', self._antes):
+                event.listen(engine, 'before_cursor_execute', self._antes)
+                event.listen(engine, 'after_cursor_execute', self._despues)
+        app.after_request(self._agregar_cabeceras)
+
+    # ---------------------- Eventos del engine ----------------------
+    def _antes(self, conn, cursor, statement, parameters, context, executemany):
+        # En el contexto de la ejecución y no en la conexión del pool: si la sentencia falla
+        # after_cursor_execute no se dispara, y el contexto se descarta con ella
+        if context is not None:
+            context._inicio_consulta = time.perf_counter()
+
+    def _despues(self, conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, '_inicio_consulta', None)
+        if inicio is None:
+            return
+        duracion = time.perf_counter() - inicio
+
+        if has_request_context():
+            peticion = g.setdefault('consultas_sql', {'total': 0, 'tiempo': 0.0})
+            peticion['total'] += 1
+            peticion['tiempo'] += duracion
+
+        try:
+            self._registrar(statement, duracion)
+        except Exception as e:
+            logger.error(f"Error registrando la consulta: {e}")
+
+    def _registrar(self, statement, duracion):
+        normalizada = normalizar_sentencia(statement)
+        huella = huella_sentencia(normalizada)
+        lenta = duracion >= self.umbral_lenta
+
+        with self._lock:
+            datos = self._huellas.get(huella)
+            nueva = datos is None
+            if nueva and len(self._huellas) >= self.max_huellas:
+                self.huellas_descartadas += 1
+                datos = None
+            elif nueva:
+                datos = self._huellas[huella] = {
+                    'huella': huella, 'sentencia': normalizada, 'llamadas': 0, 'lentas': 0,
+                    'tiempo_total': 0.0, 'tiempo_max': 0.0, 'origen': None,
+                }
+            if datos is not None:
+                datos['llamadas'] += 1
+                datos['tiempo_total'] += duracion
+                datos['tiempo_max'] = max(datos['tiempo_max'], duracion)
+                datos['lentas'] += lenta
+
+        # Recorrer la pila cuesta; solo la primera vez que aparece la sentencia y en las lentas
+        if not (nueva or lenta):
+            return
+        origen = self._origen()
+        if datos is not None:
+            datos['origen'] = origen
+        if lenta:
+            self._lentas.appendleft({
+                'huella': huella, 'sentencia': normalizada, 'duracion': duracion,
+                'origen': origen, 'fecha': datetime.now(),
+            })
+            logger.warning(f"Consulta lenta ({duracion * 1000:.1f} ms) [{huella}] en {origen}: {normalizada[:500]}")
+
+    def _origen(self):
+        """Frames de la app (rutas, servicios, plantillas) que lanzaron la consulta, del más interno al externo"""
+        frames = []
+        frame = sys._getframe(1)
+        while frame and len(frames) < FRAMES_ORIGEN:
+            archivo = frame.f_code.co_filename
+            relativo = os.path.relpath(archivo, self.raiz_app)
+            if archivo.startswith(self.raiz_app) and archivo != __file__ and relativo not in ARCHIVOS_OMITIDOS:
+                frames.append(f"{relativo}:{frame.f_lineno} {frame.f_code.co_name}")
+            frame = frame.f_back
+        return ' ← '.join(frames) or 'fuera de la app'
+
+    # ---------------------- Peticiones ----------------------
+    def _agregar_cabeceras(self, response):
+        if self.cabeceras:
+            peticion = g.get('consultas_sql', {'total': 0, 'tiempo': 0.0})
+            response.headers['X-Query-Count'] = str(peticion['total'])
+            response.headers.add('Server-Timing',
+                                 f'db;dur={peticion["tiempo"] * 1000:.1f};desc="{peticion["total"]} consultas"')
+        return response
+
+    # ---------------------- Consultas ----------------------
+    def top_huellas(self, limite=50, orden='tiempo_total'):
+        """Sentencias con más tiempo acumulado (o ``orden``: 'llamadas', 'tiempo_max', 'lentas')"""
+        with self._lock:
+            huellas = [dict(datos) for datos in self._huellas.values()]
+        for datos in huellas:
+            datos['tiempo_medio'] = datos['tiempo_total'] / datos['llamadas']
+        return sorted(huellas, key=lambda datos: datos[orden], reverse=True)[:limite]
+
+    def lentas_recientes(self):
+        return list(self._lentas)
+
+    def resumen(self):
+        with self._lock:
+            return {
+                'desde': self.desde,
+                'huellas': len(self._huellas),
+                'huellas_descartadas': self.huellas_descartadas,
+                'consultas': sum(datos['llamadas'] for datos in self._huellas.values()),
+                'tiempo_total': sum(datos['tiempo_total'] for datos in self._huellas.values()),
+                'umbral_lenta_ms': self.umbral_lenta * 1000,
+            }
+
+    def reiniciar(self):
+        with self._lock:
+            self._huellas = {}
+            self._lentas.clear()
+            self.huellas_descartadas = 0
+            self.desde = datetime.now()
+
+# Instancia global del servicio
+monitor_consultas = MonitorConsultas()
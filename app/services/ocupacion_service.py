@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.orm import load_only
+from app.models.reserva import Reserva
+from app.services.disponibilidad_service import HORA_APERTURA, HORA_CIERRE, HORAS_POR_DIA
+
+logger = logging.getLogger(__name__)
+
+# Ventana móvil usada por las vistas de canchas (próximos 30 días)
+DIAS_VENTANA = 30
+SLOTS_VENTANA = DIAS_VENTANA * HORAS_POR_DIA
+# Umbral de disponibilidad (%) a partir del cual una cancha se considera llena
+UMBRAL_COMPLETAMENTE_OCUPADA = 5
+# Cada cuánto se resincroniza desde la base de datos (cambios hechos por otros workers)
+SEGUNDOS_RESINCRONIZACION = 300
+
+
+def horas_ocupadas(hora_inicio, hora_fin):
+    """Horas de una reserva dentro del horario operativo (6:00-22:00)"""
+    inicio = max(hora_inicio.hour, HORA_APERTURA)
+    fin = min(hora_fin.hour if hora_fin.hour > 0 else 24, HORA_CIERRE)
+    return max(0, fin - inicio)
+
+
+class OccupancyIndex:
+    """Contadores de horas ocupadas por cancha para la ventana de los próximos 30 días.
+
+    Se carga con una sola consulta la primera vez que se lee, se actualiza de forma
+    incremental al crear, cancelar o confirmar reservas, y las lecturas por cancha
+    son O(1) y no tocan la tabla de Reservas.
+    """
+
+    def __init__(self, segundos_resincronizacion=SEGUNDOS_RESINCRONIZACION):
+        self.segundos_resincronizacion = segundos_resincronizacion
+        self._lock = threading.RLock()
+        self._cargado = False
+        self._ultima_carga = 0
+        self._fecha_base = None
+        # reserva_id -> (cancha_id, fecha, horas)
+        self._reservas = {}
+        # cancha_id -> {fecha: horas}
+        self._horas_por_dia = {}
+        # cancha_id -> horas ocupadas dentro de la ventana actual
+        self._total_ventana = {}
+
+    # ---------------------- Estado interno ----------------------
+    def _en_ventana(self, fecha):
+        return self._fecha_base <= fecha <= self._fecha_base + timedelta(days=DIAS_VENTANA)
+
+    def _sumar(self, cancha_id, fecha, horas):
+        dias = self._horas_por_dia.setdefault(cancha_id, {})
+        dias[fecha] = dias.get(fecha, 0) + horas
+        if dias[fecha] <= 0:
+            del dias[fecha]
+        if self._en_ventana(fecha):
+            self._total_ventana[cancha_id] = self._total_ventana.get(cancha_id, 0) + horas
+
+    def _recalcular_ventana(self):
+        """Desplaza la ventana al día actual descartando los días ya pasados"""
+        self._total_ventana = {}
+        for cancha_id, dias in self._horas_por_dia.items():
+            for fecha in [f for f in dias if f < self._fecha_base]:
+                del dias[fecha]
+            self._total_ventana[cancha_id] = sum(h for f, h in dias.items() if self._en_ventana(f))
+        self._reservas = {
+            reserva_id: datos for reserva_id, datos in self._reservas.items()
+            if datos[1] >= self._fecha_base
+        }
+
+    def cargar(self):
+        """Reconstruye el índice con una consulta de las reservas confirmadas futuras"""
+        hoy = datetime.now().date()
+        reservas = Reserva.query.options(
+            load_only(Reserva.Id, Reserva.CanchaId, Reserva.Fecha, Reserva.HoraInicio, Reserva.HoraFin)
+        ).filter(
+            Reserva.Estado == 'Confirmada',
+            Reserva.Fecha >= hoy
+        ).all()
+
+        with self._lock:
+            self._fecha_base = hoy
+            self._reservas = {}
+            self._horas_por_dia = {}
+            self._total_ventana = {}
+            for reserva in reservas:
+                horas = horas_ocupadas(reserva.HoraInicio, reserva.HoraFin)
+                self._reservas[reserva.Id] = (reserva.CanchaId, reserva.Fecha, horas)
+                self._sumar(reserva.CanchaId, reserva.Fecha, horas)
+            self._cargado = True
+            self._ultima_carga = time.monotonic()
+
+        logger.info(f"Índice de ocupación cargado con {len(reservas)} reservas confirmadas")
+
+    def _asegurar_vigente(self):
+        if not self._cargado or time.monotonic() - self._ultima_carga > self.segundos_resincronizacion:
+            self.cargar()
+            return
+        hoy = datetime.now().date()
+        if hoy != self._fecha_base:
+            with self._lock:
+                self._fecha_base = hoy
+                self._recalcular_ventana()
+
+    def invalidar(self):
+        """Fuerza una recarga completa en la próxima lectura"""
+        with self._lock:
+            self._cargado = False
+
+    # ---------------------- Actualizaciones incrementales ----------------------
+    def registrar_reserva(self, reserva):
+        """Suma una reserva confirmada al índice (idempotente)"""
+        if not self._cargado or reserva.Estado != 'Confirmada':
+            return
+        with self._lock:
+            if reserva.Id in self._reservas or reserva.Fecha < self._fecha_base:
+                return
+            horas = horas_ocupadas(reserva.HoraInicio, reserva.HoraFin)
+            self._reservas[reserva.Id] = (reserva.CanchaId, reserva.Fecha, horas)
+            self._sumar(reserva.CanchaId, reserva.Fecha, horas)
+
+    def liberar_reserva(self, reserva):
+        """Resta una reserva cancelada del índice (idempotente)"""
+        if not self._cargado:
+            return
+        with self._lock:
+            datos = self._reservas.pop(reserva.Id, None)
+            if datos:
+                cancha_id, fecha, horas = datos
+                self._sumar(cancha_id, fecha, -horas)
+
+    # ---------------------- Lecturas ----------------------
+    def horas_ocupadas_ventana(self, cancha_id):
+        self._asegurar_vigente()
+        return self._total_ventana.get(cancha_id, 0)
+
+    def resumen(self, cancha_id):
+        """Disponibilidad de la cancha en los próximos 30 días (O(1))"""
+        slots_ocupados = self.horas_ocupadas_ventana(cancha_id)
+        porcentaje_disponibilidad = (SLOTS_VENTANA - slots_ocupados) / SLOTS_VENTANA * 100
+        return {
+            'porcentaje_disponibilidad': porcentaje_disponibilidad,
+            'completamente_ocupada': porcentaje_disponibilidad <= UMBRAL_COMPLETAMENTE_OCUPADA,
+            'slots_disponibles': SLOTS_VENTANA - slots_ocupados,
+            'slots_totales': SLOTS_VENTANA
+        }
+
+# Instancia global del servicio
+occupancy_index = OccupancyIndex()
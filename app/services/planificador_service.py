@@ -0,0 +1,206 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.util import ref_to_obj
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.bloqueo_planificador import BloqueoPlanificador
+
+logger = logging.getLogger(__name__)
+
+NOMBRE_BLOQUEO = 'planificador'
+
+
+def ejecutar_tarea(referencia, *args):
+    """Punto de entrada de todas las tareas persistidas.
+
+    El job store solo guarda referencias textuales ('modulo:objeto.metodo') y
+    argumentos; aquí se resuelve la función y se ejecuta con contexto de la app.
+    """
+    funcion = ref_to_obj(referencia)
+    with planificador_service.app.app_context():
+        try:
+            return funcion(*args)
+        finally:
+            db.session.remove()
+
+
+class PlanificadorService:
+    """Un único scheduler de APScheduler por despliegue.
+
+    Las tareas viven en un ``SQLAlchemyJobStore`` compartido por todos los
+    procesos que inician el planificador: cualquiera puede agregarlas o quitarlas,
+    pero solo el que tiene el lease ``BloqueosPlanificador`` vigente las ejecuta;
+    el resto mantiene su scheduler en pausa. Con ``SCHEDULER_MODO='desactivado'``
+    no hay scheduler ni job store (pruebas). Los procesos en modo web no lo inician
+    (ver ``servicios_background``).
+    """
+
+    def __init__(self):
+        self.app = None
+        self.scheduler = None
+        self.modo = 'desactivado'
+        self.lider = False
+        self.duracion_lease = 30
+        self.propietario = None
+        self._detener = threading.Event()
+        self._hilo = None
+
+    @property
+    def activo(self):
+        return self.scheduler is not None and self.scheduler.running
+
+    def init_app(self, app):
+        """Inicia el scheduler en pausa y la elección del lease"""
+        if self.activo:
+            return
+        self.app = app
+        # Identidad por proceso: se calcula al iniciar para que cada worker forkeado tenga la suya
+        self.propietario = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.modo = app.config.get('SCHEDULER_MODO', 'elegido')
+        self.duracion_lease = app.config.get('SCHEDULER_DURACION_LEASE', 30)
+        if self.modo == 'desactivado':
+            logger.info("Planificador de tareas desactivado")
+            return
+
+        with app.app_context():
+            job_store = SQLAlchemyJobStore(engine=db.engine, tablename='apscheduler_jobs')
+        self.scheduler = BackgroundScheduler(
+            jobstores={'default': job_store},
+            job_defaults={'coalesce': True, 'misfire_grace_time': 300}
+        )
+        # En pausa el scheduler lee y escribe el job store pero no ejecuta nada
+        self.scheduler.start(paused=True)
+
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._mantener_lease, name='planificador-lease', daemon=True)
+        self._hilo.start()
+        logger.info(f"Planificador de tareas iniciado en modo '{self.modo}' ({self.propietario})")
+
+    def detener(self):
+        """Libera el lease y apaga el scheduler"""
+        if not self.activo:
+            return
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(5)
+        if self.lider:
+            with self.app.app_context():
+                self._liberar_lease()
+        self.scheduler.shutdown(wait=False)
+        self.lider = False
+        logger.info("Planificador de tareas detenido")
+
+    def agregar_tarea(self, referencia, trigger, args=None, id=None, **opciones):
+        """Guarda una tarea en el job store; ``referencia`` es 'modulo:objeto.metodo'"""
+        if not self.activo:
+            logger.debug(f"Planificador inactivo, no se programa {id or referencia}")
+            return None
+        return self.scheduler.add_job(
+            'app.services.planificador_service:ejecutar_tarea',
+            trigger=trigger,
+            args=[referencia] + list(args or []),
+            id=id,
+            replace_existing=True,
+            **opciones
+        )
+
+    def quitar_tarea(self, id):
+        """Quita una tarea del job store; devuelve False si no existía"""
+        if not self.activo:
+            return False
+        try:
+            self.scheduler.remove_job(id)
+            return True
+        except JobLookupError:
+            return False
+
+    def obtener_tareas(self):
+        return self.scheduler.get_jobs() if self.activo else []
+
+    def estado(self):
+        return {
+            'modo': self.modo,
+            'activo': self.activo,
+            'lider': self.lider,
+            'propietario': self.propietario
+        }
+
+    def _mantener_lease(self):
+        """Renueva o intenta tomar el lease cada tercio de su duración"""
+        intervalo = max(1, self.duracion_lease / 3)
+        while True:
+            try:
+                with self.app.app_context():
+                    es_lider = self._tomar_lease()
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Error renovando el lease del planificador: {e}")
+                es_lider = False
+
+            if es_lider and not self.lider:
+                self.scheduler.resume()
+                logger.info(f"Este proceso ejecuta las tareas programadas ({self.propietario})")
+            elif not es_lider and self.lider:
+                self.scheduler.pause()
+                logger.warning(f"Se perdió el lease del planificador ({self.propietario})")
+            elif es_lider:
+                # Recoge tareas agregadas por otros procesos desde la última revisión
+                self.scheduler.wakeup()
+            self.lider = es_lider
+
+            if self._detener.wait(intervalo):
+                break
+
+    def _tomar_lease(self):
+        ahora = datetime.utcnow()
+        expira = ahora + timedelta(seconds=self.duracion_lease)
+        resultado = db.session.execute(
+            update(BloqueoPlanificador)
+            .where(
+                BloqueoPlanificador.Nombre == NOMBRE_BLOQUEO,
+                or_(
+                    BloqueoPlanificador.Propietario == self.propietario,
+                    BloqueoPlanificador.ExpiraEn.is_(None),
+                    BloqueoPlanificador.ExpiraEn < ahora
+                )
+            )
+            .values(Propietario=self.propietario, ExpiraEn=expira)
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount:
+            db.session.commit()
+            return True
+
+        existe = db.session.query(BloqueoPlanificador.Id).filter_by(Nombre=NOMBRE_BLOQUEO).first()
+        if existe:
+            db.session.rollback()
+            return False
+        try:
+            db.session.add(BloqueoPlanificador(Nombre=NOMBRE_BLOQUEO, Propietario=self.propietario, ExpiraEn=expira))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            # Otro proceso creó la fila al mismo tiempo y se quedó con el lease
+            db.session.rollback()
+            return False
+
+    def _liberar_lease(self):
+        db.session.execute(
+            update(BloqueoPlanificador)
+            .where(BloqueoPlanificador.Nombre == NOMBRE_BLOQUEO,
+                   BloqueoPlanificador.Propietario == self.propietario)
+            .values(Propietario=None, ExpiraEn=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+# Instancia global del servicio
+planificador_service = PlanificadorService()
@@ -1,255 +1,178 @@
 import logging
 from datetime import datetime, timedelta
-from flask import current_app
+from sqlalchemy import and_, or_, select, update
 from app import db
-from app.models import Reserva, Usuario
+from app.models import Reserva, Cancha
 from app.services.notificacion_service import notificacion_service
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.date import DateTrigger
+from app.services.planificador_service import planificador_service
 
 logger = logging.getLogger(__name__)
 
+# Recordatorios que se envían antes de cada reserva: tipo -> (anticipación, columna de enviado)
+RECORDATORIOS = {
+    '24h': (timedelta(hours=24), Reserva.Recordatorio24hEnviadoEn),
+    '2h': (timedelta(hours=2), Reserva.Recordatorio2hEnviadoEn),
+}
+
+
+def filtro_inicio_entre(desde, hasta):
+    """Reservas que empiezan en (desde, hasta], como rango sobre (Fecha, HoraInicio).
+
+    Pensado para ventanas menores a un día, que abarcan como mucho dos fechas.
+    """
+    if desde.date() == hasta.date():
+        return and_(Reserva.Fecha == desde.date(),
+                    Reserva.HoraInicio > desde.time(),
+                    Reserva.HoraInicio <= hasta.time())
+    return or_(
+        and_(Reserva.Fecha == desde.date(), Reserva.HoraInicio > desde.time()),
+        and_(Reserva.Fecha == hasta.date(), Reserva.HoraInicio <= hasta.time())
+    )
+
+
 class RecordatorioService:
-    def __init__(self):
-        self.scheduler = BackgroundScheduler()
-        self.scheduler.start()
-        logger.info("Servicio de recordatorios iniciado")
-    
-    def programar_recordatorios_reserva(self, reserva_id):
-        """Programa recordatorios automáticos para una reserva"""
-        try:
-            reserva = Reserva.query.get(reserva_id)
-            if not reserva:
-                logger.error(f"Reserva {reserva_id} no encontrada para programar recordatorios")
-                return False
-            
-            # Calcular fechas para recordatorios
-            fecha_reserva = reserva.Fecha
-            hora_reserva = reserva.HoraInicio
-            
-            # Recordatorio 24 horas antes
-            recordatorio_24h = datetime.combine(fecha_reserva, hora_reserva) - timedelta(hours=24)
-            
-            # Recordatorio 2 horas antes
-            recordatorio_2h = datetime.combine(fecha_reserva, hora_reserva) - timedelta(hours=2)
-            
-            # Solo programar si la fecha de recordatorio es futura
-            ahora = datetime.now()
-            
-            if recordatorio_24h > ahora:
-                self.scheduler.add_job(
-                    func=self._enviar_recordatorio_24h,
-                    trigger=DateTrigger(run_date=recordatorio_24h),
-                    args=[reserva_id],
-                    id=f"recordatorio_24h_{reserva_id}",
-                    replace_existing=True
-                )
-                logger.info(f"Recordatorio 24h programado para reserva {reserva_id} en {recordatorio_24h}")
-            
-            if recordatorio_2h > ahora:
-                self.scheduler.add_job(
-                    func=self._enviar_recordatorio_2h,
-                    trigger=DateTrigger(run_date=recordatorio_2h),
-                    args=[reserva_id],
-                    id=f"recordatorio_2h_{reserva_id}",
-                    replace_existing=True
-                )
-                logger.info(f"Recordatorio 2h programado para reserva {reserva_id} en {recordatorio_2h}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error programando recordatorios para reserva {reserva_id}: {e}")
-            return False
-    
-    def cancelar_recordatorios_reserva(self, reserva_id):
-        """Cancela los recordatorios programados para una reserva"""
-        try:
-            # Cancelar recordatorio 24h
-            job_id_24h = f"recordatorio_24h_{reserva_id}"
-            if self.scheduler.get_job(job_id_24h):
-                self.scheduler.remove_job(job_id_24h)
-                logger.info(f"Recordatorio 24h cancelado para reserva {reserva_id}")
-            
-            # Cancelar recordatorio 2h
-            job_id_2h = f"recordatorio_2h_{reserva_id}"
-            if self.scheduler.get_job(job_id_2h):
-                self.scheduler.remove_job(job_id_2h)
-                logger.info(f"Recordatorio 2h cancelado para reserva {reserva_id}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error cancelando recordatorios para reserva {reserva_id}: {e}")
-            return False
-    
-    def _enviar_recordatorio_24h(self, reserva_id):
-        """Envía recordatorio 24 horas antes de la reserva"""
-        try:
-            reserva = Reserva.query.get(reserva_id)
-            if not reserva or reserva.Estado != 'Confirmada':
-                logger.info(f"Reserva {reserva_id} no encontrada o no confirmada para recordatorio 24h")
-                return
-            
-            # Verificar que la reserva aún es válida
-            ahora = datetime.now()
-            fecha_hora_reserva = datetime.combine(reserva.Fecha, reserva.HoraInicio)
-            
-            if fecha_hora_reserva <= ahora:
-                logger.info(f"Reserva {reserva_id} ya pasó, no enviar recordatorio 24h")
-                return
-            
-            # Enviar notificación por email
-            notificacion_service.crear_notificacion(
-                usuario_id=reserva.UsuarioId,
-                tipo='email',
-                titulo='⏰ Recordatorio de Reserva - Mañana - Flash Reserver',
-                mensaje=f'Recordatorio: Tienes una reserva mañana {reserva.Fecha.strftime("%d/%m/%Y")} a las {reserva.HoraInicio.strftime("%H:%M")}.',
-                datos_adicionales={
-                    'reserva_id': reserva.Id,
-                    'fecha': reserva.Fecha.strftime('%d/%m/%Y'),
-                    'hora': reserva.HoraInicio.strftime('%H:%M'),
-                    'cancha_nombre': reserva.cancha.Nombre if reserva.cancha else 'Cancha Deportiva',
-                    'tipo_recordatorio': '24h',
-                    'tiempo_restante': '24 horas'
-                }
-            )
-            
-            # También enviar notificación in-app
-            notificacion_service.crear_notificacion(
-                usuario_id=reserva.UsuarioId,
-                tipo='in_app',
-                titulo='⏰ Recordatorio de Reserva - Mañana',
-                mensaje=f'Recordatorio: Tienes una reserva mañana {reserva.Fecha.strftime("%d/%m/%Y")} a las {reserva.HoraInicio.strftime("%H:%M")}.',
-                datos_adicionales={
-                    'reserva_id': reserva.Id,
-                    'fecha': reserva.Fecha.strftime('%d/%m/%Y'),
-                    'hora': reserva.HoraInicio.strftime('%H:%M'),
-                    'cancha_nombre': reserva.cancha.Nombre if reserva.cancha else 'Cancha Deportiva',
-                    'tipo_recordatorio': '24h'
-                }
-            )
-            
-            logger.info(f"Recordatorio 24h enviado para reserva {reserva_id}")
-            
-        except Exception as e:
-            logger.error(f"Error enviando recordatorio 24h para reserva {reserva_id}: {e}")
-    
-    def _enviar_recordatorio_2h(self, reserva_id):
-        """Envía recordatorio 2 horas antes de la reserva"""
-        try:
-            reserva = Reserva.query.get(reserva_id)
-            if not reserva or reserva.Estado != 'Confirmada':
-                logger.info(f"Reserva {reserva_id} no encontrada o no confirmada para recordatorio 2h")
-                return
-            
-            # Verificar que la reserva aún es válida
-            ahora = datetime.now()
-            fecha_hora_reserva = datetime.combine(reserva.Fecha, reserva.HoraInicio)
-            
-            if fecha_hora_reserva <= ahora:
-                logger.info(f"Reserva {reserva_id} ya pasó, no enviar recordatorio 2h")
-                return
-            
-            # Enviar notificación por email
-            notificacion_service.crear_notificacion(
-                usuario_id=reserva.UsuarioId,
-                tipo='email',
-                titulo='🚨 Recordatorio de Reserva - En 2 Horas - Flash Reserver',
-                mensaje=f'Recordatorio URGENTE: Tienes una reserva en 2 horas ({reserva.Fecha.strftime("%d/%m/%Y")} a las {reserva.HoraInicio.strftime("%H:%M")}).',
-                datos_adicionales={
-                    'reserva_id': reserva.Id,
-                    'fecha': reserva.Fecha.strftime('%d/%m/%Y'),
-                    'hora': reserva.HoraInicio.strftime('%H:%M'),
-                    'cancha_nombre': reserva.cancha.Nombre if reserva.cancha else 'Cancha Deportiva',
-                    'tipo_recordatorio': '2h',
-                    'tiempo_restante': '2 horas',
-                    'es_urgente': True
-                }
-            )
-            
-            # También enviar notificación in-app
-            notificacion_service.crear_notificacion(
-                usuario_id=reserva.UsuarioId,
-                tipo='in_app',
-                titulo='🚨 Recordatorio URGENTE - En 2 Horas',
-                mensaje=f'Recordatorio URGENTE: Tienes una reserva en 2 horas ({reserva.Fecha.strftime("%d/%m/%Y")} a las {reserva.HoraInicio.strftime("%H:%M")}).',
-                datos_adicionales={
-                    'reserva_id': reserva.Id,
-                    'fecha': reserva.Fecha.strftime('%d/%m/%Y'),
-                    'hora': reserva.HoraInicio.strftime('%H:%M'),
-                    'cancha_nombre': reserva.cancha.Nombre if reserva.cancha else 'Cancha Deportiva',
-                    'tipo_recordatorio': '2h',
-                    'es_urgente': True
-                }
-            )
-            
-            logger.info(f"Recordatorio 2h enviado para reserva {reserva_id}")
-            
-        except Exception as e:
-            logger.error(f"Error enviando recordatorio 2h para reserva {reserva_id}: {e}")
-    
-    def programar_recordatorios_existentes(self):
-        """Programa recordatorios para todas las reservas confirmadas existentes"""
-        try:
-            # Obtener reservas confirmadas futuras
-            ahora = datetime.now()
-            reservas_futuras = Reserva.query.filter(
+    """Recordatorios 24h y 2h antes de cada reserva confirmada.
+
+    Un barrido cada minuto busca, con una consulta por rango sobre el índice
+    (Fecha, HoraInicio, Estado), las reservas cuyo recordatorio ya venció dentro
+    de la ventana de recuperación y todavía no fue enviado. Marca el envío en la
+    reserva y crea las notificaciones en la misma transacción, por lotes, así que
+    la memoria no depende de cuántas reservas futuras haya y nada se envía dos veces.
+    Cancelar una reserva basta para que no reciba recordatorios.
+    """
+
+    def __init__(self, ventana_minutos=30, tamano_lote=500):
+        self.ventana = timedelta(minutes=ventana_minutos)
+        self.tamano_lote = tamano_lote
+        self.ultimo_barrido = None
+        self.ultimos_enviados = 0
+
+    def init_app(self, app):
+        """Registra el barrido periódico en el planificador compartido"""
+        self.ventana = timedelta(minutes=app.config.get('RECORDATORIOS_VENTANA_MINUTOS', 30))
+        self.tamano_lote = app.config.get('RECORDATORIOS_TAMANO_LOTE', 500)
+        planificador_service.agregar_tarea(
+            'app.services.recordatorio_service:recordatorio_service.barrer_recordatorios',
+            trigger='interval',
+            minutes=1,
+            id='barrido_recordatorios'
+        )
+
+    def barrer_recordatorios(self, ahora=None):
+        """Envía los recordatorios vencidos; devuelve cuántas reservas se recordaron"""
+        ahora = ahora or datetime.now()
+        total = 0
+        for tipo in RECORDATORIOS:
+            try:
+                while True:
+                    revisadas, recordadas = self._procesar_lote(tipo, ahora)
+                    total += recordadas
+                    if revisadas < self.tamano_lote:
+                        break
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error en barrido de recordatorios {tipo}: {e}")
+
+        self.ultimo_barrido = ahora
+        self.ultimos_enviados = total
+        if total:
+            logger.info(f"Barrido de recordatorios: {total} reservas recordadas")
+        return total
+
+    def _procesar_lote(self, tipo, ahora):
+        anticipacion, columna_enviado = RECORDATORIOS[tipo]
+        # Vence cuando inicio - anticipación <= ahora; la ventana recupera barridos perdidos
+        hasta = ahora + anticipacion
+        desde = hasta - self.ventana
+
+        filas = db.session.execute(
+            select(Reserva.Id, Reserva.UsuarioId, Reserva.Fecha, Reserva.HoraInicio, Cancha.Nombre)
+            .outerjoin(Cancha, Cancha.Id == Reserva.CanchaId)
+            .where(
+                filtro_inicio_entre(desde, hasta),
                 Reserva.Estado == 'Confirmada',
-                Reserva.Fecha > ahora.date()
-            ).all()
-            
-            logger.info(f"Programando recordatorios para {len(reservas_futuras)} reservas existentes")
-            
-            for reserva in reservas_futuras:
-                self.programar_recordatorios_reserva(reserva.Id)
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error programando recordatorios existentes: {e}")
-            return False
-    
-    def limpiar_recordatorios_antiguos(self):
-        """Limpia recordatorios programados para reservas pasadas"""
-        try:
-            # Obtener todos los jobs del scheduler
-            jobs = self.scheduler.get_jobs()
-            
-            for job in jobs:
-                if job.id.startswith('recordatorio_'):
-                    # Extraer ID de reserva del job_id
-                    reserva_id = job.id.split('_')[-1]
-                    
-                    try:
-                        reserva = Reserva.query.get(int(reserva_id))
-                        if not reserva or reserva.Estado != 'Confirmada':
-                            # Cancelar job si la reserva no existe o no está confirmada
-                            self.scheduler.remove_job(job.id)
-                            logger.info(f"Job de recordatorio {job.id} cancelado (reserva inválida)")
-                        elif datetime.combine(reserva.Fecha, reserva.HoraInicio) <= datetime.now():
-                            # Cancelar job si la reserva ya pasó
-                            self.scheduler.remove_job(job.id)
-                            logger.info(f"Job de recordatorio {job.id} cancelado (reserva pasada)")
-                    except:
-                        # Si hay error, cancelar el job
-                        self.scheduler.remove_job(job.id)
-                        logger.info(f"Job de recordatorio {job.id} cancelado (error)")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error limpiando recordatorios antiguos: {e}")
-            return False
-    
+                columna_enviado.is_(None)
+            )
+            .order_by(Reserva.Fecha, Reserva.HoraInicio)
+            .limit(self.tamano_lote)
+            # Bloquea las reservas elegidas hasta el commit: otro barrido las salta y el UPDATE las marca todas
+            .with_for_update(of=Reserva, skip_locked=True)
+        ).all()
+        if not filas:
+            db.session.rollback()
+            return 0, 0
+
+        # Marcar primero: solo se notifican las reservas que este UPDATE alcanzó a marcar.
+        # Sin fracción de segundo: un DATETIME de MySQL la redondea y la marca leída no sería igual
+        marca = datetime.utcnow().replace(microsecond=0)
+        ids = [fila.Id for fila in filas]
+        resultado = db.session.execute(
+            update(Reserva)
+            .where(Reserva.Id.in_(ids), columna_enviado.is_(None))
+            .values({columna_enviado: marca})
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount != len(ids):
+            # Solo sin bloqueo de filas (SQLite): otra transacción marcó algunas entre el SELECT y el UPDATE
+            marcadas = set(db.session.execute(
+                select(Reserva.Id).where(Reserva.Id.in_(ids), columna_enviado == marca)
+            ).scalars())
+            filas = [fila for fila in filas if fila.Id in marcadas]
+
+        notificaciones = []
+        for fila in filas:
+            notificaciones.extend(self._notificaciones_recordatorio(tipo, fila))
+        ids_notificaciones = notificacion_service.agregar_notificaciones(notificaciones)
+        db.session.commit()
+
+        notificacion_service.despachador.encolar_lote(ids_notificaciones)
+        return len(ids), len(filas)
+
+    def _notificaciones_recordatorio(self, tipo, fila):
+        """Email e in-app de un recordatorio, con los mismos textos que antes"""
+        fecha = fila.Fecha.strftime('%d/%m/%Y')
+        hora = fila.HoraInicio.strftime('%H:%M')
+        datos = {
+            'reserva_id': fila.Id,
+            'fecha': fecha,
+            'hora': hora,
+            'cancha_nombre': fila.Nombre or 'Cancha Deportiva',
+            'tipo_recordatorio': tipo
+        }
+
+        if tipo == '24h':
+            mensaje = f'Recordatorio: Tienes una reserva mañana {fecha} a las {hora}.'
+            return [
+                dict(usuario_id=fila.UsuarioId, tipo='email',
+                     titulo='⏰ Recordatorio de Reserva - Mañana - Flash Reserver', mensaje=mensaje,
+                     datos_adicionales=dict(datos, tiempo_restante='24 horas')),
+                dict(usuario_id=fila.UsuarioId, tipo='in_app',
+                     titulo='⏰ Recordatorio de Reserva - Mañana', mensaje=mensaje,
+                     datos_adicionales=datos),
+            ]
+
+        mensaje = f'Recordatorio URGENTE: Tienes una reserva en 2 horas ({fecha} a las {hora}).'
+        datos['es_urgente'] = True
+        return [
+            dict(usuario_id=fila.UsuarioId, tipo='email',
+                 titulo='🚨 Recordatorio de Reserva - En 2 Horas - Flash Reserver', mensaje=mensaje,
+                 datos_adicionales=dict(datos, tiempo_restante='2 horas')),
+            dict(usuario_id=fila.UsuarioId, tipo='in_app',
+                 titulo='🚨 Recordatorio URGENTE - En 2 Horas', mensaje=mensaje,
+                 datos_adicionales=datos),
+        ]
+
     def obtener_estado_scheduler(self):
-        """Retorna el estado del scheduler de recordatorios"""
+        """Retorna el estado del barrido de recordatorios"""
         try:
-            jobs = self.scheduler.get_jobs()
+            tarea = next((t for t in planificador_service.obtener_tareas() if t.id == 'barrido_recordatorios'), None)
             return {
-                'scheduler_activo': self.scheduler.running,
-                'total_jobs': len(jobs),
-                'jobs_recordatorios': [job.id for job in jobs if job.id.startswith('recordatorio_')]
+                'scheduler_activo': planificador_service.activo,
+                'ejecuta_tareas': planificador_service.lider,
+                'barrido_programado': tarea is not None,
+                'proximo_barrido': tarea.next_run_time.isoformat() if tarea and tarea.next_run_time else None,
+                'ultimo_barrido': self.ultimo_barrido.isoformat() if self.ultimo_barrido else None,
+                'ultimos_enviados': self.ultimos_enviados
             }
         except Exception as e:
             logger.error(f"Error obteniendo estado del scheduler: {e}")
@@ -0,0 +1,285 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import List
+from sqlalchemy import extract, func, select
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Cancha, Reserva, Usuario, ResumenReservaDiario, ResumenReservaHorario
+
+logger = logging.getLogger(__name__)
+
+TOP_CANCHAS = 5
+MESES = [datetime(2025, mes, 1).strftime('%b') for mes in range(1, 13)]
+
+
+class FiltroReporte:
+    """Filtro de periodo de los reportes de administración.
+
+    Acepta los mismos parámetros que la pantalla de reportes (``filtro_rapido``,
+    ``filtro_dia``, ``filtro_mes``, ``filtro_año``, ``inicio``/``fin``) con la
+    misma prioridad, y los reduce a un rango ``[desde, hasta]`` sobre
+    ``Reserva.Fecha`` que puede usar el índice de fechas.
+    """
+
+    def __init__(self, rapido=None, dia=None, mes=None, año=None, inicio=None, fin=None, hoy=None):
+        self.rapido = rapido
+        self.dia = dia
+        self.mes = mes
+        self.año = año
+        self.inicio = inicio
+        self.fin = fin
+        self.hoy = hoy or datetime.now().date()
+        self.desde, self.hasta = self._rango()
+
+    @classmethod
+    def desde_args(cls, args, hoy=None):
+        return cls(
+            rapido=args.get('filtro_rapido'),
+            dia=args.get('filtro_dia'),
+            mes=args.get('filtro_mes'),
+            año=args.get('filtro_año'),
+            inicio=args.get('inicio'),
+            fin=args.get('fin'),
+            hoy=hoy
+        )
+
+    def _rango(self):
+        hoy = self.hoy
+        if self.rapido:
+            if self.rapido == 'hoy':
+                return hoy, hoy
+            if self.rapido == 'ayer':
+                ayer = hoy - timedelta(days=1)
+                return ayer, ayer
+            if self.rapido == 'semana':
+                inicio_semana = hoy - timedelta(days=hoy.weekday())
+                return inicio_semana, inicio_semana + timedelta(days=6)
+            if self.rapido == 'mes':
+                inicio_mes = hoy.replace(day=1)
+                return inicio_mes, (inicio_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            if self.rapido == 'trimestre':
+                inicio_trimestre = hoy.replace(month=(hoy.month - 1) // 3 * 3 + 1, day=1)
+                return inicio_trimestre, (inicio_trimestre + timedelta(days=93)).replace(day=1) - timedelta(days=1)
+            if self.rapido == 'año':
+                return hoy.replace(month=1, day=1), hoy.replace(month=12, day=31)
+            return None, None
+        if self.dia:
+            dia = date.fromisoformat(self.dia)
+            return dia, dia
+        if self.mes:
+            año, mes = (int(parte) for parte in self.mes.split('-'))
+            inicio_mes = date(año, mes, 1)
+            return inicio_mes, (inicio_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        if self.año:
+            return date(int(self.año), 1, 1), date(int(self.año), 12, 31)
+        if self.inicio and self.fin:
+            return date.fromisoformat(self.inicio), date.fromisoformat(self.fin)
+        return None, None
+
+    def condiciones(self, columna=Reserva.Fecha):
+        """Condiciones sobre la columna de fecha para usar en ``.filter(*...)`` o ``.where(*...)``"""
+        condiciones = []
+        if self.desde is not None:
+            condiciones.append(columna >= self.desde)
+        if self.hasta is not None:
+            condiciones.append(columna <= self.hasta)
+        return condiciones
+
+    def aplicar(self, query):
+        return query.filter(*self.condiciones())
+
+    @property
+    def descripcion(self):
+        if self.rapido:
+            return f"Filtro rápido: {self.rapido.title()}"
+        if self.dia:
+            return f"Día: {self.dia}"
+        if self.mes:
+            return f"Mes: {self.mes}"
+        if self.año:
+            return f"Año: {self.año}"
+        if self.inicio and self.fin:
+            return f"Rango: {self.inicio} a {self.fin}"
+        return "Todos los registros"
+
+    @property
+    def sufijo_archivo(self):
+        if self.rapido:
+            return f"_{self.rapido}"
+        if self.dia:
+            return f"_dia_{self.dia}"
+        if self.mes:
+            return f"_mes_{self.mes}"
+        if self.año:
+            return f"_año_{self.año}"
+        if self.inicio and self.fin:
+            return f"_desde_{self.inicio}_hasta_{self.fin}"
+        return ""
+
+
+@dataclass
+class EstadisticasReporte:
+    """Resultado del motor de reportes; lo comparten el PDF, el Excel y la API"""
+    total_usuarios: int = 0
+    total_canchas: int = 0
+    total_reservas: int = 0
+    reservas_hoy: int = 0
+    ingresos_totales: float = 0.0
+    meses: List[str] = field(default_factory=lambda: list(MESES))
+    reservas_por_mes: List[int] = field(default_factory=lambda: [0] * 12)
+    ingresos_por_mes: List[float] = field(default_factory=lambda: [0.0] * 12)
+    # [{'nombre', 'total_reservas', 'ingresos', 'ocupacion'}] ordenadas por reservas
+    canchas_populares: List[dict] = field(default_factory=list)
+    # 7 días x 24 horas: [{'x': hora, 'y': día (lunes=0), 'v': reservas}]
+    heatmap: List[dict] = field(default_factory=list)
+    # Últimas reservas creadas dentro del filtro, con usuario y cancha cargados
+    recientes: List[Reserva] = field(default_factory=list)
+
+    @property
+    def ocupacion_labels(self):
+        return [c['nombre'] for c in self.canchas_populares]
+
+    @property
+    def ocupacion_values(self):
+        return [c['ocupacion'] for c in self.canchas_populares]
+
+    @property
+    def cancha_mas_popular(self):
+        return self.canchas_populares[0]['nombre'] if self.canchas_populares else ''
+
+    def como_dict(self):
+        return {
+            'total_usuarios': self.total_usuarios,
+            'total_canchas': self.total_canchas,
+            'total_reservas': self.total_reservas,
+            'reservas_hoy': self.reservas_hoy,
+            'ingresos_totales': self.ingresos_totales,
+            'canchas_populares': self.canchas_populares,
+            'meses': self.meses,
+            'reservas_por_mes': self.reservas_por_mes,
+            'ingresos_por_mes': self.ingresos_por_mes,
+            'ocupacion_labels': self.ocupacion_labels,
+            'ocupacion_values': self.ocupacion_values,
+            'heatmap': self.heatmap
+        }
+
+
+class ReporteService:
+    """Motor de estadísticas de los reportes de administración.
+
+    Lee las tablas de resumen (``resumen_service``) en lugar de Reservas, así que
+    su costo depende del número de canchas y días del periodo, no del histórico de
+    reservas. Reservas e ingresos por mes, totales y canchas más populares salen
+    de un solo GROUP BY (mes, cancha) sobre el resumen diario; el heatmap de la
+    última semana, del resumen por hora. Los conteos globales se leen en una
+    consulta con subconsultas escalares. Los ingresos son la suma de
+    ``Reserva.PrecioTotal`` (precio fijado al reservar) de reservas confirmadas.
+    """
+
+    def calcular(self, filtro, recientes=0):
+        """Calcula las estadísticas del periodo; ``recientes`` limita las últimas reservas a cargar"""
+        estadisticas = EstadisticasReporte()
+        self._totales(estadisticas, filtro.hoy)
+        self._por_mes_y_cancha(estadisticas, filtro)
+        estadisticas.heatmap = self._heatmap(filtro.hoy)
+        if recientes:
+            estadisticas.recientes = (
+                filtro.aplicar(Reserva.query)
+                .options(joinedload(Reserva.usuario), joinedload(Reserva.cancha))
+                .order_by(Reserva.FechaCreacion.desc())
+                .limit(recientes)
+                .all()
+            )
+        return estadisticas
+
+    def reservas_exportacion(self, filtro, lote=1000):
+        """Filas de reservas del periodo para exportar, leídas de a ``lote`` filas.
+
+        Devuelve columnas (no entidades) con los nombres de usuario y cancha ya
+        unidos, así que recorrer el resultado no carga relaciones ni guarda las
+        filas en la sesión.
+        """
+        return db.session.execute(
+            select(
+                Reserva.Id, Usuario.Nombre.label('Usuario'), Cancha.Nombre.label('Cancha'),
+                Reserva.Fecha, Reserva.HoraInicio, Reserva.HoraFin, Reserva.Estado, Reserva.PrecioTotal,
+                Cancha.PrecioHora.label('PrecioHoraCancha'), Reserva.FechaCreacion
+            )
+            .join(Usuario, Reserva.UsuarioId == Usuario.Id)
+            .join(Cancha, Reserva.CanchaId == Cancha.Id)
+            .where(*filtro.condiciones())
+            .order_by(Reserva.Id)
+            .execution_options(yield_per=lote)
+        )
+
+    def usuario_mas_activo(self, filtro):
+        """Nombre del usuario con más reservas en el periodo ('' si no hay reservas)"""
+        fila = db.session.execute(
+            select(Usuario.Nombre)
+            .join(Reserva, Reserva.UsuarioId == Usuario.Id)
+            .where(*filtro.condiciones())
+            .group_by(Usuario.Id, Usuario.Nombre)
+            .order_by(func.count(Reserva.Id).desc(), Usuario.Id)
+            .limit(1)
+        ).first()
+        return fila.Nombre if fila else ''
+
+    def _totales(self, estadisticas, hoy):
+        fila = db.session.execute(select(
+            select(func.count(Usuario.Id)).scalar_subquery().label('usuarios'),
+            select(func.count(Cancha.Id)).scalar_subquery().label('canchas'),
+            select(func.coalesce(func.sum(ResumenReservaDiario.Creadas), 0))
+            .where(ResumenReservaDiario.Fecha == hoy)
+            .scalar_subquery().label('reservas_hoy')
+        )).one()
+        estadisticas.total_usuarios = fila.usuarios
+        estadisticas.total_canchas = fila.canchas
+        estadisticas.reservas_hoy = fila.reservas_hoy
+
+    def _por_mes_y_cancha(self, estadisticas, filtro):
+        mes = extract('month', ResumenReservaDiario.Fecha)
+        filas = db.session.execute(
+            select(
+                mes.label('mes'),
+                Cancha.Id.label('cancha_id'),
+                Cancha.Nombre.label('nombre'),
+                func.sum(ResumenReservaDiario.Reservas).label('reservas'),
+                func.sum(ResumenReservaDiario.Ingresos).label('ingresos')
+            )
+            .join(Cancha, ResumenReservaDiario.CanchaId == Cancha.Id)
+            .where(ResumenReservaDiario.Reservas > 0, *filtro.condiciones(ResumenReservaDiario.Fecha))
+            .group_by(mes, Cancha.Id, Cancha.Nombre)
+        ).all()
+
+        canchas = {}
+        for fila in filas:
+            indice = int(fila.mes) - 1
+            estadisticas.reservas_por_mes[indice] += int(fila.reservas)
+            estadisticas.ingresos_por_mes[indice] += float(fila.ingresos)
+            estadisticas.ingresos_totales += float(fila.ingresos)
+            cancha = canchas.setdefault(fila.cancha_id, {'nombre': fila.nombre, 'total_reservas': 0, 'ingresos': 0.0})
+            cancha['total_reservas'] += int(fila.reservas)
+            cancha['ingresos'] += float(fila.ingresos)
+
+        estadisticas.total_reservas = sum(estadisticas.reservas_por_mes)
+        populares = sorted(canchas.items(), key=lambda item: (-item[1]['total_reservas'], item[0]))[:TOP_CANCHAS]
+        for _, cancha in populares:
+            cancha['ocupacion'] = round((cancha['total_reservas'] / max(1, estadisticas.total_reservas)) * 100, 2)
+            estadisticas.canchas_populares.append(cancha)
+
+    def _heatmap(self, hoy):
+        filas = db.session.execute(
+            select(ResumenReservaHorario.Fecha, ResumenReservaHorario.Hora,
+                   func.sum(ResumenReservaHorario.Reservas).label('reservas'))
+            .where(ResumenReservaHorario.Fecha >= hoy - timedelta(days=6), ResumenReservaHorario.Fecha <= hoy)
+            .group_by(ResumenReservaHorario.Fecha, ResumenReservaHorario.Hora)
+        ).all()
+
+        heatmap = [{"x": hour, "y": day, "v": 0} for day in range(7) for hour in range(24)]
+        for fila in filas:
+            heatmap[fila.Fecha.weekday() * 24 + fila.Hora]["v"] += int(fila.reservas)
+        return heatmap
+
+# Instancia global del servicio
+reporte_service = ReporteService()
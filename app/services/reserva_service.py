@@ -0,0 +1,144 @@
+import logging
+import time
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from app.models.cancha import Cancha
+from app.models.reserva import Reserva
+from app.models.bloqueo_reserva import BloqueoReserva
+from app.services.resumen_service import resumen_service
+
+logger = logging.getLogger(__name__)
+
+
+class ConflictoReservaError(Exception):
+    """La cancha ya tiene una reserva confirmada que se cruza con el horario pedido"""
+
+
+class ReservaService:
+    """Crea y confirma reservas sin cruces de horario.
+
+    El chequeo de cruces y el INSERT se hacen en la misma transacción después de
+    tomar el bloqueo de la fila ``BloqueosReserva`` (cancha, fecha), por lo que dos
+    reservas simultáneas para la misma cancha y fecha no pueden pasar ambas el
+    chequeo. Reservas de canchas o fechas distintas no compiten por el bloqueo.
+    Crear, confirmar y cancelar actualizan los resúmenes de reservas en la misma
+    transacción.
+    """
+
+    def __init__(self, max_reintentos=3):
+        self.max_reintentos = max_reintentos
+
+    def _bloquear(self, cancha_id, fecha):
+        """Toma el bloqueo de escritura de la fila (cancha, fecha), creándola si no existe"""
+        resultado = db.session.execute(
+            update(BloqueoReserva)
+            .where(BloqueoReserva.CanchaId == cancha_id, BloqueoReserva.Fecha == fecha)
+            .values(Version=BloqueoReserva.Version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount == 0:
+            # Si otra transacción la crea primero, el flush falla con IntegrityError y se reintenta
+            db.session.add(BloqueoReserva(CanchaId=cancha_id, Fecha=fecha, Version=1))
+            db.session.flush()
+
+    def _buscar_conflicto(self, cancha_id, fecha, hora_inicio, hora_fin, excluir_id=None):
+        # Lectura con bloqueo para ver lo último confirmado aunque la transacción ya tenga snapshot
+        query = Reserva.query.filter_by(
+            CanchaId=cancha_id,
+            Fecha=fecha,
+            Estado='Confirmada'
+        ).filter(
+            (Reserva.HoraInicio < hora_fin) & (Reserva.HoraFin > hora_inicio)
+        )
+        if excluir_id is not None:
+            query = query.filter(Reserva.Id != excluir_id)
+        return query.with_for_update().first()
+
+    def _cambiar_estado(self, reserva, nuevo_estado):
+        """Pasa la reserva a ``nuevo_estado`` y ajusta los resúmenes una sola vez.
+
+        El estado anterior se lee con bloqueo (el último confirmado, no el de la
+        sesión) y el UPDATE es condicional sobre él: de dos cancelaciones
+        simultáneas solo una resta la reserva de los resúmenes.
+        """
+        anterior = db.session.execute(
+            select(Reserva.Estado).where(Reserva.Id == reserva.Id).with_for_update()
+        ).scalar()
+        if anterior != nuevo_estado:
+            cambiadas = db.session.execute(
+                update(Reserva)
+                .where(Reserva.Id == reserva.Id, Reserva.Estado.isnot_distinct_from(anterior))
+                .values(Estado=nuevo_estado)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if cambiadas == 1:
+                set_committed_value(reserva, 'Estado', nuevo_estado)
+                resumen_service.registrar_cambio(reserva, anterior)
+        return reserva
+
+    def _en_transaccion(self, operacion):
+        """Ejecuta la operación reintentando ante carreras al crear el bloqueo o deadlocks"""
+        for intento in range(1, self.max_reintentos + 1):
+            try:
+                resultado = operacion()
+                db.session.commit()
+                return resultado
+            except ConflictoReservaError:
+                db.session.rollback()
+                raise
+            except (IntegrityError, OperationalError) as e:
+                db.session.rollback()
+                if intento == self.max_reintentos:
+                    raise
+                logger.warning(f"Reintentando reserva por contención ({intento}/{self.max_reintentos}): {e}")
+                time.sleep(0.01 * intento)
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def crear_reserva(self, usuario_id, cancha_id, fecha, hora_inicio, hora_fin, observaciones=''):
+        """Crea una reserva confirmada o lanza ConflictoReservaError si hay cruce de horario"""
+        def operacion():
+            self._bloquear(cancha_id, fecha)
+            if self._buscar_conflicto(cancha_id, fecha, hora_inicio, hora_fin):
+                raise ConflictoReservaError()
+
+            reserva = Reserva(
+                UsuarioId=usuario_id,
+                CanchaId=cancha_id,
+                Fecha=fecha,
+                HoraInicio=hora_inicio,
+                HoraFin=hora_fin,
+                Observaciones=observaciones,
+                Estado='Confirmada'
+            )
+            reserva.fijar_precio(db.session.get(Cancha, cancha_id).PrecioHora)
+            db.session.add(reserva)
+            db.session.flush()
+            resumen_service.registrar_cambio(reserva, nueva=True)
+            return reserva
+
+        return self._en_transaccion(operacion)
+
+    def confirmar_reserva(self, reserva):
+        """Marca una reserva como confirmada verificando que no se cruce con otra"""
+        def operacion():
+            self._bloquear(reserva.CanchaId, reserva.Fecha)
+            if self._buscar_conflicto(reserva.CanchaId, reserva.Fecha, reserva.HoraInicio,
+                                      reserva.HoraFin, excluir_id=reserva.Id):
+                raise ConflictoReservaError()
+            return self._cambiar_estado(reserva, 'Confirmada')
+
+        return self._en_transaccion(operacion)
+
+    def cancelar_reserva(self, reserva):
+        """Marca una reserva como cancelada (no hace nada si ya lo estaba)"""
+        def operacion():
+            return self._cambiar_estado(reserva, 'Cancelada')
+
+        return self._en_transaccion(operacion)
+
+# Instancia global del servicio
+reserva_service = ReservaService()
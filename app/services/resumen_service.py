@@ -0,0 +1,164 @@
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import delete, func, insert, select, update
+from app import db
+from app.models.reserva import Reserva
+from app.models.resumen_reserva import ResumenReservaDiario, ResumenReservaHorario
+
+logger = logging.getLogger(__name__)
+
+CONTADORES = ('Reservas', 'Canceladas', 'HorasReservadas', 'Ingresos')
+
+
+def aporte(estado, hora_inicio, hora_fin, precio_total):
+    """Lo que suma una reserva en ese estado a los contadores de su día y hora"""
+    if estado is None:
+        return dict.fromkeys(CONTADORES, 0)
+    duracion = datetime.combine(date.min, hora_fin) - datetime.combine(date.min, hora_inicio)
+    horas = Decimal(str(duracion.total_seconds() / 3600))
+    confirmada = estado == 'Confirmada'
+    return {
+        'Reservas': 1,
+        'Canceladas': 1 if estado == 'Cancelada' else 0,
+        'HorasReservadas': horas if confirmada else 0,
+        'Ingresos': Decimal(precio_total or 0) if confirmada else 0
+    }
+
+
+def _fin_de_mes(fecha):
+    return (fecha.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+class ResumenService:
+    """Mantiene las tablas de resumen diario y por hora de reservas.
+
+    ``registrar_cambio`` aplica la diferencia entre el aporte anterior y el nuevo
+    de una reserva dentro de la transacción en curso (no hace commit), así que el
+    resumen queda consistente con la tabla de Reservas. Las filas se actualizan
+    con ``UPDATE ... SET col = col + delta`` y se crean si no existen; si otra
+    transacción crea la misma fila a la vez, el flush falla con IntegrityError y
+    ``reserva_service`` reintenta la operación completa.
+    """
+
+    def registrar_cambio(self, reserva, estado_anterior=None, nueva=False):
+        """Actualiza los resúmenes por el paso de ``estado_anterior`` al estado actual de la reserva"""
+        precio_total = reserva.precio_total
+        actual = aporte(reserva.Estado, reserva.HoraInicio, reserva.HoraFin, precio_total)
+        anterior = aporte(estado_anterior, reserva.HoraInicio, reserva.HoraFin, precio_total)
+        delta = {columna: actual[columna] - anterior[columna] for columna in CONTADORES}
+
+        self._sumar(ResumenReservaDiario, {'CanchaId': reserva.CanchaId, 'Fecha': reserva.Fecha}, delta)
+        self._sumar(ResumenReservaHorario, {'CanchaId': reserva.CanchaId, 'Fecha': reserva.Fecha,
+                                            'Hora': reserva.HoraInicio.hour}, delta)
+        if nueva:
+            creada = (reserva.FechaCreacion or datetime.utcnow()).date()
+            self._sumar(ResumenReservaDiario, {'CanchaId': reserva.CanchaId, 'Fecha': creada}, {'Creadas': 1})
+
+    def _sumar(self, modelo, clave, delta):
+        delta = {columna: valor for columna, valor in delta.items() if valor}
+        if not delta:
+            return
+        resultado = db.session.execute(
+            update(modelo)
+            .where(*(getattr(modelo, columna) == valor for columna, valor in clave.items()))
+            .values({columna: getattr(modelo, columna) + valor for columna, valor in delta.items()})
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount == 0:
+            db.session.add(modelo(**clave, **delta))
+            db.session.flush()
+
+    def reconstruir(self, desde=None, hasta=None):
+        """Recalcula los resúmenes desde la tabla de Reservas, mes a mes.
+
+        Sin rango reconstruye todo el histórico. Conviene correrlo con poco
+        tráfico: las reservas que cambien durante la reconstrucción de un mes
+        pueden quedar fuera de ese mes.
+        """
+        if desde is None or hasta is None:
+            minimo, maximo, minimo_creacion, maximo_creacion = db.session.execute(select(
+                func.min(Reserva.Fecha), func.max(Reserva.Fecha),
+                func.min(Reserva.FechaCreacion), func.max(Reserva.FechaCreacion)
+            )).one()
+            fechas = [f for f in (minimo, maximo) if f] + [f.date() for f in (minimo_creacion, maximo_creacion) if f]
+            if not fechas:
+                self._borrar(desde, hasta)
+                db.session.commit()
+                return 0
+            desde = desde or min(fechas)
+            hasta = hasta or max(fechas)
+
+        self._borrar(desde, hasta)
+        creadas = self._creadas_por_dia(desde, hasta)
+
+        filas = 0
+        inicio_mes = desde
+        while inicio_mes <= hasta:
+            fin_mes = min(_fin_de_mes(inicio_mes), hasta)
+            filas += self._reconstruir_periodo(inicio_mes, fin_mes, creadas)
+            db.session.commit()
+            inicio_mes = fin_mes + timedelta(days=1)
+
+        # Días en que se crearon reservas para otras fechas y no se jugó ninguna en esa cancha
+        if creadas:
+            db.session.execute(insert(ResumenReservaDiario), [
+                {'CanchaId': cancha_id, 'Fecha': fecha, 'Creadas': total, 'Reservas': 0, 'Canceladas': 0,
+                 'HorasReservadas': 0, 'Ingresos': 0}
+                for (cancha_id, fecha), total in creadas.items()
+            ])
+            filas += len(creadas)
+            db.session.commit()
+        logger.info(f"Resúmenes de reservas reconstruidos del {desde} al {hasta}: {filas} filas diarias")
+        return filas
+
+    def _borrar(self, desde, hasta):
+        for modelo in (ResumenReservaDiario, ResumenReservaHorario):
+            sentencia = delete(modelo)
+            if desde is not None:
+                sentencia = sentencia.where(modelo.Fecha >= desde)
+            if hasta is not None:
+                sentencia = sentencia.where(modelo.Fecha <= hasta)
+            db.session.execute(sentencia.execution_options(synchronize_session=False))
+
+    def _creadas_por_dia(self, desde, hasta):
+        dia = func.date(Reserva.FechaCreacion, type_=db.Date)
+        filas = db.session.execute(
+            select(Reserva.CanchaId, dia.label('dia'), func.count(Reserva.Id).label('total'))
+            .where(Reserva.FechaCreacion >= datetime.combine(desde, datetime.min.time()),
+                   Reserva.FechaCreacion < datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+            .group_by(Reserva.CanchaId, dia)
+        ).all()
+        return {(fila.CanchaId, fila.dia): fila.total for fila in filas}
+
+    def _reconstruir_periodo(self, desde, hasta, creadas):
+        diario, horario = {}, {}
+        reservas = db.session.execute(
+            select(Reserva.CanchaId, Reserva.Fecha, Reserva.HoraInicio, Reserva.HoraFin, Reserva.Estado,
+                   Reserva.PrecioTotal)
+            .where(Reserva.Fecha >= desde, Reserva.Fecha <= hasta)
+            .execution_options(yield_per=5000)
+        )
+        for reserva in reservas:
+            contribucion = aporte(reserva.Estado, reserva.HoraInicio, reserva.HoraFin, reserva.PrecioTotal)
+            for acumulado, clave in ((diario, (reserva.CanchaId, reserva.Fecha)),
+                                     (horario, (reserva.CanchaId, reserva.Fecha, reserva.HoraInicio.hour))):
+                fila = acumulado.setdefault(clave, dict.fromkeys(CONTADORES, 0))
+                for columna in CONTADORES:
+                    fila[columna] += contribucion[columna]
+
+        filas_diario = [
+            {'CanchaId': cancha_id, 'Fecha': fecha, 'Creadas': creadas.pop((cancha_id, fecha), 0), **contadores}
+            for (cancha_id, fecha), contadores in diario.items()
+        ]
+        if filas_diario:
+            db.session.execute(insert(ResumenReservaDiario), filas_diario)
+        if horario:
+            db.session.execute(insert(ResumenReservaHorario), [
+                {'CanchaId': cancha_id, 'Fecha': fecha, 'Hora': hora, **contadores}
+                for (cancha_id, fecha, hora), contadores in horario.items()
+            ])
+        return len(filas_diario)
+
+# Instancia global del servicio
+resumen_service = ResumenService()
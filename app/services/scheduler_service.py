@@ -1,19 +1,16 @@
 import logging
 from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.date import DateTrigger
 from app import db
 from app.models.reserva import Reserva
 from app.services.notificacion_service import notificacion_service
+from app.services.planificador_service import planificador_service
 from app.services.websocket_service import websocket_service
 
 logger = logging.getLogger(__name__)
 
 class SchedulerService:
-    def __init__(self):
-        self.scheduler = BackgroundScheduler()
-        self.scheduler.start()
-        logger.info("Servicio de programación iniciado")
+    """Tareas periódicas (limpieza, reportes, confirmaciones) sobre el planificador compartido"""
     
     def schedule_reservation_reminders(self):
         """Programa recordatorios para todas las reservas futuras"""
@@ -30,12 +27,11 @@ class SchedulerService:
                 reminder_time = datetime.combine(reserva.fecha, reserva.horario.hora_inicio) - timedelta(hours=24)
                 
                 if reminder_time > datetime.now():
-                    self.scheduler.add_job(
-                        func=self.send_reminder,
+                    planificador_service.agregar_tarea(
+                        'app.services.scheduler_service:scheduler_service.send_reminder',
                         trigger=DateTrigger(run_date=reminder_time),
                         args=[reserva.id],
-                        id=f"reminder_{reserva.id}",
-                        replace_existing=True
+                        id=f"reminder_{reserva.id}"
                     )
                     logger.info(f"Recordatorio programado para reserva {reserva.id} a las {reminder_time}")
             
@@ -73,13 +69,12 @@ class SchedulerService:
         """Programa limpieza diaria de notificaciones antiguas"""
         try:
             # Ejecutar todos los días a las 2:00 AM
-            self.scheduler.add_job(
-                func=self.cleanup_old_notifications,
+            planificador_service.agregar_tarea(
+                'app.services.scheduler_service:scheduler_service.cleanup_old_notifications',
                 trigger='cron',
                 hour=2,
                 minute=0,
-                id="daily_cleanup",
-                replace_existing=True
+                id="daily_cleanup"
             )
             logger.info("Limpieza diaria programada para las 2:00 AM")
             
@@ -114,14 +109,13 @@ class SchedulerService:
         """Programa reportes semanales para administradores"""
         try:
             # Ejecutar todos los lunes a las 9:00 AM
-            self.scheduler.add_job(
-                func=self.send_weekly_report,
+            planificador_service.agregar_tarea(
+                'app.services.scheduler_service:scheduler_service.send_weekly_report',
                 trigger='cron',
                 day_of_week='mon',
                 hour=9,
                 minute=0,
-                id="weekly_report",
-                replace_existing=True
+                id="weekly_report"
             )
             logger.info("Reporte semanal programado para los lunes a las 9:00 AM")
             
@@ -190,12 +184,11 @@ class SchedulerService:
         """Programa confirmaciones automáticas de reservas"""
         try:
             # Ejecutar cada 5 minutos
-            self.scheduler.add_job(
-                func=self.process_pending_reservations,
+            planificador_service.agregar_tarea(
+                'app.services.scheduler_service:scheduler_service.process_pending_reservations',
                 trigger='interval',
                 minutes=5,
-                id="reservation_confirmations",
-                replace_existing=True
+                id="reservation_confirmations"
             )
             logger.info("Procesamiento de reservas pendientes programado cada 5 minutos")
             
@@ -245,16 +238,16 @@ class SchedulerService:
     
     def stop_scheduler(self):
         """Detiene el scheduler"""
-        if self.scheduler.running:
-            self.scheduler.shutdown()
-            logger.info("Scheduler detenido")
+        planificador_service.detener()
     
     def get_scheduler_status(self):
         """Retorna el estado del scheduler"""
+        jobs = planificador_service.obtener_tareas()
         return {
-            'running': self.scheduler.running,
-            'jobs': len(self.scheduler.get_jobs()),
-            'next_run': self.scheduler.get_jobs()[0].next_run_time if self.scheduler.get_jobs() else None
+            'running': planificador_service.activo,
+            'leader': planificador_service.lider,
+            'jobs': len(jobs),
+            'next_run': jobs[0].next_run_time if jobs else None
         }
 
 # Instancia global del servicio
@@ -0,0 +1,97 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ServiciosBackground:
+    """Ciclo de vida de los servicios con hilos propios de cada proceso.
+
+    Crear la app no inicia hilos ni consulta la base de datos. Según
+    ``PROCESO_MODO``:
+
+    - ``completo``: los workers de notificaciones, de reportes y de imágenes, el
+      planificador y el barrido de recordatorios se inician en un hilo aparte con
+      la primera petición.
+    - ``web``: nunca se inician; las notificaciones y los reportes quedan
+      'pendiente' y las imágenes subidas sin variantes, para el proceso worker.
+    - ``worker``: se inician al llamar ``iniciar`` (lo hace ``worker.py``).
+    """
+
+    def __init__(self):
+        self.app = None
+        self.modo = None
+        self.iniciados = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Solo lee la configuración y registra el arranque diferido; no hace I/O"""
+        from app.services.imagen_service import imagen_service
+        from app.services.notificacion_service import notificacion_service
+        from app.services.trabajo_reporte_service import trabajo_reporte_service
+        from app.utils.pdf_utils import renderizador_pdf
+
+        self.app = app
+        self.modo = app.config.get('PROCESO_MODO', 'completo')
+        notificacion_service.init_app(app)
+        trabajo_reporte_service.init_app(app)
+        imagen_service.init_app(app)
+        renderizador_pdf.init_app(app)
+
+        if self.modo == 'completo':
+            app.before_request(self._iniciar_con_primera_peticion)
+        logger.info(f"Servicios de background en modo '{self.modo}'")
+
+    def _iniciar_con_primera_peticion(self):
+        if self.iniciados:
+            return
+        # En otro hilo, para que la primera petición no espere el arranque
+        threading.Thread(target=self.iniciar, name='servicios-background', daemon=True).start()
+
+    def iniciar(self):
+        """Inicia los servicios de background de este proceso (una sola vez)"""
+        with self._lock:
+            if self.iniciados:
+                return
+            self.iniciados = True
+
+        from app.services.imagen_service import imagen_service
+        from app.services.notificacion_service import notificacion_service
+        from app.services.planificador_service import planificador_service
+        from app.services.recordatorio_service import recordatorio_service
+        from app.services.trabajo_reporte_service import trabajo_reporte_service
+        from app.utils.pdf_utils import renderizador_pdf
+
+        notificacion_service.iniciar(self.app)
+        trabajo_reporte_service.iniciar(self.app)
+        imagen_service.iniciar(self.app)
+        # Los reportes se generan en este proceso: backend de PDF listo antes del primero
+        try:
+            renderizador_pdf.iniciar()
+        except Exception as e:
+            logger.error(f"Error iniciando el backend de PDF: {e}")
+        # Un solo proceso por despliegue ejecuta las tareas programadas (barrido de recordatorios,
+        # limpieza); las tareas persisten en la base de datos, por eso no se reprograman al arrancar
+        try:
+            planificador_service.init_app(self.app)
+            recordatorio_service.init_app(self.app)
+        except Exception as e:
+            logger.error(f"Error iniciando el planificador de tareas: {e}")
+        logger.info("Servicios de background iniciados")
+
+    def detener(self):
+        from app.services.imagen_service import imagen_service
+        from app.services.notificacion_service import notificacion_service
+        from app.services.planificador_service import planificador_service
+        from app.services.trabajo_reporte_service import trabajo_reporte_service
+        from app.utils.pdf_utils import renderizador_pdf
+
+        planificador_service.detener()
+        notificacion_service.despachador.detener()
+        trabajo_reporte_service.detener()
+        imagen_service.detener()
+        renderizador_pdf.detener()
+        self.iniciados = False
+
+# Instancia global del servicio
+servicios_background = ServiciosBackground()
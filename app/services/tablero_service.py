@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import (Cancha, ComentarioForo, Like, Post, Reserva, ResumenReservaDiario,
+                        Usuario)
+from app.services.reporte_service import TOP_CANCHAS
+
+logger = logging.getLogger(__name__)
+
+# Modelos cuyos cambios afectan algún valor de la instantánea
+MODELOS_TABLERO = (Cancha, Usuario, Reserva, ResumenReservaDiario, Post, ComentarioForo, Like)
+RESERVAS_RECIENTES = 5
+
+
+def _contar(modelo, *condiciones):
+    return select(func.count()).select_from(modelo).where(*condiciones).scalar_subquery()
+
+
+def _sumar(columna, *condiciones):
+    return select(func.coalesce(func.sum(columna), 0)).where(*condiciones).scalar_subquery()
+
+
+class TableroService:
+    """Instantánea de los contadores del dashboard de administración.
+
+    Los contadores (canchas, usuarios, reservas de hoy y totales, ingresos,
+    posts, comentarios, likes, posts ocultos y eliminados) salen de una sola
+    consulta con subconsultas escalares; con las canchas populares y las
+    últimas reservas son tres consultas en total. La instantánea se guarda
+    ``TABLERO_TTL`` segundos y se descarta cuando una sesión confirma cambios en
+    alguno de los ``MODELOS_TABLERO`` (``after_commit``), así el admin que
+    acaba de crear una cancha la ve contada en seguida.
+
+    La caché es de cada proceso: un cambio hecho en otro worker de gunicorn se
+    ve cuando vence el TTL.
+    """
+
+    def __init__(self):
+        self.ttl = 30
+        self._lock = threading.Lock()
+        self._instantanea = None
+        self._vence = 0.0
+        # Se incrementa al invalidar; una instantánea calculada durante un commit no se guarda
+        self._version = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('TABLERO_TTL', 30)
+        if not event.contains(db.session, 'after_flush', self._despues_flush):
+            event.listen(db.session, 'after_flush', self._despues_flush)
+            event.listen(db.session, 'do_orm_execute', self._sentencia_orm)
+            event.listen(db.session, 'after_commit', self._despues_commit)
+            event.listen(db.session, 'after_soft_rollback', self._despues_rollback)
+
+    # ---------------------- Invalidación ----------------------
+    def _despues_flush(self, session, flush_context):
+        if session.info.get('tablero_cambios'):
+            return
+        for objeto in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(objeto, MODELOS_TABLERO):
+                session.info['tablero_cambios'] = True
+                return
+
+    def _sentencia_orm(self, estado):
+        # INSERT/UPDATE/DELETE masivos (resúmenes de reservas, borrado de likes) no pasan por el flush
+        if (estado.is_insert or estado.is_update or estado.is_delete) and estado.bind_mapper is not None:
+            if issubclass(estado.bind_mapper.class_, MODELOS_TABLERO):
+                estado.session.info['tablero_cambios'] = True
+
+    def _despues_commit(self, session):
+        if session.info.pop('tablero_cambios', False):
+            self.invalidar()
+
+    def _despues_rollback(self, session, transaccion_anterior):
+        if transaccion_anterior.parent is None:
+            session.info.pop('tablero_cambios', None)
+
+    def invalidar(self):
+        with self._lock:
+            self._instantanea = None
+            self._version += 1
+
+    # ---------------------- Instantánea ----------------------
+    def instantanea(self):
+        """Contadores, canchas populares y últimas reservas (dict), desde la caché si sigue vigente"""
+        with self._lock:
+            if self._instantanea is not None and time.monotonic() < self._vence:
+                return self._instantanea
+            version = self._version
+
+        instantanea = self.calcular()
+        with self._lock:
+            if version == self._version:
+                self._instantanea = instantanea
+                self._vence = time.monotonic() + self.ttl
+        return instantanea
+
+    def calcular(self):
+        hoy = datetime.now().date()
+        resumen_con_reservas = ResumenReservaDiario.Reservas > 0
+        contadores = db.session.execute(select(
+            _contar(Cancha).label('total_canchas'),
+            _contar(Usuario).label('total_usuarios'),
+            _sumar(ResumenReservaDiario.Creadas, ResumenReservaDiario.Fecha == hoy).label('reservas_hoy'),
+            _sumar(ResumenReservaDiario.Reservas, resumen_con_reservas).label('total_reservas'),
+            _sumar(ResumenReservaDiario.Ingresos, resumen_con_reservas).label('ingresos_totales'),
+            _contar(Post).label('total_posts_foro'),
+            _contar(ComentarioForo).label('total_comentarios_foro'),
+            _contar(Like).label('total_likes_foro'),
+            _contar(Post, Post.Estado == 'Oculto').label('posts_ocultos'),
+            _contar(Post, Post.Estado == 'Eliminado').label('posts_eliminados'),
+        )).one()._asdict()
+        contadores['total_reservas'] = int(contadores['total_reservas'])
+        contadores['ingresos_totales'] = float(contadores['ingresos_totales'])
+        contadores['posts_pendientes_foro'] = contadores['posts_ocultos'] + contadores['posts_eliminados']
+
+        reservas = func.sum(ResumenReservaDiario.Reservas)
+        populares = db.session.execute(
+            select(Cancha.Nombre, reservas.label('reservas'),
+                   func.sum(ResumenReservaDiario.Ingresos).label('ingresos'))
+            .join(Cancha, ResumenReservaDiario.CanchaId == Cancha.Id)
+            .where(resumen_con_reservas)
+            .group_by(Cancha.Id, Cancha.Nombre)
+            .order_by(reservas.desc(), Cancha.Id)
+            .limit(TOP_CANCHAS)
+        ).all()
+        canchas_populares = [{
+            'nombre': fila.Nombre,
+            'total_reservas': int(fila.reservas),
+            'ingresos': float(fila.ingresos),
+            'ocupacion': round(int(fila.reservas) / max(1, contadores['total_reservas']) * 100, 2),
+        } for fila in populares]
+
+        recientes = Reserva.query.options(
+            joinedload(Reserva.usuario), joinedload(Reserva.cancha)
+        ).order_by(Reserva.FechaCreacion.desc()).limit(RESERVAS_RECIENTES).all()
+        ultimas_reservas = [{
+            'id': r.Id,
+            'usuario': r.usuario.Nombre,
+            'cancha': r.cancha.Nombre,
+            'fecha': r.Fecha.strftime('%d/%m/%Y %H:%M'),
+            'estado': r.Estado,
+        } for r in recientes]
+        actividades = [{
+            'usuario': r.usuario.Nombre,
+            'accion': f"Realizó una reserva en {r.cancha.Nombre}" if r.Estado == 'Confirmada' else f"Reserva {r.Estado}",
+            'fecha': r.FechaCreacion.strftime('%d/%m/%Y %H:%M'),
+        } for r in recientes]
+
+        return {
+            **contadores,
+            'canchas_populares': canchas_populares,
+            'ultimas_reservas': ultimas_reservas,
+            'actividades': actividades,
+            'generado': datetime.now().isoformat(timespec='seconds'),
+        }
+
+# Instancia global del servicio
+tablero_service = TableroService()
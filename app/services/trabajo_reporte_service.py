@@ -0,0 +1,322 @@
+import hashlib
+import importlib
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.trabajo_reporte import TrabajoReporte
+
+logger = logging.getLogger(__name__)
+
+# Tipo de trabajo -> (función 'modulo:funcion' que genera el HTML, nombre del archivo descargado)
+TIPOS_REPORTE = {
+    'reportes_pdf': ('app.utils.reportes_pdf:html_reportes', 'reportes_generales.pdf'),
+    'usuarios_pdf': ('app.utils.reportes_pdf:html_usuarios', 'usuarios_registrados.pdf'),
+    'categorias_pdf': ('app.utils.reportes_pdf:html_categorias', 'categorias_registradas.pdf'),
+}
+
+
+def clave_trabajo(tipo, html_content):
+    """Hash del tipo y del HTML del reporte: datos nuevos o editados dan otra clave"""
+    return hashlib.sha256(f"{tipo}\0{html_content}".encode('utf-8')).hexdigest()
+
+
+def _resolver(referencia):
+    modulo, funcion = referencia.split(':')
+    return getattr(importlib.import_module(modulo), funcion)
+
+
+class TrabajoReporteService:
+    """Generación de reportes PDF fuera de la petición, con caché en disco.
+
+    ``solicitar`` arma el HTML del reporte (las consultas y la plantilla, que
+    son lo barato) y busca el trabajo por la clave, el hash del tipo y de ese
+    HTML: si está pendiente, en proceso o listo y vigente lo devuelve tal cual,
+    así que peticiones con los mismos datos comparten un solo PDF, y cualquier
+    usuario, categoría o reserva nueva o editada da otra clave y otro trabajo.
+    Si no existe lo crea, y si venció o falló lo vuelve a dejar 'pendiente'. Los workers reclaman los pendientes con
+    un UPDATE condicional (como el despachador de notificaciones), guardan el PDF
+    en ``REPORTES_DIRECTORIO`` y lo marcan 'listo' hasta ``ExpiraEn``. El
+    administrador consulta el estado del trabajo y recibe además una notificación
+    in-app con el enlace de descarga.
+
+    Los procesos en modo web no tienen workers: el trabajo queda 'pendiente' para
+    el proceso worker. Con ``REPORTES_ASINCRONOS = False`` (pruebas, scripts) el
+    reporte se genera en el momento.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.directorio = None
+        self.ttl = 3600
+        self.workers = 1
+        self.intervalo_barrido = 5
+        self.tiempo_reclamo = 600
+        self.en_linea = True
+        self.activo = False
+        self._hilos = []
+        self._lock = threading.Lock()
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._ultimo_mantenimiento = 0.0
+
+    def init_app(self, app):
+        """Solo lee la configuración; no inicia hilos ni toca la base de datos"""
+        self.app = app
+        self.directorio = app.config.get('REPORTES_DIRECTORIO') or os.path.join(app.instance_path, 'reportes')
+        self.ttl = app.config.get('REPORTES_TTL', 3600)
+        self.workers = app.config.get('REPORTES_WORKERS', 1)
+        self.intervalo_barrido = app.config.get('REPORTES_INTERVALO_BARRIDO', 5)
+        self.tiempo_reclamo = app.config.get('REPORTES_TIEMPO_RECLAMO', 600)
+        self.en_linea = not app.config.get('REPORTES_ASINCRONOS', True)
+
+    def iniciar(self, app):
+        """Inicia los workers de reportes en este proceso (una sola vez)"""
+        if self.activo or self.en_linea:
+            return
+        self.app = app
+        self._detener.clear()
+        self._hilos = [
+            threading.Thread(target=self._worker, name=f'reportes-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+        self.activo = True
+        # Lo que haya quedado pendiente de un arranque anterior se procesa de inmediato
+        self._hay_trabajo.set()
+        logger.info(f"Workers de reportes iniciados ({self.workers}), archivos en {self.directorio}")
+
+    def detener(self, timeout=5):
+        if not self.activo:
+            return
+        self._detener.set()
+        self._hay_trabajo.set()
+        for hilo in self._hilos:
+            hilo.join(timeout)
+        self.activo = False
+        logger.info("Workers de reportes detenidos")
+
+    def solicitar(self, tipo, parametros=None, usuario_id=None):
+        """Devuelve el trabajo del reporte pedido, creándolo o renovándolo si hace falta"""
+        if tipo not in TIPOS_REPORTE:
+            raise ValueError(f"Tipo de reporte desconocido: {tipo}")
+        referencia, _ = TIPOS_REPORTE[tipo]
+        clave = clave_trabajo(tipo, _resolver(referencia)(parametros or {}))
+
+        for _ in range(3):
+            trabajo = TrabajoReporte.query.filter_by(Clave=clave).first()
+            if trabajo is None:
+                trabajo = TrabajoReporte(Clave=clave, Tipo=tipo, Parametros=parametros or {},
+                                         Estado='pendiente', SolicitadoPor=usuario_id)
+                db.session.add(trabajo)
+                try:
+                    db.session.commit()
+                except IntegrityError:
+                    # Otra petición igual creó el trabajo al mismo tiempo: se usa el suyo
+                    db.session.rollback()
+                    continue
+                logger.info(f"Trabajo de reporte {trabajo.Id} ({tipo}) encolado")
+                self._avisar(trabajo.Id)
+                return trabajo
+
+            if self.vigente(trabajo):
+                return trabajo
+
+            # Vencido, sin archivo o fallido: el WHERE sobre el estado leído hace que
+            # solo una de varias peticiones simultáneas lo vuelva a encolar
+            archivo_anterior = trabajo.Archivo
+            resultado = db.session.execute(
+                update(TrabajoReporte)
+                .where(TrabajoReporte.Id == trabajo.Id, TrabajoReporte.Estado == trabajo.Estado)
+                .values(Estado='pendiente', Archivo=None, Error=None, FechaReclamo=None, FechaFin=None,
+                        ExpiraEn=None, SolicitadoPor=usuario_id, FechaCreacion=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            if resultado.rowcount:
+                self._borrar_archivo(archivo_anterior)
+                logger.info(f"Trabajo de reporte {trabajo.Id} ({tipo}) encolado de nuevo")
+                self._avisar(trabajo.Id)
+            return db.session.get(TrabajoReporte, trabajo.Id, populate_existing=True)
+
+        return TrabajoReporte.query.filter_by(Clave=clave).first()
+
+    def vigente(self, trabajo):
+        """Pendiente, en proceso, o listo con el archivo todavía en disco y sin vencer"""
+        if trabajo.Estado in ('pendiente', 'procesando'):
+            return True
+        return (trabajo.Estado == 'listo' and not trabajo.vencido
+                and trabajo.Archivo is not None and os.path.exists(self.ruta(trabajo)))
+
+    def ruta(self, trabajo):
+        return os.path.join(self.directorio, trabajo.Archivo)
+
+    def url_descarga(self, trabajo):
+        # Sin contexto de petición (worker): solo la ruta, sin servidor
+        adaptador = self.app.url_map.bind('localhost', script_name=self.app.config.get('APPLICATION_ROOT', '/'))
+        return adaptador.build('admin.descargar_trabajo_reporte', {'trabajo_id': trabajo.Id})
+
+    def _avisar(self, trabajo_id):
+        if self.activo:
+            self._hay_trabajo.set()
+        elif self.en_linea:
+            self.procesar_siguiente(trabajo_id)
+
+    def _worker(self):
+        while not self._detener.is_set():
+            procesado = False
+            try:
+                with self.app.app_context():
+                    procesado = self.procesar_siguiente()
+                    if not procesado:
+                        self._mantenimiento()
+            except Exception as e:
+                logger.error(f"Error en worker de reportes: {e}")
+
+            if procesado:
+                continue
+            self._hay_trabajo.wait(self.intervalo_barrido)
+            self._hay_trabajo.clear()
+
+    def _reclamar(self, trabajo_id=None):
+        """Pasa un trabajo 'pendiente' a 'procesando' y lo devuelve (None si no hay)"""
+        for _ in range(3):
+            candidato = select(TrabajoReporte.Id).where(TrabajoReporte.Estado == 'pendiente')
+            if trabajo_id is not None:
+                candidato = candidato.where(TrabajoReporte.Id == trabajo_id)
+            candidato = db.session.execute(candidato.order_by(TrabajoReporte.Id).limit(1)).scalar()
+            if candidato is None:
+                db.session.rollback()
+                return None
+
+            resultado = db.session.execute(
+                update(TrabajoReporte)
+                .where(TrabajoReporte.Id == candidato, TrabajoReporte.Estado == 'pendiente')
+                .values(Estado='procesando', FechaReclamo=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            if resultado.rowcount:
+                return db.session.get(TrabajoReporte, candidato, populate_existing=True)
+        return None
+
+    def procesar_siguiente(self, trabajo_id=None):
+        """Reclama y genera un reporte. Devuelve False si no había trabajos pendientes."""
+        trabajo = self._reclamar(trabajo_id)
+        if trabajo is None:
+            return False
+
+        from app.utils.pdf_utils import html_a_pdf
+
+        referencia, nombre_descarga = TIPOS_REPORTE[trabajo.Tipo]
+        inicio = time.perf_counter()
+        try:
+            pdf = html_a_pdf(_resolver(referencia)(trabajo.Parametros or {}))
+            archivo = f"{trabajo.Clave[:16]}-{uuid.uuid4().hex[:8]}.pdf"
+            self._guardar(archivo, pdf)
+            ahora = datetime.utcnow()
+            valores = dict(Estado='listo', Archivo=archivo, NombreDescarga=nombre_descarga, Error=None,
+                           FechaFin=ahora, ExpiraEn=ahora + timedelta(seconds=self.ttl))
+        except Exception as e:
+            logger.error(f"Error generando el reporte {trabajo.Id} ({trabajo.Tipo}): {e}")
+            db.session.rollback()
+            valores = dict(Estado='fallido', Error=str(e)[:1000], FechaFin=datetime.utcnow())
+
+        db.session.execute(
+            update(TrabajoReporte)
+            .where(TrabajoReporte.Id == trabajo.Id, TrabajoReporte.Estado == 'procesando')
+            .values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        if valores['Estado'] == 'listo':
+            logger.info(f"Reporte {trabajo.Id} ({trabajo.Tipo}) generado en {time.perf_counter() - inicio:.1f}s")
+            self._notificar_listo(trabajo, nombre_descarga)
+        return True
+
+    def _guardar(self, archivo, contenido):
+        # Se escribe a un temporal y se renombra para no servir nunca un PDF a medias
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = os.path.join(self.directorio, archivo)
+        temporal = f"{ruta}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temporal, 'wb') as destino:
+            destino.write(contenido)
+        os.replace(temporal, ruta)
+
+    def _borrar_archivo(self, archivo):
+        if not archivo:
+            return
+        try:
+            os.remove(os.path.join(self.directorio, archivo))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"No se pudo borrar el reporte {archivo}: {e}")
+
+    def _notificar_listo(self, trabajo, nombre_descarga):
+        if not trabajo.SolicitadoPor:
+            return
+        from app.services.notificacion_service import notificacion_service
+
+        notificacion_service.crear_notificacion(
+            usuario_id=trabajo.SolicitadoPor,
+            tipo='in_app',
+            titulo='Reporte listo',
+            mensaje=f'El reporte {nombre_descarga} está listo para descargar.',
+            datos_adicionales={'trabajo_id': trabajo.Id, 'url': self.url_descarga(trabajo)}
+        )
+
+    def _mantenimiento(self):
+        """Libera reclamos vencidos y borra los reportes vencidos (a lo sumo una vez por barrido)"""
+        with self._lock:
+            if time.monotonic() - self._ultimo_mantenimiento < self.intervalo_barrido:
+                return
+            self._ultimo_mantenimiento = time.monotonic()
+        self.liberar_reclamos_vencidos()
+        self.purgar_vencidos()
+
+    def liberar_reclamos_vencidos(self):
+        """Devuelve a 'pendiente' los trabajos de un worker que no terminó"""
+        limite = datetime.utcnow() - timedelta(seconds=self.tiempo_reclamo)
+        resultado = db.session.execute(
+            update(TrabajoReporte)
+            .where(TrabajoReporte.Estado == 'procesando', TrabajoReporte.FechaReclamo < limite)
+            .values(Estado='pendiente', FechaReclamo=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if resultado.rowcount:
+            logger.warning(f"Se liberaron {resultado.rowcount} trabajos de reporte con reclamo vencido")
+
+    def purgar_vencidos(self):
+        """Borra los trabajos listos vencidos (y sus archivos) y los fallidos más viejos que el TTL"""
+        ahora = datetime.utcnow()
+        vencido = or_(
+            TrabajoReporte.ExpiraEn < ahora,
+            and_(TrabajoReporte.Estado == 'fallido', TrabajoReporte.FechaFin < ahora - timedelta(seconds=self.ttl))
+        )
+        filas = db.session.execute(select(TrabajoReporte.Id, TrabajoReporte.Archivo).where(vencido)).all()
+        borrados = 0
+        for fila in filas:
+            # Fila por fila: si una petición lo renovó mientras tanto, ya no cumple la condición
+            resultado = db.session.execute(
+                delete(TrabajoReporte).where(TrabajoReporte.Id == fila.Id, vencido)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            if resultado.rowcount:
+                self._borrar_archivo(fila.Archivo)
+                borrados += 1
+        if borrados:
+            logger.info(f"Se borraron {borrados} reportes vencidos")
+        return borrados
+
+# Instancia global del servicio
+trabajo_reporte_service = TrabajoReporteService()
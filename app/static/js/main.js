@@ -454,15 +454,25 @@ window.mostrarConversacion = function(usuarioId, usuarioNombre) {
         }
     };
 
-// Función para cargar mensajes del chat
-function cargarMensajesChat(usuarioId) {
-    fetch(`/admin/conversacion/${usuarioId}`)
+// Función para cargar mensajes del chat (con cursor: los anteriores a los ya mostrados)
+function cargarMensajesChat(usuarioId, cursor) {
+    const url = cursor ? `/admin/conversacion/${usuarioId}?cursor=${encodeURIComponent(cursor)}` : `/admin/conversacion/${usuarioId}`;
+    fetch(url)
         .then(response => response.json())
         .then(data => {
             if (data.success) {
                 const chatContainer = document.getElementById(`chatMessages-${usuarioId}`);
                 if (chatContainer) {
                     let html = '';
+                    if (data.hay_mas) {
+                        html += `
+                            <div class="text-center my-2 mensajes-anteriores">
+                                <button class="btn btn-sm btn-outline-secondary" onclick="cargarMensajesChat(${usuarioId}, '${data.siguiente_cursor}')">
+                                    <i class="fas fa-chevron-up me-1"></i>Ver mensajes anteriores
+                                </button>
+                            </div>
+                        `;
+                    }
                     
                     data.conversacion.forEach(mensaje => {
                         const mensajeClass = mensaje.respuesta ? 'admin-message' : 'user-message';
@@ -484,8 +494,16 @@ function cargarMensajesChat(usuarioId) {
                         `;
                     });
                     
-                    chatContainer.innerHTML = html;
-                    chatContainer.scrollTop = chatContainer.scrollHeight;
+                    if (cursor) {
+                        // Agregar arriba los anteriores sin mover la vista
+                        chatContainer.querySelector('.mensajes-anteriores')?.remove();
+                        const alturaAnterior = chatContainer.scrollHeight;
+                        chatContainer.insertAdjacentHTML('afterbegin', html);
+                        chatContainer.scrollTop += chatContainer.scrollHeight - alturaAnterior;
+                    } else {
+                        chatContainer.innerHTML = html;
+                        chatContainer.scrollTop = chatContainer.scrollHeight;
+                    }
                 }
             }
         })
@@ -741,3 +759,54 @@ document.addEventListener('DOMContentLoaded', function() {
 
 
 
+
+// ===== LISTADOS PAGINADOS POR CURSOR =====
+// "Cargar más" (macro cargar_mas de _paginacion.html) pide la página siguiente en JSON
+// y agrega sus filas; se activa solo al llegar al final del listado (scroll infinito)
+window.cargarMas = function(enlace) {
+    if (enlace.dataset.cargando) {
+        return;
+    }
+    enlace.dataset.cargando = '1';
+
+    const url = new URL(enlace.href, window.location.origin);
+    url.searchParams.set('format', 'json');
+
+    fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(response => response.json())
+        .then(data => {
+            document.querySelector(enlace.dataset.destino).insertAdjacentHTML('beforeend', data.html);
+            if (data.hay_mas) {
+                enlace.href = data.url_siguiente;
+                delete enlace.dataset.cargando;
+            } else {
+                enlace.closest('.paginacion-cursor').remove();
+            }
+        })
+        .catch(error => {
+            console.error('Error cargando la página siguiente:', error);
+            window.location.href = enlace.href;
+        });
+};
+
+document.addEventListener('click', function(e) {
+    const enlace = e.target.closest('[data-cargar-mas]');
+    if (enlace) {
+        e.preventDefault();
+        cargarMas(enlace);
+    }
+});
+
+document.addEventListener('DOMContentLoaded', function() {
+    if (!('IntersectionObserver' in window)) {
+        return;
+    }
+    const observador = new IntersectionObserver(entradas => {
+        entradas.forEach(entrada => {
+            if (entrada.isIntersecting) {
+                cargarMas(entrada.target);
+            }
+        });
+    }, { rootMargin: '200px' });
+    document.querySelectorAll('[data-cargar-mas]').forEach(enlace => observador.observe(enlace));
+});
@@ -1,63 +1,234 @@
+"""
+Exportación de Excel en modo de solo escritura de openpyxl.
+
+Las filas se escriben a medida que llegan (por ejemplo desde una consulta con
+``yield_per``) y openpyxl las pasa a un archivo temporal, así que la memoria no
+depende del número de filas. Los estilos son estilos con nombre registrados una
+vez en el libro y los anchos de columna se fijan antes de la primera fila, sin
+recorrer las celdas después. El archivo terminado se envía por partes desde un
+archivo temporal.
+"""
+
+import tempfile
+from copy import copy
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from flask import send_file
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from flask import make_response
-from io import BytesIO
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+
+MIMETYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# titulo: encabezado; ancho: ancho fijo; estilo: estilo con nombre (o función valor -> estilo)
+Columna = namedtuple('Columna', ['titulo', 'ancho', 'estilo'])
+
+_borde = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+_centro = Alignment(horizontal='center', vertical='center')
+_izquierda = Alignment(horizontal='left', vertical='center')
+_derecha = Alignment(horizontal='right', vertical='center')
+
+
+def _estilo(nombre, font, alignment=None, fill=None, border=_borde, number_format=None):
+    estilo = NamedStyle(name=nombre, font=font, border=border or Border(), alignment=alignment or Alignment())
+    if fill:
+        estilo.fill = fill
+    if number_format:
+        estilo.number_format = number_format
+    return estilo
+
+
+def _relleno(color):
+    return PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+
+ESTILOS = [
+    _estilo('titulo', Font(name='Arial', size=16, bold=True, color='366092'), _izquierda, border=None),
+    _estilo('subtitulo', Font(name='Arial', size=11, italic=True, color='666666'), _izquierda, border=None),
+    _estilo('nota', Font(name='Arial', size=10, color='666666'), _izquierda, border=None),
+    _estilo('encabezado', Font(name='Arial', size=12, bold=True, color='FFFFFF'),
+            Alignment(horizontal='center', vertical='center', wrap_text=True), _relleno('366092')),
+    _estilo('encabezado_verde', Font(bold=True, color='FFFFFF'), _centro, _relleno('28A745')),
+    _estilo('texto', Font(name='Arial', size=10), _izquierda),
+    _estilo('centrado', Font(name='Arial', size=10), _centro),
+    _estilo('horas', Font(name='Arial', size=10), _centro, number_format='0.0'),
+    _estilo('moneda', Font(name='Arial', size=10), _derecha, number_format='#,##0'),
+    _estilo('etiqueta', Font(name='Arial', size=11, bold=True), _izquierda),
+    _estilo('etiqueta_gris', Font(name='Arial', size=11, bold=True), fill=_relleno('F0F0F0')),
+    _estilo('descripcion', Font(name='Arial', size=10, italic=True, color='666666'), _izquierda),
+    _estilo('usuario', Font(), _centro),
+    _estilo('estado_confirmada', Font(name='Arial', size=10), _centro, _relleno('C6EFCE')),
+    _estilo('estado_pendiente', Font(name='Arial', size=10), _centro, _relleno('FFEB9C')),
+    _estilo('estado_cancelada', Font(name='Arial', size=10), _centro, _relleno('FFC7CE')),
+]
+
+
+def estilo_estado(estado):
+    return {
+        'Confirmada': 'estado_confirmada',
+        'Pendiente': 'estado_pendiente',
+        'Cancelada': 'estado_cancelada'
+    }.get(estado, 'centrado')
+
+
+def crear_libro():
+    """Libro de solo escritura con los estilos con nombre registrados"""
+    wb = Workbook(write_only=True)
+    for estilo in ESTILOS:
+        wb.add_named_style(estilo)
+    return wb
+
+
+def _celda(ws, valor, estilo, resueltos):
+    celda = WriteOnlyCell(ws, value=valor)
+    if estilo in resueltos:
+        # Copiar el estilo ya resuelto evita buscar el estilo con nombre en cada celda
+        celda._style = copy(resueltos[estilo])
+    else:
+        celda.style = estilo
+        resueltos[estilo] = celda._style
+    return celda
+
+
+def escribir_hoja(wb, titulo, columnas, filas, cabecera=(), estilo_encabezado='encabezado'):
+    """Crea una hoja y escribe sus filas en orden; devuelve el número de filas de datos.
+
+    ``cabecera`` son pares (texto, estilo) que ocupan una fila combinada cada uno
+    antes de los encabezados. ``filas`` puede ser cualquier iterable (se consume una vez).
+    """
+    ws = wb.create_sheet(titulo)
+    # En modo de solo escritura los anchos deben fijarse antes de la primera fila
+    for indice, columna in enumerate(columnas, 1):
+        ws.column_dimensions[get_column_letter(indice)].width = columna.ancho
+
+    resueltos = {}
+    ultima = get_column_letter(len(columnas))
+    for numero, (texto, estilo) in enumerate(cabecera, 1):
+        ws.append([_celda(ws, texto, estilo, resueltos)])
+        ws.merged_cells.add(f'A{numero}:{ultima}{numero}')
+
+    ws.append([_celda(ws, columna.titulo, estilo_encabezado, resueltos) for columna in columnas])
+
+    estilos = [columna.estilo for columna in columnas]
+    total = 0
+    for fila in filas:
+        ws.append([
+            _celda(ws, valor, estilo(valor) if callable(estilo) else estilo, resueltos)
+            for valor, estilo in zip(fila, estilos)
+        ])
+        total += 1
+    return total
+
+
+def enviar_libro(wb, nombre_archivo):
+    """Guarda el libro en un archivo temporal y lo envía por partes"""
+    archivo = tempfile.TemporaryFile()
+    wb.save(archivo)
+    tamaño = archivo.tell()
+    archivo.seek(0)
+    # send_file cierra (y así borra) el archivo temporal al terminar la respuesta
+    response = send_file(archivo, mimetype=MIMETYPE_XLSX, as_attachment=True, download_name=nombre_archivo)
+    response.content_length = tamaño
+    return response
+
 
 def generar_excel_usuarios(usuarios):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Usuarios - Flash Reserver"
-
-    # Estilos
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill("solid", fgColor="28A745")
-    alignment = Alignment(horizontal="center", vertical="center")
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    """``usuarios``: filas (Id, Nombre, Email, Telefono, Rol) en cualquier iterable"""
+    wb = crear_libro()
+    columnas = [
+        Columna('ID', 8, 'usuario'),
+        Columna('Nombre', 30, 'usuario'),
+        Columna('Email', 35, 'usuario'),
+        Columna('Teléfono', 18, 'usuario'),
+        Columna('Rol', 16, 'usuario'),
+    ]
+    filas = (
+        (u.Id, u.Nombre, u.Email, u.Telefono if u.Telefono else "No especificado",
+         u.Rol.title() if u.Rol else "Sin rol")
+        for u in usuarios
     )
+    escribir_hoja(wb, "Usuarios - Flash Reserver", columnas, filas, estilo_encabezado='encabezado_verde')
+    return enviar_libro(wb, 'usuarios.xlsx')
 
-    # Encabezados
-    headers = ["ID", "Nombre", "Email", "Teléfono", "Rol"]
-    ws.append(headers)
-    for col in ws.iter_cols(min_row=1, max_row=1, min_col=1, max_col=len(headers)):
-        for cell in col:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = alignment
-            cell.border = border
-
-    # Filas de datos
-    for u in usuarios:
-        fila = [
-            u.Id,
-            u.Nombre,
-            u.Email,
-            u.Telefono if u.Telefono else "No especificado",
-            u.rol.Nombre.title()
-        ]
-        ws.append(fila)
-
-    # Aplicar bordes y alineación a las celdas
-    for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
-        for cell in row:
-            cell.alignment = alignment
-            cell.border = border
-
-    # Ajuste de ancho de columnas
-    for column_cells in ws.columns:
-        length = max(len(str(cell.value)) for cell in column_cells)
-        ws.column_dimensions[column_cells[0].column_letter].width = length + 2
-
-    # Guardar en memoria
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    # Respuesta HTTP
-    response = make_response(output.read())
-    response.headers['Content-Disposition'] = 'attachment; filename=usuarios.xlsx'
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    return response
+
+COLUMNAS_RESERVAS = [
+    Columna('ID', 8, 'centrado'),
+    Columna('Usuario', 25, 'texto'),
+    Columna('Cancha', 20, 'texto'),
+    Columna('Fecha', 12, 'texto'),
+    Columna('Hora Inicio', 12, 'centrado'),
+    Columna('Hora Fin', 12, 'centrado'),
+    Columna('Duración (horas)', 15, 'horas'),
+    Columna('Estado', 12, estilo_estado),
+    Columna('Precio Total (COP)', 18, 'moneda'),
+    Columna('Fecha Creación', 20, 'centrado'),
+]
+
+
+def filas_reservas(reservas):
+    """Convierte filas (Id, Usuario, Cancha, Fecha, HoraInicio, HoraFin, Estado, PrecioTotal,
+    PrecioHoraCancha, FechaCreacion) en los valores de la hoja de reservas"""
+    for r in reservas:
+        duracion = (datetime.combine(r.Fecha, r.HoraFin) - datetime.combine(r.Fecha, r.HoraInicio)).total_seconds() / 3600
+        precio = r.PrecioTotal
+        if precio is None:
+            # Reserva sin precio fijado: precio actual de la cancha, como Reserva.precio_total
+            precio = Decimal(str(r.PrecioHoraCancha or 0)) * Decimal(str(duracion))
+        yield (
+            r.Id,
+            r.Usuario,
+            r.Cancha,
+            r.Fecha.strftime('%d/%m/%Y'),
+            r.HoraInicio.strftime('%H:%M'),
+            r.HoraFin.strftime('%H:%M'),
+            duracion,
+            r.Estado,
+            float(precio),
+            r.FechaCreacion.strftime('%d/%m/%Y %H:%M') if r.FechaCreacion else ''
+        )
+
+
+def generar_excel_reservas(reservas, estadisticas, usuario_mas_activo, descripcion_filtro, generado_por, nombre_archivo):
+    """Reporte de reservas con hojas de estadísticas y resumen.
+
+    ``reservas`` son filas de la consulta de exportación (ver ``filas_reservas``);
+    se consumen una sola vez mientras se escribe la hoja.
+    """
+    wb = crear_libro()
+    generado = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+
+    total_registros = escribir_hoja(wb, "Reservas", COLUMNAS_RESERVAS, filas_reservas(reservas), cabecera=[
+        ("REPORTE DE RESERVAS - FLASH RESERVER", 'titulo'),
+        (f"Filtros aplicados: {descripcion_filtro}", 'subtitulo'),
+        (f"Generado el: {generado}", 'nota'),
+    ])
+
+    promedio = round(estadisticas.ingresos_totales / estadisticas.total_reservas if estadisticas.total_reservas else 0, 0)
+    escribir_hoja(wb, "Estadísticas", [
+        Columna('Métrica', 25, 'etiqueta'),
+        Columna('Valor', 20, lambda valor: 'moneda' if isinstance(valor, float) else 'centrado'),
+        Columna('Descripción', 50, 'descripcion'),
+    ], [
+        ('Total Usuarios', estadisticas.total_usuarios, 'Número total de usuarios registrados'),
+        ('Total Canchas', estadisticas.total_canchas, 'Número total de canchas disponibles'),
+        ('Total Reservas', estadisticas.total_reservas, 'Número total de reservas en el período'),
+        ('Reservas Hoy', estadisticas.reservas_hoy, 'Reservas realizadas hoy'),
+        ('Ingresos Totales (COP)', float(estadisticas.ingresos_totales), 'Ingresos totales en el período'),
+        ('Promedio por Reserva', float(promedio), 'Precio promedio por reserva'),
+        ('Cancha Más Popular', estadisticas.cancha_mas_popular, 'Cancha con más reservas'),
+        ('Usuario Más Activo', usuario_mas_activo, 'Usuario con más reservas')
+    ], cabecera=[("ESTADÍSTICAS GENERALES", 'titulo'), ("", 'nota')])
+
+    escribir_hoja(wb, "Resumen", [
+        Columna('Dato', 30, 'etiqueta_gris'),
+        Columna('Valor', 40, 'texto'),
+    ], [
+        ('Período del Reporte', descripcion_filtro),
+        ('Total de Registros', total_registros),
+        ('Fecha de Generación', generado),
+        ('Generado por', generado_por)
+    ], cabecera=[("RESUMEN EJECUTIVO", 'titulo'), ("", 'nota')])
+
+    return enviar_libro(wb, nombre_archivo)
@@ -0,0 +1,174 @@
+"""
+Paginación por cursor (keyset) para los listados.
+
+En lugar de ``OFFSET`` cada página sigue desde los valores de orden de la última
+fila de la anterior (``WHERE (FechaCreacion, Id) < (:fecha, :id)``), así que
+pedir la página 200 cuesta lo mismo que la primera y las filas insertadas
+mientras se navega no desplazan ni repiten resultados. El orden debe terminar en
+una columna única (normalmente ``Id``), las columnas de orden no deben tener
+NULL y conviene que exista un índice con ellas detrás de las de igualdad de los
+filtros.
+
+El total se cuenta solo en la primera página y con tope
+(``PAGINACION_MAX_CONTEO``): basta para mostrar "1000+" sin recorrer toda la
+tabla con cada filtro.
+"""
+
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional
+from flask import abort, current_app, has_request_context, jsonify, render_template, request, url_for
+from sqlalchemy import Date, DateTime, and_, func, inspect, or_
+from sqlalchemy.sql import operators
+from app import db
+
+
+@dataclass
+class Pagina:
+    elementos: List = field(default_factory=list)
+    siguiente_cursor: Optional[str] = None
+    total: Optional[int] = None  # solo en la primera página
+    total_exacto: bool = True
+    url_siguiente: Optional[str] = None
+
+    @property
+    def hay_mas(self):
+        return self.siguiente_cursor is not None
+
+    @property
+    def total_texto(self):
+        """Total para mostrar: "1000+" cuando el conteo llegó al tope"""
+        if self.total is None:
+            return ''
+        return str(self.total) if self.total_exacto else f"{self.total}+"
+
+    def a_dict(self):
+        return {
+            'siguiente_cursor': self.siguiente_cursor,
+            'hay_mas': self.hay_mas,
+            'total': self.total,
+            'total_exacto': self.total_exacto,
+            'url_siguiente': self.url_siguiente,
+        }
+
+
+def _criterios(orden):
+    """(expresión, descendente) de cada criterio de ``order_by``"""
+    criterios = []
+    for criterio in orden:
+        modificador = getattr(criterio, 'modifier', None)
+        if modificador in (operators.desc_op, operators.asc_op):
+            criterios.append((criterio.element, modificador is operators.desc_op))
+        else:
+            criterios.append((criterio, False))
+    return criterios
+
+
+def _a_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _desde_json(valor, tipo):
+    if valor is None:
+        return None
+    if isinstance(tipo, DateTime):
+        return datetime.fromisoformat(valor)
+    if isinstance(tipo, Date):
+        return date.fromisoformat(valor)
+    return valor
+
+
+def codificar_cursor(valores):
+    texto = json.dumps([_a_json(v) for v in valores], separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, criterios):
+    """Valores de orden guardados en el cursor; ``ValueError`` si no es válido"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {e}")
+    if not isinstance(valores, list) or len(valores) != len(criterios):
+        raise ValueError("Cursor inválido: no corresponde al orden del listado")
+    return [_desde_json(valor, expresion.type) for valor, (expresion, _) in zip(valores, criterios)]
+
+
+def _despues_de(criterios, valores):
+    """Condición de las filas posteriores al cursor en el orden dado"""
+    alternativas = []
+    for i, (expresion, descendente) in enumerate(criterios):
+        iguales = [criterios[j][0] == valores[j] for j in range(i)]
+        siguiente = expresion < valores[i] if descendente else expresion > valores[i]
+        alternativas.append(and_(*iguales, siguiente))
+    # La primera columna también como rango simple para que el índice acote el recorrido
+    primera, descendente = criterios[0]
+    rango = primera <= valores[0] if descendente else primera >= valores[0]
+    return and_(rango, or_(*alternativas))
+
+
+def contar_aproximado(query, maximo):
+    """Total de filas hasta ``maximo``; devuelve (total, exacto)"""
+    # Solo la clave primaria: con una constante la consulta sin filtros perdería el FROM
+    entidad = query.column_descriptions[0]['entity']
+    sub = query.with_entities(*inspect(entidad).primary_key).order_by(None).limit(maximo + 1).subquery()
+    total = db.session.query(func.count()).select_from(sub).scalar()
+    return min(total, maximo), total <= maximo
+
+
+def paginar(query, orden, cursor=None, por_pagina=None, contar=None):
+    """
+    Página de ``query`` ordenada por ``orden`` (lista de criterios de
+    ``order_by`` terminada en una columna única) a partir de ``cursor``.
+    Un cursor inválido responde 400.
+    """
+    por_pagina = por_pagina or current_app.config.get('PAGINACION_POR_PAGINA', 25)
+    criterios = _criterios(orden)
+    if contar is None:
+        contar = not cursor
+
+    total, exacto = None, True
+    if contar:
+        total, exacto = contar_aproximado(query, current_app.config.get('PAGINACION_MAX_CONTEO', 1000))
+
+    if cursor:
+        try:
+            valores = decodificar_cursor(cursor, criterios)
+        except ValueError as e:
+            abort(400, description=str(e))
+        query = query.filter(_despues_de(criterios, valores))
+
+    # Los valores de orden se piden como columnas extra para armar el siguiente cursor
+    etiquetas = [expresion.label(f'_cursor_{i}') for i, (expresion, _) in enumerate(criterios)]
+    filas = query.add_columns(*etiquetas).order_by(None).order_by(*orden).limit(por_pagina + 1).all()
+
+    pagina = Pagina(elementos=[fila[0] for fila in filas[:por_pagina]], total=total, total_exacto=exacto)
+    if len(filas) > por_pagina:
+        pagina.siguiente_cursor = codificar_cursor(filas[por_pagina - 1][-len(criterios):])
+        if has_request_context() and request.endpoint:
+            pagina.url_siguiente = url_pagina(pagina.siguiente_cursor)
+    return pagina
+
+
+def url_pagina(cursor):
+    """URL de la petición actual (mismos filtros) a partir de ``cursor``"""
+    argumentos = {clave: valor for clave, valor in request.args.items() if clave not in ('cursor', 'format')}
+    return url_for(request.endpoint, **(request.view_args or {}), **argumentos, cursor=cursor)
+
+
+def quiere_json():
+    """Peticiones de scroll infinito: AJAX o ``?format=json``"""
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.args.get('format') == 'json'
+
+
+def respuesta_pagina(pagina, plantilla, **contexto):
+    """JSON de una página: las filas renderizadas con ``plantilla`` y el siguiente cursor"""
+    return jsonify({'success': True, 'html': render_template(plantilla, **contexto), **pagina.a_dict()})
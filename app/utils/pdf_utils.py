@@ -1,19 +1,225 @@
+"""
+Generación de PDFs con backends intercambiables y caché por contenido.
+
+``PDF_BACKEND`` elige el backend:
+
+- ``wkhtmltopdf``: pdfkit lanza un proceso de wkhtmltopdf por PDF (mejor soporte
+  de CSS, pero paga el arranque y la carga de fuentes en cada PDF).
+- ``xhtml2pdf``: se genera dentro del proceso, sin lanzar nada.
+- ``xhtml2pdf_procesos``: xhtml2pdf en un pool de procesos ya calentados
+  (módulos y fuentes cargados), para generar varios PDFs en paralelo sin
+  competir por el GIL de los hilos de la app.
+- ``auto`` (por defecto): wkhtmltopdf si está instalado, si no xhtml2pdf.
+
+El PDF de un HTML ya generado se guarda en ``PDF_CACHE_DIRECTORIO`` con el hash
+del backend y del HTML como nombre, así que volver a exportar datos que no
+cambiaron (mismos usuarios, mismas categorías) no vuelve a generar el PDF.
+"""
+
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, wait
 import pdfkit
 from flask import make_response
-import os
 
-# Ruta al ejecutable wkhtmltopdf en Windows
-WKHTMLTOPDF_PATH = r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
+logger = logging.getLogger(__name__)
 
-config = pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_PATH)
 
-def generar_pdf(html_content, filename="reporte.pdf"):
-    options = {
-        'encoding': 'UTF-8',
-        'enable-local-file-access': None  # necesario para imágenes locales
-    }
+def _xhtml2pdf(html_content):
+    from xhtml2pdf import pisa
+
+    destino = io.BytesIO()
+    resultado = pisa.CreatePDF(html_content, dest=destino, encoding='utf-8')
+    if resultado.err:
+        raise RuntimeError(f"xhtml2pdf no pudo generar el PDF ({resultado.err} errores)")
+    return destino.getvalue()
+
+
+def _calentar_proceso():
+    # Importa xhtml2pdf/reportlab y carga las fuentes base una vez por proceso del pool
+    _xhtml2pdf('<p>Flash Reserver</p>')
+
+
+class BackendWkhtmltopdf:
+    nombre = 'wkhtmltopdf'
+
+    def __init__(self, ruta):
+        self.configuracion = pdfkit.configuration(wkhtmltopdf=ruta)
+
+    def renderizar(self, html_content):
+        options = {
+            'encoding': 'UTF-8',
+            'enable-local-file-access': None  # necesario para imágenes locales
+        }
+        return pdfkit.from_string(html_content, False, options=options, configuration=self.configuracion)
+
+
+class BackendXhtml2pdf:
+    nombre = 'xhtml2pdf'
+
+    def iniciar(self):
+        _calentar_proceso()
+
+    def renderizar(self, html_content):
+        return _xhtml2pdf(html_content)
+
+
+class BackendPoolProcesos:
+    nombre = 'xhtml2pdf_procesos'
+
+    def __init__(self, procesos=2, timeout=120):
+        self.procesos = procesos
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
 
-    pdf = pdfkit.from_string(html_content, False, options=options, configuration=config)
+    def iniciar(self):
+        """Arranca y calienta todos los procesos del pool"""
+        with self._lock:
+            if self._pool is not None:
+                return
+            # spawn: los procesos no heredan los hilos ni las conexiones abiertas de la app
+            self._pool = ProcessPoolExecutor(max_workers=self.procesos,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_calentar_proceso)
+            # Un envío por proceso para que todos arranquen ahora y no con el primer PDF
+            wait([self._pool.submit(os.getpid) for _ in range(self.procesos)])
+        logger.info(f"Pool de {self.procesos} procesos de PDF iniciado")
+
+    def renderizar(self, html_content):
+        if self._pool is None:
+            self.iniciar()
+        return self._pool.submit(_xhtml2pdf, html_content).result(self.timeout)
+
+    def detener(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+class RenderizadorPDF:
+    """Backend de PDF configurado para el proceso y caché de PDFs por contenido.
+
+    La caché usa como clave el hash del backend y del HTML, igual que los
+    trabajos de ``trabajo_reporte_service`` usan el del tipo y del HTML: un
+    trabajo listo se reutiliza mientras los datos no cambien, y esta caché
+    entrega sin renderizar el PDF de un trabajo renovado cuando su archivo
+    venció (``REPORTES_TTL``) o cuando el reporte vuelve a un contenido ya visto.
+    """
+
+    def __init__(self):
+        self.configuracion = {}
+        self.backend = None
+        self.directorio_cache = None
+        self.max_cache = 500
+        self.aciertos_cache = 0
+        self.renders = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Solo lee la configuración; el backend se crea con el primer PDF o con ``iniciar``"""
+        self.configuracion = {
+            'backend': app.config.get('PDF_BACKEND', 'auto'),
+            'wkhtmltopdf': app.config.get('WKHTMLTOPDF_PATH'),
+            'procesos': app.config.get('PDF_PROCESOS', 2),
+        }
+        self.directorio_cache = app.config.get('PDF_CACHE_DIRECTORIO') or os.path.join(app.instance_path, 'pdf_cache')
+        self.max_cache = app.config.get('PDF_CACHE_MAX_ARCHIVOS', 500)
+
+    def obtener_backend(self):
+        if self.backend is None:
+            with self._lock:
+                if self.backend is None:
+                    self.backend = self._crear_backend()
+                    logger.info(f"Backend de PDF: {self.backend.nombre}")
+        return self.backend
+
+    def _crear_backend(self):
+        nombre = self.configuracion.get('backend', 'auto')
+        if nombre in ('auto', 'wkhtmltopdf'):
+            ruta = self.configuracion.get('wkhtmltopdf') or shutil.which('wkhtmltopdf')
+            if ruta:
+                return BackendWkhtmltopdf(ruta)
+            if nombre == 'wkhtmltopdf':
+                raise RuntimeError("No se encontró wkhtmltopdf: instálelo o defina WKHTMLTOPDF_PATH")
+            return BackendXhtml2pdf()
+        if nombre == 'xhtml2pdf':
+            return BackendXhtml2pdf()
+        if nombre == 'xhtml2pdf_procesos':
+            return BackendPoolProcesos(self.configuracion.get('procesos', 2))
+        raise ValueError(f"PDF_BACKEND desconocido: {nombre}")
+
+    def iniciar(self):
+        """Crea el backend y lo calienta (procesos del pool, módulos y fuentes)"""
+        backend = self.obtener_backend()
+        if hasattr(backend, 'iniciar'):
+            backend.iniciar()
+
+    def detener(self):
+        if self.backend is not None and hasattr(self.backend, 'detener'):
+            self.backend.detener()
+
+    def renderizar(self, html_content):
+        """Bytes del PDF del HTML, desde la caché si ya se generó con el mismo backend"""
+        backend = self.obtener_backend()
+        if not self.directorio_cache:
+            self.renders += 1
+            return backend.renderizar(html_content)
+
+        clave = hashlib.sha256(f"{backend.nombre}\0{html_content}".encode('utf-8')).hexdigest()
+        ruta = os.path.join(self.directorio_cache, f"{clave}.pdf")
+        try:
+            with open(ruta, 'rb') as archivo:
+                pdf = archivo.read()
+            # La fecha de modificación marca el último uso para el recorte de la caché
+            os.utime(ruta)
+            self.aciertos_cache += 1
+            return pdf
+        except FileNotFoundError:
+            pass
+
+        pdf = backend.renderizar(html_content)
+        self.renders += 1
+        self._guardar(ruta, pdf)
+        return pdf
+
+    def _guardar(self, ruta, pdf):
+        os.makedirs(self.directorio_cache, exist_ok=True)
+        temporal = f"{ruta}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temporal, 'wb') as destino:
+            destino.write(pdf)
+        os.replace(temporal, ruta)
+        self._recortar()
+
+    def _recortar(self):
+        """Deja solo los ``max_cache`` PDFs usados más recientemente"""
+        try:
+            archivos = [entrada for entrada in os.scandir(self.directorio_cache) if entrada.name.endswith('.pdf')]
+            if len(archivos) <= self.max_cache:
+                return
+            archivos.sort(key=lambda entrada: entrada.stat().st_mtime)
+            for entrada in archivos[:len(archivos) - self.max_cache]:
+                os.remove(entrada.path)
+        except OSError as e:
+            logger.warning(f"No se pudo recortar la caché de PDFs: {e}")
+
+# Instancia global del renderizador
+renderizador_pdf = RenderizadorPDF()
+
+
+def html_a_pdf(html_content):
+    """Convierte HTML en los bytes del PDF con el backend configurado"""
+    return renderizador_pdf.renderizar(html_content)
+
+def generar_pdf(html_content, filename="reporte.pdf"):
+    pdf = html_a_pdf(html_content)
 
     response = make_response(pdf)
     response.headers['Content-Type'] = 'application/pdf'
@@ -0,0 +1,113 @@
+"""
+Perfiles de carga de los listados.
+
+Cada listado declara aquí qué relaciones usa su plantilla y cómo cargarlas, en
+lugar de que cada fila las pida al accederlas (una consulta por fila, N+1):
+
+- ``joinedload`` para relaciones muchos-a-uno (usuario, cancha, categoría):
+  llegan en la misma consulta con un JOIN.
+- ``contains_eager`` cuando la consulta ya hace ese JOIN para filtrar.
+- ``selectinload`` para colecciones (imágenes, likes, comentarios): una
+  consulta ``IN`` por relación para todas las filas.
+- ``load_only`` para no traer columnas que el listado no muestra.
+- ``with_expression`` para conteos que la plantilla mostraba cargando la
+  colección completa (reservas de una cancha, canchas de una categoría).
+
+``benchmarks/verificar_consultas.py`` comprueba que el número de consultas de
+cada listado no cambie con el tamaño de los datos.
+"""
+
+from sqlalchemy.orm import contains_eager, joinedload, load_only, selectinload, with_expression
+from app import db
+from app.models import Cancha, Categoria, Comentario, ComentarioForo, Post, Reserva, TipoCancha, Usuario
+from app.models.mensaje import Mensaje
+
+
+def _contar(columna, *condiciones):
+    return db.select(db.func.count()).where(*condiciones).correlate_except(columna.class_).scalar_subquery()
+
+
+def _autor():
+    # Lo que muestran las tarjetas y filas de autor (nombre y foto)
+    return load_only(Usuario.Nombre, Usuario.FotoPerfil, Usuario.Email)
+
+
+PERFILES = {
+    # admin/_filas_reservas.html: cliente y cancha (la consulta ya los une para filtrar)
+    'reservas_admin': lambda: (
+        contains_eager(Reserva.usuario),
+        contains_eager(Reserva.cancha),
+    ),
+    # admin/ver_usuario.html: cancha y tipo de cada reserva
+    'reservas_usuario': lambda: (
+        joinedload(Reserva.cancha).joinedload(Cancha.tipo_cancha),
+    ),
+    # client/_reservas.html: cancha, categoría, tipo (ya unidos para filtrar) e imágenes
+    'reservas_cliente': lambda: (
+        contains_eager(Reserva.cancha).contains_eager(Cancha.categoria),
+        contains_eager(Reserva.cancha).contains_eager(Cancha.tipo_cancha),
+        contains_eager(Reserva.cancha).selectinload(Cancha.imagen),
+    ),
+    # admin/_filas_usuarios.html: rol (ya unido para filtrar)
+    'usuarios_admin': lambda: (
+        contains_eager(Usuario.rol),
+    ),
+    # admin/canchas.html: categoría, tipo y reservas confirmadas
+    'canchas_admin': lambda: (
+        joinedload(Cancha.categoria),
+        joinedload(Cancha.tipo_cancha),
+        with_expression(Cancha.reservas_confirmadas,
+                        _contar(Reserva.CanchaId, Reserva.CanchaId == Cancha.Id, Reserva.Estado == 'Confirmada')),
+    ),
+    # client/canchas.html, api de canchas y canchas similares: categoría y tipo
+    'canchas_cliente': lambda: (
+        joinedload(Cancha.categoria),
+        joinedload(Cancha.tipo_cancha),
+    ),
+    # client/cancha_detalle.html: la cancha con sus imágenes, horarios, categoría y tipo
+    'cancha_detalle': lambda: (
+        joinedload(Cancha.categoria),
+        joinedload(Cancha.tipo_cancha),
+        selectinload(Cancha.imagen),
+        selectinload(Cancha.horarios),
+    ),
+    # client/cancha_detalle.html: autor de cada comentario
+    'comentarios_cancha': lambda: (
+        joinedload(Comentario.usuario).options(_autor()),
+    ),
+    # admin/categorias.html y admin/tipos_cancha.html: canchas de cada una
+    'categorias_admin': lambda: (
+        with_expression(Categoria.total_canchas, _contar(Cancha.CategoriaId, Cancha.CategoriaId == Categoria.Id)),
+    ),
+    'tipos_cancha_admin': lambda: (
+        with_expression(TipoCancha.total_canchas, _contar(Cancha.TipoCanchaId, Cancha.TipoCanchaId == TipoCancha.Id)),
+    ),
+    # foro/_posts.html y admin/_filas_posts.html: autor (los contadores son columnas del post
+    # y el "me gusta" lo precarga foro_service.marcar_likes)
+    'posts_listado': lambda: (
+        joinedload(Post.usuario).options(_autor()),
+    ),
+    # foro/ver_post.html: además los comentarios con su autor
+    'post_detalle': lambda: (
+        joinedload(Post.usuario).options(_autor()),
+        selectinload(Post.comentarios).joinedload(ComentarioForo.usuario).options(_autor()),
+    ),
+    # admin/estadisticas_foro.html: autor de los posts más populares
+    'posts_populares': lambda: (
+        selectinload(Post.usuario).options(_autor()),
+    ),
+    # Comentarios recientes del foro: autor y título del post
+    'comentarios_foro_recientes': lambda: (
+        joinedload(ComentarioForo.usuario).options(_autor()),
+        joinedload(ComentarioForo.post).load_only(Post.Titulo),
+    ),
+    # Notificaciones del admin: remitente de cada conversación
+    'mensajes_remitente': lambda: (
+        joinedload(Mensaje.usuario).options(_autor()),
+    ),
+}
+
+
+def con_perfil(query, nombre):
+    """``query`` con las estrategias de carga del perfil ``nombre``"""
+    return query.options(*PERFILES[nombre]())
@@ -0,0 +1,63 @@
+import logging
+import threading
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class RegistroPlantillasEmail:
+    """Plantillas de email de notificaciones, compiladas una sola vez por app.
+
+    Cada tipo de email tiene su archivo en ``templates/emails``. La primera vez
+    que se pide un tipo se compila con el entorno Jinja de la app y el objeto
+    ``Template`` queda guardado en ``app.extensions``; Jinja deja el HTML fijo
+    (estilos, estructura) como constantes del código compilado, así que cada
+    envío solo evalúa las partes variables. ``render_template_string`` en cambio
+    volvía a parsear y compilar los ~12 KB de HTML en cada email.
+    """
+
+    PLANTILLAS = {
+        'general': 'emails/notificacion_general.html',
+        'cancelacion': 'emails/notificacion_cancelacion.html',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _compiladas(self, app):
+        return app.extensions.setdefault('plantillas_email', {})
+
+    def precargar(self, app):
+        """Compila todas las plantillas al iniciar la app"""
+        with app.app_context():
+            for clave in self.PLANTILLAS:
+                self.obtener(clave)
+        logger.info(f"Plantillas de email compiladas: {', '.join(self.PLANTILLAS)}")
+
+    def obtener(self, clave):
+        """Devuelve la plantilla compilada del tipo pedido (o la general si no existe)"""
+        if clave not in self.PLANTILLAS:
+            clave = 'general'
+        app = current_app._get_current_object()
+        compiladas = self._compiladas(app)
+        plantilla = compiladas.get(clave)
+        if plantilla is None:
+            with self._lock:
+                plantilla = compiladas.get(clave)
+                if plantilla is None:
+                    plantilla = app.jinja_env.get_template(self.PLANTILLAS[clave])
+                    compiladas[clave] = plantilla
+        return plantilla
+
+    def renderizar(self, clave, **contexto):
+        return self.obtener(clave).render(**contexto)
+
+    @staticmethod
+    def clave_para(titulo, datos_adicionales=None):
+        """Tipo de plantilla de una notificación: explícito en los datos o deducido del título"""
+        if datos_adicionales and datos_adicionales.get('plantilla'):
+            return datos_adicionales['plantilla']
+        return 'cancelacion' if 'cancelada' in (titulo or '').lower() else 'general'
+
+# Instancia global del registro
+plantillas_email = RegistroPlantillasEmail()
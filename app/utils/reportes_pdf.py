@@ -0,0 +1,67 @@
+"""
+HTML de los reportes PDF de administración.
+
+Cada función recibe los parámetros guardados en el trabajo de reporte y solo
+necesita contexto de aplicación (no de petición), así que puede ejecutarse en
+el worker de ``trabajo_reporte_service``.
+"""
+
+import os
+from datetime import datetime
+from flask import current_app, render_template
+from app.models import Usuario, Categoria
+from app.utils.perfiles_consulta import con_perfil
+
+
+def _logo_path():
+    # Ruta absoluta para el logo
+    return os.path.join(current_app.root_path, 'static', 'images', 'logo.png')
+
+
+def html_reportes(parametros):
+    from app.services.reporte_service import FiltroReporte, reporte_service
+
+    filtro = FiltroReporte.desde_args(parametros)
+    estadisticas = reporte_service.calcular(filtro)
+    return render_template(
+        'admin/reportes_pdf.html',
+        total_usuarios=estadisticas.total_usuarios,
+        total_canchas=estadisticas.total_canchas,
+        total_reservas=estadisticas.total_reservas,
+        reservas_hoy=estadisticas.reservas_hoy,
+        meses=estadisticas.meses,
+        reservas_por_mes=estadisticas.reservas_por_mes,
+        ingresos_por_mes=estadisticas.ingresos_por_mes,
+        ocupacion_labels=estadisticas.ocupacion_labels,
+        ocupacion_values=estadisticas.ocupacion_values,
+        heatmap=estadisticas.heatmap,
+        fecha_generacion=datetime.now().strftime('%d/%m/%Y'),
+        logo_path=_logo_path(),
+        fecha_inicio=filtro.inicio,
+        fecha_fin=filtro.fin
+    )
+
+
+def html_usuarios(parametros):
+    usuarios = Usuario.query.all()
+    return render_template(
+        'admin/usuarios_pdf.html',
+        usuarios=usuarios,
+        total_usuarios=len(usuarios),
+        usuarios_=sum(1 for u in usuarios if u.Estado),
+        fecha_generacion=datetime.now().strftime('%d/%m/%Y'),
+        logo_path=_logo_path()
+    )
+
+
+def html_categorias(parametros):
+    # Con el conteo de canchas en la misma consulta (perfil del listado de categorías)
+    categorias = con_perfil(Categoria.query, 'categorias_admin').order_by(Categoria.Id).all()
+    return render_template(
+        'admin/categorias_pdf.html',
+        categorias=categorias,
+        total_categorias=len(categorias),
+        categorias_con_canchas=sum(1 for c in categorias if c.total_canchas),
+        fecha_generacion=datetime.now().strftime('%d/%m/%Y'),
+        logo_path=_logo_path()
+    )
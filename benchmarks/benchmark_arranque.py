@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque por PROCESO_MODO
+
+Lanza un proceso nuevo por modo y mide el tiempo de importar la app, de
+create_app y hasta la primera respuesta (GET /), junto con las consultas SQL y
+los hilos vivos al arrancar y un segundo después de la primera petición. En
+modo 'web' ambos deben quedar en cero consultas y sin hilos extra.
+
+Uso: python benchmarks/benchmark_arranque.py [--modos completo web worker] [--repeticiones 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def medir_proceso(modo):
+    """Se ejecuta en el proceso hijo; imprime las mediciones como JSON"""
+    import threading
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    consultas = {'total': 0}
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _contar(*_):
+        consultas['total'] += 1
+
+    hilos_base = threading.active_count()
+    inicio = time.perf_counter()
+    from app import create_app
+    from config import config
+    importado = time.perf_counter()
+    app = create_app(config['development'])
+    if modo == 'worker':
+        from app.services.servicios_background import servicios_background
+        servicios_background.iniciar()
+    creado = time.perf_counter()
+    consultas_arranque = consultas['total']
+    hilos_arranque = threading.active_count() - hilos_base
+
+    respuesta = app.test_client().get('/')
+    primera = time.perf_counter()
+    time.sleep(1)
+
+    print(json.dumps({
+        'modo': modo,
+        'estado': respuesta.status_code,
+        'import_ms': (importado - inicio) * 1000,
+        'create_app_ms': (creado - importado) * 1000,
+        'primera_peticion_ms': (primera - inicio) * 1000,
+        'consultas_arranque': consultas_arranque,
+        'hilos_arranque': hilos_arranque,
+        'consultas_1s': consultas['total'],
+        'hilos_1s': threading.active_count() - hilos_base,
+    }))
+    sys.stdout.flush()
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modos', nargs='+', default=['completo', 'web', 'worker'])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--hijo', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        medir_proceso(args.hijo)
+        return
+
+    from comun import crear_app_benchmark, RAIZ_PROYECTO
+
+    directorio = tempfile.mkdtemp(prefix='arranque_')
+    database_uri = f"sqlite:///{os.path.join(directorio, 'reservas.db')}"
+    crear_app_benchmark(database_uri)
+
+    print(f"{'modo':<10} {'import':>9} {'create_app':>11} {'1ª petición':>12} "
+          f"{'consultas':>10} {'hilos':>6} {'consultas 1s':>13} {'hilos 1s':>9}")
+    for modo in args.modos:
+        entorno = dict(os.environ, PROCESO_MODO=modo, DATABASE_URI=database_uri, LOG_LEVEL='WARNING')
+        resultados = []
+        for _ in range(args.repeticiones):
+            salida = subprocess.run([sys.executable, os.path.abspath(__file__), '--hijo', modo],
+                                    cwd=RAIZ_PROYECTO, env=entorno, capture_output=True, text=True)
+            linea = [l for l in salida.stdout.splitlines() if l.startswith('{')]
+            if not linea:
+                print(f"❌ El proceso en modo {modo} falló:\n{salida.stderr[-2000:]}")
+                raise SystemExit(1)
+            resultados.append(json.loads(linea[-1]))
+
+        # Mediana de los tiempos; consultas e hilos son deterministas salvo el modo worker
+        medio = sorted(resultados, key=lambda r: r['primera_peticion_ms'])[len(resultados) // 2]
+        print(f"{modo:<10} {medio['import_ms']:>7.0f}ms {medio['create_app_ms']:>9.0f}ms "
+              f"{medio['primera_peticion_ms']:>10.0f}ms {medio['consultas_arranque']:>10} "
+              f"{medio['hilos_arranque']:>6} {medio['consultas_1s']:>13} {medio['hilos_1s']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark del drenado de un backlog de notificaciones
+
+Inserta N notificaciones de email 'pendiente' en un SQLite temporal y las drena
+contra el SMTP local con uno o varios procesos, cada uno con su pool de workers
+que reclama lotes. Al final verifica que todas quedaron 'enviado' y que el SMTP
+recibió exactamente N mensajes (un envío duplicado por dos workers daría más).
+
+Con --modo anterior se mide el flujo previo (una notificación a la vez, una
+conexión SMTP y un commit por fila) sobre las primeras --muestra filas y se
+extrapola al backlog completo.
+
+Uso:
+    python benchmarks/benchmark_cola_notificaciones.py --n 50000 --procesos 2 --workers 4
+    python benchmarks/benchmark_cola_notificaciones.py --n 50000 --modo anterior --muestra 500
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from comun import crear_app_benchmark, sembrar_datos
+from flask_mail import Message
+from smtp_local import ServidorSMTPLocal
+from app import db, mail
+from app.models import Usuario, Notificacion
+from app.services.notificacion_service import notificacion_service
+
+
+def crear_app(database_uri, puerto_smtp):
+    app = crear_app_benchmark(database_uri, {'connect_args': {'timeout': 30}})
+    app.config.update(
+        MAIL_SERVER='127.0.0.1',
+        MAIL_PORT=puerto_smtp,
+        MAIL_USE_TLS=False,
+        MAIL_USE_SSL=False,
+        MAIL_DEFAULT_SENDER='noreply@flashreserver.local',
+        MAIL_SUPPRESS_SEND=False,
+        TESTING=False
+    )
+    mail.init_app(app)
+    return app
+
+
+def sembrar_backlog(n, usuario_ids):
+    ahora = datetime.utcnow()
+    filas = [{
+        'usuario_id': usuario_ids[i % len(usuario_ids)],
+        'tipo': 'email',
+        'titulo': 'Reserva Confirmada - Flash Reserver',
+        'mensaje': f'Mensaje de backlog {i}',
+        'estado': 'pendiente',
+        'fecha_creacion': ahora,
+        'intentos': 0,
+        'max_intentos': 3,
+        'datos_adicionales': {'fecha': '01/01/2030', 'hora': '10:00', 'cancha_nombre': 'Cancha 1'}
+    } for i in range(n)]
+    for inicio in range(0, n, 5000):
+        db.session.execute(Notificacion.__table__.insert(), filas[inicio:inicio + 5000])
+    db.session.commit()
+
+
+def proceso_drenado(database_uri, puerto_smtp, workers, tamano_lote):
+    app = crear_app(database_uri, puerto_smtp)
+    despachador = notificacion_service.despachador
+    despachador.configurar(workers=workers, tamano_lote=tamano_lote, intervalo_barrido=1)
+    despachador.iniciar(app)
+    despachador.esperar()
+    despachador.detener()
+
+
+def drenar_anterior(muestra):
+    """Flujo previo: una consulta, una conexión SMTP y un commit por notificación"""
+    pendientes = Notificacion.query.filter_by(estado='pendiente').limit(muestra).all()
+    for notificacion in pendientes:
+        usuario = Usuario.query.get(notificacion.usuario_id)
+        html = notificacion_service._renderizar_plantilla_email(
+            notificacion.titulo, notificacion.mensaje, usuario, notificacion.datos_adicionales
+        )
+        mail.send(Message(subject=notificacion.titulo, recipients=[usuario.Email], html=html))
+        notificacion.marcar_enviado()
+    return len(pendientes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=50000, help='Tamaño del backlog')
+    parser.add_argument('--procesos', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=4, help='Workers por proceso')
+    parser.add_argument('--tamano-lote', type=int, default=200)
+    parser.add_argument('--modo', choices=['lotes', 'anterior'], default='lotes')
+    parser.add_argument('--muestra', type=int, default=500, help='Filas a medir en modo anterior')
+    parser.add_argument('--retardo-ms', type=float, default=0, help='Retardo simulado del SMTP por mensaje')
+    args = parser.parse_args()
+
+    archivo = os.path.join(tempfile.mkdtemp(), 'cola_notificaciones.db')
+    database_uri = f'sqlite:///{archivo}'
+    smtp = ServidorSMTPLocal(puerto=0, retardo_ms=args.retardo_ms).iniciar()
+
+    app = crear_app(database_uri, smtp.puerto)
+    with app.app_context():
+        sembrar_datos(n_canchas=1, reservas_por_cancha=0, n_usuarios=50)
+        usuario_ids = [u.Id for u in Usuario.query.all()]
+        sembrar_backlog(args.n, usuario_ids)
+        db.session.remove()
+    print(f"Backlog sembrado: {args.n} notificaciones pendientes")
+
+    inicio = time.perf_counter()
+    if args.modo == 'anterior':
+        with app.app_context():
+            procesadas = drenar_anterior(args.muestra)
+            db.session.remove()
+        segundos = time.perf_counter() - inicio
+        por_segundo = procesadas / segundos
+        print(f"Modo anterior: {procesadas} en {segundos:.2f}s ({por_segundo:.1f}/s) | "
+              f"conexiones SMTP: {smtp.conexiones}")
+        print(f"Estimado para {args.n}: {args.n / por_segundo / 60:.1f} min")
+    else:
+        procesos = [
+            multiprocessing.Process(target=proceso_drenado,
+                                    args=(database_uri, smtp.puerto, args.workers, args.tamano_lote))
+            for _ in range(args.procesos)
+        ]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join()
+        segundos = time.perf_counter() - inicio
+
+        with app.app_context():
+            enviadas = Notificacion.query.filter_by(estado='enviado').count()
+            restantes = Notificacion.query.filter(Notificacion.estado != 'enviado').count()
+            db.session.remove()
+        print(f"Modo lotes: {args.procesos} procesos x {args.workers} workers, lotes de {args.tamano_lote}")
+        print(f"Drenado en {segundos:.2f}s ({args.n / segundos:.1f}/s) | conexiones SMTP: {smtp.conexiones}")
+        print(f"Enviadas: {enviadas} | sin enviar: {restantes} | mensajes recibidos: {len(smtp.mensajes)}")
+        if len(smtp.mensajes) != args.n or enviadas != args.n:
+            print("❌ El backlog no se entregó exactamente una vez")
+            raise SystemExit(1)
+        print("✅ Cada notificación se entregó exactamente una vez")
+
+    smtp.detener()
+    os.remove(archivo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /client/api/disponibilidad-mensual
+
+Compara la implementación anterior (una consulta por cancha × día × hora) con la
+grilla de disponibilidad, y verifica que el número de consultas de la grilla no
+depende del número de slots.
+
+Uso: python benchmarks/benchmark_disponibilidad.py [--dias 91] [--canchas 2 5 10]
+"""
+
+import argparse
+from datetime import date, time, timedelta
+
+from comun import crear_app_benchmark, sembrar_datos, contar_consultas, cronometro
+from app import db
+from app.models import Cancha, Reserva
+from app.services.disponibilidad_service import disponibilidad_service
+
+
+def disponibilidad_por_slot(canchas, fecha_actual, fecha_fin):
+    """Implementación anterior: una consulta por slot y carga perezosa del usuario"""
+    disponibilidad = []
+    for cancha in canchas:
+        fecha_iter = fecha_actual
+        while fecha_iter <= fecha_fin:
+            for hora in range(6, 22):
+                hora_inicio = f"{hora:02d}:00"
+                reserva = Reserva.query.filter_by(
+                    CanchaId=cancha.Id,
+                    Fecha=fecha_iter,
+                    Estado='Confirmada'
+                ).filter(
+                    # Con objetos time en lugar de 'HH:MM' para que SQLite compare igual que MySQL
+                    (Reserva.HoraInicio < time(hora + 1)) & (Reserva.HoraFin > time(hora))
+                ).first()
+                disponibilidad.append({
+                    'cancha_id': cancha.Id,
+                    'fecha': fecha_iter.strftime('%Y-%m-%d'),
+                    'hora_inicio': hora_inicio,
+                    'estado': 'ocupado' if reserva else 'disponible',
+                    'cliente': reserva.usuario.Nombre if reserva else None
+                })
+            fecha_iter += timedelta(days=1)
+    return disponibilidad
+
+
+def medir(n_canchas, dias, incluir_anterior):
+    app = crear_app_benchmark()
+    with app.app_context():
+        sembrar_datos(n_canchas=n_canchas, reservas_por_cancha=dias, dias=dias)
+        canchas = Cancha.query.all()
+        fecha_actual = date.today()
+        fecha_fin = fecha_actual + timedelta(days=dias - 1)
+        slots = n_canchas * dias * 16
+
+        db.session.expunge_all()
+        canchas = Cancha.query.all()
+        with contar_consultas() as consultas, cronometro() as tiempo:
+            nueva = disponibilidad_service.disponibilidad_mensual(canchas, fecha_actual, fecha_fin)
+        fila = {
+            'canchas': n_canchas,
+            'slots': slots,
+            'grilla_consultas': consultas.total,
+            'grilla_ms': tiempo['segundos'] * 1000,
+        }
+
+        if incluir_anterior:
+            db.session.expunge_all()
+            canchas = Cancha.query.all()
+            with contar_consultas() as consultas, cronometro() as tiempo:
+                anterior = disponibilidad_por_slot(canchas, fecha_actual, fecha_fin)
+            fila['anterior_consultas'] = consultas.total
+            fila['anterior_ms'] = tiempo['segundos'] * 1000
+
+            # Ambas implementaciones deben coincidir slot a slot
+            resumen_nueva = [(d['cancha_id'], d['fecha'], d['hora_inicio'], d['estado']) for d in nueva]
+            resumen_anterior = [(d['cancha_id'], d['fecha'], d['hora_inicio'], d['estado']) for d in anterior]
+            assert resumen_nueva == resumen_anterior, 'La grilla no coincide con la implementación anterior'
+
+        db.session.remove()
+        db.drop_all()
+    return fila
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dias', type=int, default=91)
+    parser.add_argument('--canchas', type=int, nargs='+', default=[1, 5, 20, 40])
+    parser.add_argument('--sin-anterior', action='store_true',
+                        help='No ejecutar la implementación anterior (muy lenta con muchas canchas)')
+    args = parser.parse_args()
+
+    print(f"{'canchas':>8} {'slots':>8} {'consultas':>10} {'ms':>9} {'consultas ant.':>15} {'ms ant.':>10}")
+    filas = []
+    for n in args.canchas:
+        fila = medir(n, args.dias, not args.sin_anterior)
+        filas.append(fila)
+        print(f"{fila['canchas']:>8} {fila['slots']:>8} {fila['grilla_consultas']:>10} {fila['grilla_ms']:>9.1f} "
+              f"{fila.get('anterior_consultas', '-'):>15} "
+              f"{fila['anterior_ms'] if 'anterior_ms' in fila else float('nan'):>10.1f}")
+
+    consultas_grilla = {fila['grilla_consultas'] for fila in filas}
+    if len(consultas_grilla) == 1:
+        print(f"✅ La grilla usa {consultas_grilla.pop()} consulta(s) sin importar el número de slots")
+    else:
+        print(f"❌ El número de consultas de la grilla varía con los slots: {sorted(consultas_grilla)}")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la exportación de reservas a Excel
+
+Compara la exportación anterior (todas las reservas como entidades, libro
+completo en memoria, estilos celda por celda y guardado en BytesIO) con el
+motor de solo escritura de ``app.utils.generar_excel`` alimentado por
+``reporte_service.reservas_exportacion`` (``yield_per``). Cada variante corre
+en un proceso nuevo sobre la misma base SQLite y se mide el pico de memoria
+(RSS máximo del proceso y su aumento durante la exportación), el tiempo total
+hasta el último byte de la respuesta y las filas por segundo.
+
+Uso: python benchmarks/benchmark_excel.py [--reservas 20000 100000] [--variantes anterior nuevo]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def exportar_anterior():
+    """Exportación previa de la hoja de reservas (misma lógica que la ruta original)"""
+    from io import BytesIO
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from app.models import Reserva, Usuario, Cancha
+
+    reservas_data = []
+    for reserva in Reserva.query.join(Usuario).join(Cancha).all():
+        reservas_data.append({
+            'ID': reserva.Id,
+            'Usuario': reserva.usuario.Nombre,
+            'Cancha': reserva.cancha.Nombre,
+            'Fecha': reserva.Fecha.strftime('%d/%m/%Y'),
+            'Hora Inicio': reserva.HoraInicio.strftime('%H:%M'),
+            'Hora Fin': reserva.HoraFin.strftime('%H:%M'),
+            'Duración (horas)': reserva.duracion_horas,
+            'Estado': reserva.Estado,
+            'Precio Total': float(reserva.precio_total),
+            'Fecha Creación': reserva.FechaCreacion.strftime('%d/%m/%Y %H:%M')
+        })
+
+    wb = Workbook()
+    ws = wb.active
+    data_font = Font(name='Arial', size=10)
+    center_alignment = Alignment(horizontal='center', vertical='center')
+    border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+    for col, header in enumerate(reservas_data[0].keys() if reservas_data else [], 1):
+        ws.cell(row=1, column=col, value=header).font = Font(bold=True)
+    for row, reserva in enumerate(reservas_data, 2):
+        for col, (key, value) in enumerate(reserva.items(), 1):
+            cell = ws.cell(row=row, column=col, value=value)
+            cell.font = data_font
+            cell.border = border
+            cell.alignment = center_alignment
+            if key == 'Estado' and value == 'Confirmada':
+                cell.fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
+            elif key == 'Precio Total':
+                cell.number_format = '#,##0'
+    ws.insert_rows(1, 3)
+
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return len(reservas_data), [output.read()]
+
+
+def exportar_nuevo():
+    from app.services.reporte_service import FiltroReporte, reporte_service
+    from app.utils.generar_excel import generar_excel_reservas
+
+    filtro = FiltroReporte()
+    filas = {'total': 0}
+
+    def contar(reservas):
+        for reserva in reservas:
+            filas['total'] += 1
+            yield reserva
+
+    response = generar_excel_reservas(
+        contar(reporte_service.reservas_exportacion(filtro)), reporte_service.calcular(filtro),
+        usuario_mas_activo='', descripcion_filtro=filtro.descripcion, generado_por='benchmark',
+        nombre_archivo='reservas.xlsx'
+    )
+    return filas['total'], response.response
+
+
+def memoria_mb(campo):
+    """VmHWM (pico) o VmRSS (actual) del proceso en MB, leídos de /proc (Linux).
+
+    No se usa ru_maxrss porque en Linux el proceso hijo hereda el pico del padre,
+    que sube al sembrar los datos.
+    """
+    with open('/proc/self/status') as status:
+        for linea in status:
+            if linea.startswith(campo + ':'):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+def medir_proceso(variante, database_uri):
+    """Se ejecuta en el proceso hijo; imprime las mediciones como JSON"""
+    from comun import crear_app_benchmark
+
+    app = crear_app_benchmark(database_uri)
+    with app.test_request_context():
+        from app.models import Reserva
+        Reserva.query.first()
+        rss_base = memoria_mb('VmRSS')
+
+        inicio = time.perf_counter()
+        filas, cuerpo = (exportar_anterior if variante == 'anterior' else exportar_nuevo)()
+        tamaño = sum(len(parte) for parte in cuerpo)
+        segundos = time.perf_counter() - inicio
+
+        rss_pico = memoria_mb('VmHWM')
+    print(json.dumps({
+        'filas': filas,
+        'segundos': segundos,
+        'bytes': tamaño,
+        'rss_pico_mb': rss_pico,
+        'rss_aumento_mb': rss_pico - rss_base,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reservas', type=int, nargs='+', default=[20000, 100000])
+    parser.add_argument('--variantes', nargs='+', default=['anterior', 'nuevo'])
+    parser.add_argument('--hijo', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        medir_proceso(*args.hijo)
+        return
+
+    from comun import crear_app_benchmark, sembrar_datos
+
+    print(f"{'reservas':>9} {'variante':<9} {'filas':>8} {'tiempo':>9} {'filas/s':>9} "
+          f"{'RSS pico':>9} {'aumento':>9} {'archivo':>9}")
+    for n_reservas in args.reservas:
+        directorio = tempfile.mkdtemp(prefix='excel_')
+        database_uri = f"sqlite:///{os.path.join(directorio, 'reservas.db')}"
+        app = crear_app_benchmark(database_uri)
+        with app.app_context():
+            sembrar_datos(n_canchas=20, reservas_por_cancha=n_reservas // 20, dias=365)
+
+        for variante in args.variantes:
+            salida = subprocess.run([sys.executable, os.path.abspath(__file__), '--hijo', variante, database_uri],
+                                    capture_output=True, text=True)
+            linea = [l for l in salida.stdout.splitlines() if l.startswith('{')]
+            if not linea:
+                print(f"❌ La variante {variante} falló:\n{salida.stderr[-2000:]}")
+                raise SystemExit(1)
+            r = json.loads(linea[-1])
+            print(f"{n_reservas:>9} {variante:<9} {r['filas']:>8} {r['segundos']:>8.2f}s "
+                  f"{r['filas'] / r['segundos']:>9.0f} {r['rss_pico_mb']:>7.0f}MB {r['rss_aumento_mb']:>7.0f}MB "
+                  f"{r['bytes'] / 1024:>7.0f}KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark del inicio del foro con muchos posts
+
+Siembra ``--posts`` posts activos (con likes y comentarios ya contados en
+``TotalLikes``/``TotalComentarios``) y mide con la app completa el inicio del
+foro en sus órdenes (reciente, popular, antiguo), con filtro de categoría y la
+segunda página por cursor: tiempo y número de consultas de la primera petición
+(caché de tarjetas vacía) y de las siguientes (tarjetas y categorías desde la
+caché de ``foro_service``). Ninguna página debe depender del número de posts.
+
+Uso: python benchmarks/benchmark_foro.py [--posts 100000] [--repeticiones 20]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from comun import RAIZ_PROYECTO  # noqa: F401  (agrega la raíz del proyecto al path)
+from sqlalchemy import event, insert
+from app import create_app, db
+from config import TestingConfig
+
+CATEGORIAS = ['General', 'Deportes', 'Eventos', 'Torneos', 'Clasificados']
+
+
+class ConfigBenchmark(TestingConfig):
+    CONSULTAS_INSTRUMENTACION = False
+    METRICAS_ACTIVAS = False
+
+
+def sembrar(n_posts, semilla=11):
+    from app.models import Rol, Usuario, Post
+
+    rnd = random.Random(semilla)
+    rol = Rol(Nombre='Administrador')
+    db.session.add_all([rol, Rol(Nombre='Cliente')])
+    db.session.flush()
+    usuarios = [Usuario(Nombre=f'Usuario {i}', Email=f'u{i}@benchmark.local', Telefono='3000000000',
+                        Contrasena='x', RolId=rol.Id) for i in range(50)]
+    db.session.add_all(usuarios)
+    db.session.flush()
+
+    ahora = datetime.utcnow()
+    for inicio in range(0, n_posts, 10000):
+        db.session.execute(insert(Post), [{
+            'Titulo': f'Post {i}', 'Contenido': 'Texto del post ' * rnd.randint(5, 40),
+            'UsuarioId': rnd.choice(usuarios).Id, 'Categoria': rnd.choice(CATEGORIAS),
+            'Estado': 'Activo' if rnd.random() < 0.95 else 'Oculto',
+            'FechaCreacion': ahora - timedelta(minutes=i), 'FechaActualizacion': ahora - timedelta(minutes=i),
+            'TotalLikes': rnd.randint(0, 200), 'TotalComentarios': rnd.randint(0, 30),
+        } for i in range(inicio, min(inicio + 10000, n_posts))])
+    db.session.commit()
+    return usuarios[0].Id
+
+
+def medir(cliente, url, repeticiones):
+    """(segundos, consultas) de la primera petición y mediana de las siguientes"""
+    contador = {'n': 0}
+
+    def _contar(*_):
+        contador['n'] += 1
+
+    tiempos, consultas = [], []
+    with cliente.application.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _contar)
+    try:
+        for _ in range(repeticiones + 1):
+            contador['n'] = 0
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                respuesta = cliente.get(url)
+            tiempos.append(time.perf_counter() - inicio)
+            consultas.append(contador['n'])
+            if respuesta.status_code != 200:
+                raise SystemExit(f"❌ {url} respondió {respuesta.status_code}")
+    finally:
+        event.remove(engine, 'before_cursor_execute', _contar)
+    return (tiempos[0], consultas[0]), (statistics.median(tiempos[1:]), consultas[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app(ConfigBenchmark)
+    with app.app_context():
+        db.create_all()
+        inicio = time.perf_counter()
+        usuario_id = sembrar(args.posts)
+        print(f"{args.posts} posts sembrados en {time.perf_counter() - inicio:.1f} s\n")
+
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['_user_id'] = str(usuario_id)
+        sesion['_fresh'] = True
+
+    # El cursor de la segunda página sale de la primera
+    with contextlib.redirect_stdout(io.StringIO()):
+        siguiente = cliente.get('/foro/?format=json').get_json()['url_siguiente']
+
+    paginas = {
+        'recientes': '/foro/',
+        'populares': '/foro/?orden=popular',
+        'antiguos': '/foro/?orden=antiguo',
+        'categoría': '/foro/?categoria=Deportes',
+        'segunda página (JSON)': siguiente + '&format=json',
+    }
+    print(f"{'página':<24} {'primera':>16} {'siguientes':>16}")
+    for nombre, url in paginas.items():
+        (t_primera, c_primera), (t_siguientes, c_siguientes) = medir(cliente, url, args.repeticiones)
+        print(f"{nombre:<24} {t_primera * 1000:>8.1f} ms {c_primera:>2}q "
+              f"{t_siguientes * 1000:>8.1f} ms {c_siguientes:>2}q")
+
+
+if __name__ == '__main__':
+    main()
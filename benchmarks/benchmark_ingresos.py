@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ingresos por rango de fechas
+
+Compara la suma anterior en Python (cargar cada reserva confirmada y sumar
+``precio_total``, que carga la cancha) con un SUM sobre ``Reserva.PrecioTotal``
+usando el índice (Fecha, Estado, PrecioTotal). Verifica que ambas dan lo mismo
+y muestra el plan de la consulta.
+
+Uso: python benchmarks/benchmark_ingresos.py [--reservas 50000] [--años 3]
+"""
+
+import argparse
+from datetime import date, timedelta
+from decimal import Decimal
+
+from comun import crear_app_benchmark, sembrar_datos, contar_consultas, cronometro
+from sqlalchemy import func, select, text
+from app import db
+from app.models import Reserva
+
+
+def ingresos_anterior(desde, hasta):
+    """Implementación anterior: precio por hora de la cancha x duración, fila por fila"""
+    total = Decimal('0')
+    for reserva in Reserva.query.filter(Reserva.Fecha >= desde, Reserva.Fecha <= hasta,
+                                        Reserva.Estado == 'Confirmada'):
+        horas = Decimal(str(reserva.duracion_horas))
+        total += (reserva.cancha.PrecioHora * horas).quantize(Decimal('0.01'))
+    return total
+
+
+def consulta_ingresos(desde, hasta):
+    return (
+        select(func.coalesce(func.sum(Reserva.PrecioTotal), 0))
+        .where(Reserva.Fecha >= desde, Reserva.Fecha <= hasta, Reserva.Estado == 'Confirmada')
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reservas', type=int, default=50000)
+    parser.add_argument('--años', type=int, default=3)
+    args = parser.parse_args()
+
+    app = crear_app_benchmark()
+    with app.app_context():
+        dias = 365 * args.años
+        sembrar_datos(n_canchas=20, reservas_por_cancha=args.reservas // 20, dias=dias)
+        desde = date.today()
+        print(f"Reservas: {args.reservas} en {args.años} años")
+        print(f"{'rango':>10} | {'consultas ant.':>14} {'tiempo ant.':>11} | {'consultas':>9} {'tiempo':>9} | iguales")
+        for dias_rango in (30, 365, dias):
+            hasta = desde + timedelta(days=dias_rango - 1)
+            db.session.expire_all()
+            with contar_consultas() as consultas_ant, cronometro() as tiempo_ant:
+                anterior = ingresos_anterior(desde, hasta)
+            with contar_consultas() as consultas, cronometro() as tiempo:
+                nuevo = db.session.execute(consulta_ingresos(desde, hasta)).scalar()
+            iguales = abs(Decimal(str(nuevo)) - anterior) < Decimal('0.01')
+            print(f"{dias_rango:>6} días | {consultas_ant.total:>14} {tiempo_ant['segundos'] * 1000:>9.1f}ms | "
+                  f"{consultas.total:>9} {tiempo['segundos'] * 1000:>7.1f}ms | {'✅' if iguales else '❌'}")
+            if not iguales:
+                raise SystemExit(1)
+
+        sentencia = consulta_ingresos(desde, desde).compile(db.engine, compile_kwargs={'literal_binds': True})
+        plan = db.session.execute(text(f"EXPLAIN QUERY PLAN {sentencia}")).fetchall()
+        print("Plan:", ' | '.join(fila[-1] for fila in plan))
+
+
+if __name__ == '__main__':
+    main()
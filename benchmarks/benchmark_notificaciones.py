@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la latencia que las notificaciones agregan a la petición
+
+Crea N notificaciones de email contra el SMTP local (con retardo simulado), primero
+con entrega en línea (comportamiento anterior) y luego con el despachador en
+background, y muestra la latencia de ``crear_notificacion`` y las métricas de entrega.
+
+Uso: python benchmarks/benchmark_notificaciones.py [--n 50] [--retardo-ms 200] [--workers 4]
+"""
+
+import argparse
+import time
+
+from comun import crear_app_benchmark, sembrar_datos
+from smtp_local import ServidorSMTPLocal
+from app import db, mail
+from app.models import Usuario, Notificacion
+from app.services.notificacion_service import notificacion_service
+
+
+def crear_app(puerto_smtp):
+    app = crear_app_benchmark()
+    app.config.update(
+        MAIL_SERVER='127.0.0.1',
+        MAIL_PORT=puerto_smtp,
+        MAIL_USE_TLS=False,
+        MAIL_USE_SSL=False,
+        MAIL_DEFAULT_SENDER='noreply@flashreserver.local',
+        MAIL_SUPPRESS_SEND=False,
+        TESTING=False
+    )
+    mail.init_app(app)
+    return app
+
+
+def medir_creacion(n, usuario_id):
+    latencias = []
+    for i in range(n):
+        inicio = time.perf_counter()
+        notificacion_service.crear_notificacion(
+            usuario_id=usuario_id,
+            tipo='email',
+            titulo='Reserva Confirmada - Flash Reserver',
+            mensaje=f'Mensaje de prueba {i}',
+            datos_adicionales={'fecha': '01/01/2030', 'hora': '10:00', 'cancha_nombre': 'Cancha 1'}
+        )
+        latencias.append(time.perf_counter() - inicio)
+    latencias.sort()
+    return latencias[len(latencias) // 2] * 1000, latencias[int(len(latencias) * 0.95) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=50)
+    parser.add_argument('--retardo-ms', type=float, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    smtp = ServidorSMTPLocal(puerto=0, retardo_ms=args.retardo_ms).iniciar()
+    app = crear_app(smtp.puerto)
+
+    with app.app_context():
+        sembrar_datos(n_canchas=1, reservas_por_cancha=0, n_usuarios=1)
+        usuario_id = Usuario.query.first().Id
+
+        p50, p95 = medir_creacion(args.n, usuario_id)
+        print(f"En línea:   p50 {p50:8.1f} ms | p95 {p95:8.1f} ms por crear_notificacion")
+
+    notificacion_service.despachador.configurar(workers=args.workers)
+    notificacion_service.despachador.iniciar(app)
+    with app.app_context():
+        inicio = time.perf_counter()
+        p50, p95 = medir_creacion(args.n, usuario_id)
+        print(f"Background: p50 {p50:8.1f} ms | p95 {p95:8.1f} ms por crear_notificacion")
+
+        notificacion_service.despachador.esperar()
+        drenado = time.perf_counter() - inicio
+        print(f"Cola drenada en {drenado:.2f}s con {args.workers} workers")
+
+        metricas = notificacion_service.obtener_metricas()
+        print(f"Métricas: {metricas}")
+        enviadas = Notificacion.query.filter_by(estado='enviado').count()
+        print(f"Notificaciones enviadas: {enviadas} | mensajes recibidos por el SMTP local: {len(smtp.mensajes)}")
+
+    notificacion_service.despachador.detener()
+    smtp.detener()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los backends de PDF
+
+Genera el HTML real de los reportes de usuarios y de estadísticas con datos
+sembrados y mide, para cada backend de ``app.utils.pdf_utils`` en un proceso
+nuevo: el arranque (``iniciar``: importar módulos, calentar el pool), el primer
+PDF, los PDFs por segundo en serie y con varios hilos a la vez (como varios
+workers de reportes) y los PDFs por segundo servidos desde la caché por
+contenido. Los backends no disponibles (wkhtmltopdf sin instalar) se omiten.
+
+Uso: python benchmarks/benchmark_pdf.py [--backends wkhtmltopdf xhtml2pdf xhtml2pdf_procesos] [--pdfs 20] [--hilos 4]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def documentos():
+    """HTML de los reportes PDF con datos de prueba"""
+    from comun import crear_app_benchmark, sembrar_datos, RAIZ_PROYECTO
+    from app.utils.reportes_pdf import html_reportes, html_usuarios
+
+    app = crear_app_benchmark()
+    # El logo se busca en app/static, como en la app real
+    app.root_path = os.path.join(RAIZ_PROYECTO, 'app')
+    with app.app_context():
+        sembrar_datos(n_canchas=10, reservas_por_cancha=100, n_usuarios=200)
+        from app.services.resumen_service import resumen_service
+        resumen_service.reconstruir()
+        return [html_usuarios({}), html_reportes({'filtro_rapido': 'año'})]
+
+
+def medir_backend(nombre, n_pdfs, hilos, directorio):
+    """Se ejecuta en el proceso hijo; imprime las mediciones como JSON"""
+    import logging
+    from app.utils.pdf_utils import RenderizadorPDF
+
+    # xhtml2pdf registra cada imagen que no puede cargar; no interesa aquí
+    logging.disable(logging.ERROR)
+    with open(os.path.join(directorio, 'documentos.json')) as archivo:
+        htmls = json.load(archivo)
+
+    renderizador = RenderizadorPDF()
+    renderizador.configuracion = {'backend': nombre, 'procesos': hilos}
+
+    inicio = time.perf_counter()
+    renderizador.iniciar()
+    arranque = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    renderizador.renderizar(htmls[0])
+    primero = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for i in range(n_pdfs):
+        renderizador.renderizar(htmls[i % len(htmls)])
+    serie = n_pdfs / (time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(hilos) as pool:
+        list(pool.map(lambda i: renderizador.renderizar(htmls[i % len(htmls)]), range(n_pdfs)))
+    paralelo = n_pdfs / (time.perf_counter() - inicio)
+
+    renderizador.directorio_cache = os.path.join(directorio, f'cache_{nombre}')
+    for html in htmls:
+        renderizador.renderizar(html)
+    inicio = time.perf_counter()
+    for i in range(n_pdfs * 10):
+        renderizador.renderizar(htmls[i % len(htmls)])
+    cache = n_pdfs * 10 / (time.perf_counter() - inicio)
+
+    renderizador.detener()
+    print(json.dumps({'arranque': arranque, 'primero': primero, 'serie': serie,
+                      'paralelo': paralelo, 'cache': cache}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=['wkhtmltopdf', 'xhtml2pdf', 'xhtml2pdf_procesos'])
+    parser.add_argument('--pdfs', type=int, default=20)
+    parser.add_argument('--hilos', type=int, default=4)
+    parser.add_argument('--hijo', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        from comun import RAIZ_PROYECTO  # noqa: F401  (agrega la raíz del proyecto al path)
+        medir_backend(args.hijo[0], args.pdfs, args.hilos, args.hijo[1])
+        return
+
+    directorio = tempfile.mkdtemp(prefix='pdf_')
+    with open(os.path.join(directorio, 'documentos.json'), 'w') as archivo:
+        json.dump(documentos(), archivo)
+
+    print(f"{'backend':<20} {'arranque':>9} {'1er PDF':>9} {'PDF/s serie':>12} "
+          f"{f'PDF/s {args.hilos} hilos':>14} {'PDF/s caché':>12}")
+    for backend in args.backends:
+        if backend == 'wkhtmltopdf' and not shutil.which('wkhtmltopdf'):
+            print(f"{backend:<20} omitido: wkhtmltopdf no está instalado")
+            continue
+        salida = subprocess.run([sys.executable, os.path.abspath(__file__), '--hijo', backend, directorio,
+                                 '--pdfs', str(args.pdfs), '--hilos', str(args.hilos)],
+                                capture_output=True, text=True)
+        linea = [l for l in salida.stdout.splitlines() if l.startswith('{')]
+        if not linea:
+            print(f"❌ El backend {backend} falló:\n{salida.stderr[-2000:]}")
+            raise SystemExit(1)
+        r = json.loads(linea[-1])
+        print(f"{backend:<20} {r['arranque'] * 1000:>7.0f}ms {r['primero'] * 1000:>7.0f}ms "
+              f"{r['serie']:>12.1f} {r['paralelo']:>14.1f} {r['cache']:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
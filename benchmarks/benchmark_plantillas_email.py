@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark del render de emails de notificación
+
+Compara el costo por email de compilar la plantilla en cada envío
+(``render_template_string``, comportamiento anterior) contra el registro de
+plantillas compiladas, para cada tipo de plantilla.
+
+Uso: python benchmarks/benchmark_plantillas_email.py [--n 500]
+"""
+
+import argparse
+import time
+
+from comun import crear_app_benchmark
+from flask import render_template_string
+from app.utils.plantillas_email import plantillas_email
+
+
+class UsuarioFalso:
+    Nombre = 'Ana'
+    Email = 'ana@example.com'
+
+
+CONTEXTO = {
+    'titulo': 'Reserva Confirmada - Flash Reserver',
+    'mensaje': 'Tu reserva para el 01/01/2030 a las 10:00 ha sido confirmada exitosamente.',
+    'usuario': UsuarioFalso(),
+    'datos_adicionales': {
+        'reserva_id': 123,
+        'fecha': '01/01/2030',
+        'hora': '10:00',
+        'cancha_nombre': 'Cancha 1',
+        'fecha_cancelacion': '31/12/2029 18:00',
+        'motivo_cancelacion': 'Cancelación solicitada por el usuario'
+    }
+}
+
+
+def medir(n, funcion):
+    inicio = time.perf_counter()
+    for _ in range(n):
+        funcion()
+    return (time.perf_counter() - inicio) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=500, help='Emails renderizados por medición')
+    args = parser.parse_args()
+
+    app = crear_app_benchmark()
+    with app.app_context():
+        for clave, archivo in plantillas_email.PLANTILLAS.items():
+            fuente = app.jinja_loader.get_source(app.jinja_env, archivo)[0]
+
+            anterior = medir(args.n, lambda: render_template_string(fuente, **CONTEXTO))
+            plantillas_email.obtener(clave)
+            registro = medir(args.n, lambda: plantillas_email.renderizar(clave, **CONTEXTO))
+
+            print(f"{clave:12s} compilando por email: {anterior:9.1f} µs | "
+                  f"registro compilado: {registro:7.1f} µs | {anterior / registro:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
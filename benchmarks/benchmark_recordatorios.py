@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark del barrido de recordatorios
+
+Siembra N reservas futuras y simula un barrido por minuto durante --horas horas.
+Reporta consultas y tiempo por barrido, verifica que cada reserva recibió cada
+recordatorio una sola vez (y que repetir un barrido no crea nada) y compara la
+memoria con el esquema anterior de dos DateTrigger en memoria por reserva.
+
+Uso: python benchmarks/benchmark_recordatorios.py [--reservas 20000] [--dias 30] [--horas 24]
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from comun import crear_app_benchmark, sembrar_datos, contar_consultas
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.date import DateTrigger
+from app import db, mail
+from app.models import Reserva, Notificacion
+from app.services.recordatorio_service import recordatorio_service
+
+
+def memoria_esquema_anterior(reservas):
+    """Memoria de dos jobs DateTrigger en memoria por reserva futura"""
+    scheduler = BackgroundScheduler()
+    scheduler.start(paused=True)
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    for reserva_id, fecha, hora in reservas:
+        cuando = datetime.combine(fecha, hora)
+        for tipo, horas in (('24h', 24), ('2h', 2)):
+            scheduler.add_job(print, trigger=DateTrigger(run_date=cuando - timedelta(hours=horas)),
+                              args=[reserva_id], id=f'recordatorio_{tipo}_{reserva_id}')
+    segundos = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    scheduler.shutdown(wait=False)
+    return memoria, segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reservas', type=int, default=20000)
+    parser.add_argument('--canchas', type=int, default=50)
+    parser.add_argument('--dias', type=int, default=30)
+    parser.add_argument('--horas', type=int, default=24, help='Horas simuladas de barridos por minuto')
+    args = parser.parse_args()
+
+    app = crear_app_benchmark()
+    app.config['MAIL_SUPPRESS_SEND'] = True
+    app.config['MAIL_DEFAULT_SENDER'] = 'noreply@flashreserver.local'
+    mail.init_app(app)
+
+    with app.app_context():
+        sembrar_datos(n_canchas=args.canchas, reservas_por_cancha=args.reservas // args.canchas, dias=args.dias)
+        futuras = db.session.query(Reserva.Id, Reserva.Fecha, Reserva.HoraInicio).filter(
+            Reserva.Estado == 'Confirmada').all()
+        print(f"Reservas confirmadas sembradas: {len(futuras)}")
+
+        memoria, segundos = memoria_esquema_anterior(futuras)
+        print(f"Esquema anterior: {2 * len(futuras)} jobs en memoria, {memoria / 1024 / 1024:.1f} MB, "
+              f"{segundos:.2f}s solo para programarlos")
+
+        inicio_simulacion = datetime.now().replace(second=0, microsecond=0)
+        consultas, duraciones, recordadas = [], [], 0
+        tracemalloc.start()
+        for minuto in range(args.horas * 60):
+            ahora = inicio_simulacion + timedelta(minutes=minuto)
+            with contar_consultas() as contador:
+                inicio = time.perf_counter()
+                recordadas += recordatorio_service.barrer_recordatorios(ahora)
+                duraciones.append(time.perf_counter() - inicio)
+            consultas.append(contador.total)
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        repetido = recordatorio_service.barrer_recordatorios(ahora)
+        enviados_24h = Reserva.query.filter(Reserva.Recordatorio24hEnviadoEn.isnot(None)).count()
+        enviados_2h = Reserva.query.filter(Reserva.Recordatorio2hEnviadoEn.isnot(None)).count()
+        notificaciones = Notificacion.query.count()
+
+        duraciones.sort()
+        print(f"Barrido: {len(duraciones)} barridos simulados | {recordadas} recordatorios | "
+              f"consultas por barrido min {min(consultas)} max {max(consultas)}")
+        print(f"Tiempo por barrido: p50 {duraciones[len(duraciones) // 2] * 1000:.1f} ms | "
+              f"max {duraciones[-1] * 1000:.1f} ms | pico de memoria {pico / 1024 / 1024:.1f} MB")
+        print(f"Marcados 24h: {enviados_24h} | 2h: {enviados_2h} | notificaciones: {notificaciones} "
+              f"| barrido repetido: {repetido}")
+
+        if notificaciones != 2 * (enviados_24h + enviados_2h) or repetido:
+            print("❌ Se duplicaron recordatorios")
+            raise SystemExit(1)
+        print("✅ Cada recordatorio se creó una sola vez")
+
+
+if __name__ == '__main__':
+    main()
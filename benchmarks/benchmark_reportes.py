@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark del motor de estadísticas de reportes (/admin/api/estadisticas y exportaciones)
+
+Compara la implementación anterior (dos consultas por mes, conteos sueltos y el
+heatmap cargando todas las reservas de la semana) con ``reporte_service``, que
+lee las tablas de resumen. Verifica que, sin filtros, los conteos coinciden con
+la implementación anterior y los ingresos con la suma de ``precio_total`` de las
+reservas confirmadas, y que los resúmenes mantenidos al crear, confirmar y
+cancelar reservas quedan iguales a una reconstrucción completa.
+
+Uso: python benchmarks/benchmark_reportes.py [--reservas 1000 10000 50000]
+"""
+
+import argparse
+import random
+from datetime import datetime, time, timedelta
+
+from comun import crear_app_benchmark, sembrar_datos, contar_consultas, cronometro
+from sqlalchemy import extract, func
+from app import db
+from app.models import Cancha, Reserva, Usuario, ResumenReservaDiario, ResumenReservaHorario
+from app.services.reporte_service import FiltroReporte, reporte_service
+from app.services.reserva_service import reserva_service, ConflictoReservaError
+from app.services.resumen_service import resumen_service
+
+# Claves que no dependen de la definición de ingresos (antes: suma de PrecioHora sin duración)
+CLAVES_CONTEOS = ('total_usuarios', 'total_canchas', 'total_reservas', 'reservas_hoy',
+                  'reservas_por_mes', 'heatmap', 'recientes')
+
+
+def estadisticas_anterior():
+    """Implementación anterior de api_estadisticas sin filtros"""
+    hoy = datetime.now().date()
+    query_reservas = Reserva.query
+    total_usuarios = Usuario.query.count()
+    total_canchas = Cancha.query.count()
+    total_reservas = query_reservas.count()
+    reservas_hoy = db.session.query(func.count(Reserva.Id)).filter(func.date(Reserva.FechaCreacion) == hoy).scalar()
+    ingresos_totales = (
+        db.session.query(func.coalesce(func.sum(Cancha.PrecioHora), 0))
+        .join(Reserva, Reserva.CanchaId == Cancha.Id)
+        .filter(Reserva.Estado == "Confirmada")
+    ).scalar() or 0
+    recientes = [(r.Id, r.usuario.Nombre, r.cancha.Nombre) for r in
+                 query_reservas.join(Usuario).join(Cancha).order_by(Reserva.FechaCreacion.desc()).limit(5)]
+    [(a.usuario.Nombre, a.cancha.Nombre) for a in
+     query_reservas.join(Usuario).order_by(Reserva.FechaCreacion.desc()).limit(5)]
+    canchas_populares = [
+        {"nombre": c.nombre, "total_reservas": c.total_reservas, "ingresos": float(c.ingresos),
+         "ocupacion": round((c.total_reservas / max(1, total_reservas)) * 100, 2)}
+        for c in db.session.query(
+            Cancha.Nombre.label('nombre'),
+            func.count(Reserva.Id).label('total_reservas'),
+            func.coalesce(func.sum(Cancha.PrecioHora), 0).label('ingresos')
+        ).join(Reserva, Cancha.Id == Reserva.CanchaId).group_by(Cancha.Id)
+        .order_by(func.count(Reserva.Id).desc(), Cancha.Id).limit(5).all()
+    ]
+    reservas_por_mes, ingresos_por_mes = [], []
+    for mes in range(1, 13):
+        reservas_por_mes.append(query_reservas.filter(extract('month', Reserva.Fecha) == mes).count())
+        ingresos_por_mes.append(float(
+            db.session.query(func.coalesce(func.sum(Cancha.PrecioHora), 0))
+            .join(Reserva, Reserva.CanchaId == Cancha.Id)
+            .filter(extract('month', Reserva.Fecha) == mes).scalar() or 0))
+    heatmap = [{"x": hour, "y": day, "v": 0} for day in range(7) for hour in range(24)]
+    for r in Reserva.query.filter(Reserva.Fecha >= hoy - timedelta(days=6), Reserva.Fecha <= hoy).all():
+        heatmap[r.Fecha.weekday() * 24 + r.HoraInicio.hour]["v"] += 1
+    return {
+        "total_usuarios": total_usuarios, "total_canchas": total_canchas, "total_reservas": total_reservas,
+        "reservas_hoy": reservas_hoy, "ingresos_totales": float(ingresos_totales),
+        "canchas_populares": canchas_populares, "reservas_por_mes": reservas_por_mes,
+        "ingresos_por_mes": ingresos_por_mes, "heatmap": heatmap, "recientes": recientes
+    }
+
+
+def estadisticas_nuevas():
+    estadisticas = reporte_service.calcular(FiltroReporte(), recientes=5)
+    resultado = estadisticas.como_dict()
+    resultado['recientes'] = [(r.Id, r.usuario.Nombre, r.cancha.Nombre) for r in estadisticas.recientes]
+    return resultado
+
+
+def ingresos_desde_reservas():
+    """Ingresos por mes y total sumando precio_total de las reservas confirmadas en Python"""
+    por_mes = [0.0] * 12
+    for reserva in Reserva.query.filter_by(Estado='Confirmada').all():
+        por_mes[reserva.Fecha.month - 1] += float(reserva.precio_total)
+    return por_mes
+
+
+def sembrar(n_reservas):
+    """Reservas repartidas en el último año y el próximo trimestre, con algunas canceladas"""
+    sembrar_datos(n_canchas=20, reservas_por_cancha=n_reservas // 20, dias=90)
+    rnd = random.Random(7)
+    for reserva in Reserva.query.all():
+        reserva.Fecha -= timedelta(days=rnd.randint(0, 365))
+        reserva.FechaCreacion -= timedelta(minutes=rnd.randint(0, 10 ** 6))
+        if rnd.random() < 0.15:
+            reserva.Estado = 'Cancelada'
+    db.session.commit()
+    resumen_service.reconstruir()
+
+
+def contenido_resumenes():
+    return (
+        sorted((r.CanchaId, r.Fecha, r.Reservas, r.Canceladas, r.Creadas, r.HorasReservadas, r.Ingresos)
+               for r in ResumenReservaDiario.query if r.Reservas or r.Creadas),
+        sorted((r.CanchaId, r.Fecha, r.Hora, r.Reservas, r.Canceladas, r.HorasReservadas, r.Ingresos)
+               for r in ResumenReservaHorario.query if r.Reservas)
+    )
+
+
+def verificar_incremental(operaciones=300):
+    """Crea, cancela y confirma reservas por el servicio y compara con una reconstrucción"""
+    rnd = random.Random(11)
+    canchas = [c.Id for c in Cancha.query.all()]
+    usuarios = [u.Id for u in Usuario.query.all()]
+    hoy = datetime.now().date()
+    for _ in range(operaciones):
+        accion = rnd.random()
+        if accion < 0.6:
+            hora = rnd.randint(6, 20)
+            try:
+                reserva_service.crear_reserva(rnd.choice(usuarios), rnd.choice(canchas),
+                                              hoy + timedelta(days=rnd.randint(-10, 30)),
+                                              time(hora), time(hora + 1))
+            except ConflictoReservaError:
+                pass
+        else:
+            reserva = Reserva.query.order_by(func.random()).first()
+            if accion < 0.9:
+                reserva_service.cancelar_reserva(reserva)
+            else:
+                try:
+                    reserva_service.confirmar_reserva(reserva)
+                except ConflictoReservaError:
+                    pass
+    incremental = contenido_resumenes()
+    resumen_service.reconstruir()
+    return incremental == contenido_resumenes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reservas', type=int, nargs='+', default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    print(f"{'reservas':>9} | {'consultas ant.':>14} {'tiempo ant.':>11} | {'consultas':>9} {'tiempo':>9} | iguales")
+    for n_reservas in args.reservas:
+        app = crear_app_benchmark()
+        with app.app_context():
+            sembrar(n_reservas)
+            resultados = {}
+            for nombre, funcion in (('anterior', estadisticas_anterior), ('nuevo', estadisticas_nuevas)):
+                db.session.expire_all()
+                with contar_consultas() as contador, cronometro() as tiempo:
+                    datos = funcion()
+                resultados[nombre] = (contador.total, tiempo['segundos'], datos)
+
+            anterior, nuevo = resultados['anterior'], resultados['nuevo']
+            diferencias = [clave for clave in CLAVES_CONTEOS if anterior[2][clave] != nuevo[2][clave]]
+            populares = lambda datos: [(c['nombre'], c['total_reservas'], c['ocupacion']) for c in datos['canchas_populares']]
+            if populares(anterior[2]) != populares(nuevo[2]):
+                diferencias.append('canchas_populares')
+            ingresos = ingresos_desde_reservas()
+            if any(abs(a - b) > 0.01 for a, b in zip(ingresos, nuevo[2]['ingresos_por_mes'])) \
+                    or abs(sum(ingresos) - nuevo[2]['ingresos_totales']) > 0.01:
+                diferencias.append('ingresos_por_mes')
+            print(f"{n_reservas:>9} | {anterior[0]:>14} {anterior[1] * 1000:>9.1f}ms | "
+                  f"{nuevo[0]:>9} {nuevo[1] * 1000:>7.1f}ms | {'❌ ' + ', '.join(diferencias) if diferencias else '✅'}")
+            if diferencias:
+                raise SystemExit(1)
+
+    with app.app_context():
+        consistente = verificar_incremental()
+        print(f"Resúmenes incrementales iguales a la reconstrucción: {'✅' if consistente else '❌'}")
+        if not consistente:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
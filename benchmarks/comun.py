@@ -0,0 +1,113 @@
+"""
+Utilidades compartidas por los scripts de benchmark de Flash Reserver
+"""
+
+import os
+import sys
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, date, time as dtime, timedelta
+
+# Agregar la raíz del proyecto al path
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ_PROYECTO)
+
+from flask import Flask
+from sqlalchemy import event
+from app import db
+
+
+def crear_app_benchmark(database_uri='sqlite:///:memory:', engine_options=None):
+    """Crea una app mínima (solo base de datos) para medir servicios sin blueprints ni schedulers"""
+    flask_app = Flask('benchmark', template_folder=os.path.join(RAIZ_PROYECTO, 'app', 'templates'))
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    flask_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options or {}
+    flask_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    flask_app.config['TESTING'] = True
+    db.init_app(flask_app)
+
+    # Registrar todos los modelos antes de crear las tablas
+    import app.models  # noqa: F401
+    with flask_app.app_context():
+        db.create_all()
+    return flask_app
+
+
+class ContadorConsultas:
+    """Cuenta las sentencias SQL ejecutadas sobre el engine actual"""
+
+    def __init__(self):
+        self.total = 0
+        self.sentencias = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+        self.sentencias.append(statement)
+
+
+@contextmanager
+def contar_consultas():
+    contador = ContadorConsultas()
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', contador._on_execute)
+    try:
+        yield contador
+    finally:
+        event.remove(engine, 'before_cursor_execute', contador._on_execute)
+
+
+@contextmanager
+def cronometro():
+    """Mide el tiempo transcurrido; el resultado queda en ``resultado['segundos']``"""
+    resultado = {}
+    inicio = time.perf_counter()
+    try:
+        yield resultado
+    finally:
+        resultado['segundos'] = time.perf_counter() - inicio
+
+
+def sembrar_datos(n_canchas=10, reservas_por_cancha=50, dias=90, n_usuarios=20, semilla=42):
+    """Crea roles, usuarios, canchas y reservas confirmadas aleatorias desde hoy"""
+    from app.models import Rol, Usuario, TipoCancha, Categoria, Cancha, Reserva
+
+    rnd = random.Random(semilla)
+    rol = Rol(Nombre='Cliente')
+    tipo = TipoCancha(Nombre='Sintético')
+    categoria = Categoria(Nombre='Fútbol')
+    db.session.add_all([rol, tipo, categoria])
+    db.session.flush()
+
+    usuarios = [
+        Usuario(Nombre=f'Usuario {i}', Email=f'usuario{i}@bench.local', Telefono='3000000000',
+                Contrasena='x', RolId=rol.Id)
+        for i in range(n_usuarios)
+    ]
+    canchas = [
+        Cancha(Nombre=f'Cancha {i}', TipoCanchaId=tipo.Id, CategoriaId=categoria.Id, PrecioHora=50000)
+        for i in range(n_canchas)
+    ]
+    db.session.add_all(usuarios + canchas)
+    db.session.flush()
+
+    hoy = date.today()
+    reservas = []
+    for cancha in canchas:
+        for _ in range(reservas_por_cancha):
+            hora = rnd.randint(6, 20)
+            duracion = rnd.randint(1, 2)
+            reserva = Reserva(
+                UsuarioId=rnd.choice(usuarios).Id,
+                CanchaId=cancha.Id,
+                Fecha=hoy + timedelta(days=rnd.randint(0, dias - 1)),
+                HoraInicio=dtime(hora, 0),
+                HoraFin=dtime(min(hora + duracion, 22), 0),
+                Estado='Confirmada',
+                FechaCreacion=datetime.utcnow()
+            )
+            reserva.fijar_precio(cancha.PrecioHora)
+            reservas.append(reserva)
+    db.session.add_all(reservas)
+    db.session.commit()
+    return canchas
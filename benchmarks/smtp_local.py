@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Servidor SMTP local para pruebas de notificaciones
+
+Acepta correos sin autenticación ni TLS y los guarda en memoria. Permite simular
+un SMTP lento (--retardo-ms) o que falla (--tasa-fallo) para probar reintentos.
+
+Uso como script:
+    python benchmarks/smtp_local.py --puerto 1025 --retardo-ms 300 --mostrar
+
+y en el .env de la app:
+    MAIL_SERVER=localhost
+    MAIL_PORT=1025
+    MAIL_USE_TLS=false
+    MAIL_DEFAULT_SENDER=noreply@flashreserver.local
+
+Uso como librería:
+    servidor = ServidorSMTPLocal(puerto=0).iniciar()
+    ...
+    servidor.detener(); print(len(servidor.mensajes))
+"""
+
+import argparse
+import random
+import socketserver
+import threading
+import time
+
+
+class _ManejadorSMTP(socketserver.StreamRequestHandler):
+    def _responder(self, linea):
+        self.wfile.write((linea + '\r\n').encode('utf-8'))
+
+    def handle(self):
+        servidor = self.server.smtp_local
+        servidor._registrar_conexion()
+        self._responder('220 flash-reserver-smtp-local ESMTP')
+        remitente, destinatarios = None, []
+
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                break
+            comando = linea.decode('utf-8', 'replace').strip()
+            verbo = comando[:4].upper()
+
+            if verbo in ('EHLO', 'HELO'):
+                if verbo == 'EHLO':
+                    self._responder('250-flash-reserver-smtp-local')
+                    self._responder('250 8BITMIME')
+                else:
+                    self._responder('250 flash-reserver-smtp-local')
+            elif verbo == 'MAIL':
+                remitente, destinatarios = comando[10:].strip(), []
+                self._responder('250 OK')
+            elif verbo == 'RCPT':
+                destinatarios.append(comando[8:].strip())
+                self._responder('250 OK')
+            elif verbo == 'DATA':
+                self._responder('354 Terminar con <CRLF>.<CRLF>')
+                contenido = []
+                while True:
+                    dato = self.rfile.readline()
+                    if not dato or dato in (b'.\r\n', b'.\n'):
+                        break
+                    contenido.append(dato)
+                if servidor.retardo:
+                    time.sleep(servidor.retardo)
+                if servidor.tasa_fallo and random.random() < servidor.tasa_fallo:
+                    self._responder('451 Falla simulada, intente de nuevo')
+                else:
+                    servidor._guardar(remitente, destinatarios, b''.join(contenido))
+                    self._responder('250 OK')
+            elif verbo == 'RSET':
+                remitente, destinatarios = None, []
+                self._responder('250 OK')
+            elif verbo == 'NOOP':
+                self._responder('250 OK')
+            elif verbo == 'QUIT':
+                self._responder('221 Bye')
+                break
+            else:
+                self._responder('502 Comando no implementado')
+
+
+class _ServidorTCP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ServidorSMTPLocal:
+    def __init__(self, host='127.0.0.1', puerto=1025, retardo_ms=0, tasa_fallo=0.0, mostrar=False):
+        self.host = host
+        self.puerto = puerto
+        self.retardo = retardo_ms / 1000
+        self.tasa_fallo = tasa_fallo
+        self.mostrar = mostrar
+        self.mensajes = []
+        self.conexiones = 0
+        self._lock = threading.Lock()
+        self._servidor = None
+        self._hilo = None
+
+    def _registrar_conexion(self):
+        with self._lock:
+            self.conexiones += 1
+
+    def _guardar(self, remitente, destinatarios, contenido):
+        with self._lock:
+            self.mensajes.append({
+                'remitente': remitente,
+                'destinatarios': destinatarios,
+                'contenido': contenido,
+                'recibido': time.time()
+            })
+            total = len(self.mensajes)
+        if self.mostrar:
+            print(f"📧 #{total} {remitente} -> {', '.join(destinatarios)} ({len(contenido)} bytes)")
+
+    def iniciar(self):
+        self._servidor = _ServidorTCP((self.host, self.puerto), _ManejadorSMTP)
+        self._servidor.smtp_local = self
+        self.puerto = self._servidor.server_address[1]
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=1025)
+    parser.add_argument('--retardo-ms', type=float, default=0, help='Retardo simulado por mensaje')
+    parser.add_argument('--tasa-fallo', type=float, default=0.0, help='Fracción de mensajes rechazados con 451')
+    parser.add_argument('--mostrar', action='store_true', help='Imprimir cada mensaje recibido')
+    args = parser.parse_args()
+
+    servidor = ServidorSMTPLocal(args.host, args.puerto, args.retardo_ms, args.tasa_fallo, args.mostrar).iniciar()
+    print(f"📬 SMTP local escuchando en {servidor.host}:{servidor.puerto} (Ctrl+C para detener)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.detener()
+        print(f"\n📊 Conexiones: {servidor.conexiones} | mensajes recibidos: {len(servidor.mensajes)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Regresión de consultas N+1 en los listados
+
+Renderiza cada página de listado (admin, cliente y foro) con la app completa
+sobre un conjunto de datos sembrado, cuenta las sentencias SQL de cada
+petición, triplica los datos, duplica las filas por página y vuelve a contar.
+Con las estrategias de carga de ``app.utils.perfiles_consulta`` el número de
+consultas no depende del número de filas; si alguna página ejecuta más
+consultas con más filas (una relación cargada fila por fila) termina con
+código 1.
+
+Uso: python benchmarks/verificar_consultas.py [--lotes 3] [--detalle]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+
+from comun import RAIZ_PROYECTO  # noqa: F401  (agrega la raíz del proyecto al path)
+from sqlalchemy import event, update
+from app import create_app, db
+from config import TestingConfig
+
+
+class ConfigVerificacion(TestingConfig):
+    # Páginas llenas desde el primer lote; la segunda medición usa el doble
+    PAGINACION_POR_PAGINA = 5
+
+
+def sembrar_lote(n, admin_id, rnd, post_id=None):
+    """Un lote de datos con filas relacionadas distintas (categorías, usuarios, canchas...)"""
+    from app.models import (Rol, Usuario, TipoCancha, Categoria, Cancha, Imagen, Comentario, Reserva,
+                            Post, Like, ComentarioForo)
+    from app.models.mensaje import Mensaje
+
+    rol = Rol.query.filter_by(Nombre='Cliente').first()
+    categorias = [Categoria(Nombre=f'Categoría {n}-{i}') for i in range(2)]
+    tipos = [TipoCancha(Nombre=f'Tipo {n}-{i}') for i in range(2)]
+    db.session.add_all(categorias + tipos)
+    db.session.flush()
+
+    usuarios = [Usuario(Nombre=f'Usuario {n}-{i}', Email=f'u{n}-{i}@verificacion.local', Telefono='3000000000',
+                        Contrasena='x', RolId=rol.Id) for i in range(12)]
+    canchas = [Cancha(Nombre=f'Cancha {n}-{i}', TipoCanchaId=tipos[i % 2].Id, CategoriaId=categorias[i % 2].Id,
+                      PrecioHora=50000) for i in range(4)]
+    db.session.add_all(usuarios + canchas)
+    db.session.flush()
+
+    ahora = datetime.utcnow()
+    for i, cancha in enumerate(canchas):
+        db.session.add_all([Imagen(CanchaId=cancha.Id, Ruta=f'uploads/canchas/{n}-{i}-{j}.jpg') for j in range(2)])
+        db.session.add_all([Comentario(UsuarioId=usuarios[j].Id, CanchaId=cancha.Id, Comentario='Buena cancha',
+                                       Calificacion=4, FechaCreacion=ahora) for j in range(3)])
+        for j in range(8):
+            reserva = Reserva(UsuarioId=admin_id if j < 3 else rnd.choice(usuarios).Id, CanchaId=cancha.Id,
+                              Fecha=date.today() + timedelta(days=rnd.randint(-10, 30)),
+                              HoraInicio=time(8 + j), HoraFin=time(9 + j), FechaCreacion=ahora)
+            reserva.fijar_precio(cancha.PrecioHora)
+            db.session.add(reserva)
+
+    for i in range(12):
+        post = Post(Titulo=f'Post {n}-{i}', Contenido='Texto', UsuarioId=usuarios[i].Id,
+                    Categoria=rnd.choice(['General', 'Deportes']), FechaCreacion=ahora,
+                    TotalLikes=3, TotalComentarios=2)
+        db.session.add(post)
+        db.session.flush()
+        db.session.add_all([Like(UsuarioId=u.Id, PostId=post.Id) for u in rnd.sample(usuarios, 3)])
+        db.session.add_all([ComentarioForo(Contenido='Comentario', UsuarioId=u.Id, PostId=post.Id, FechaCreacion=ahora)
+                            for u in rnd.sample(usuarios, 2)])
+
+    if post_id:
+        # El post de "ver post" también gana comentarios con cada lote
+        db.session.add_all([ComentarioForo(Contenido='Comentario', UsuarioId=u.Id, PostId=post_id, FechaCreacion=ahora)
+                            for u in rnd.sample(usuarios, 4)])
+        db.session.execute(update(Post).where(Post.Id == post_id).values(TotalComentarios=Post.TotalComentarios + 4))
+
+    db.session.add_all([Mensaje(UsuarioId=usuarios[i % 3].Id if i % 2 else admin_id, Asunto='Consulta',
+                                Mensaje='Texto', FechaEnvio=ahora) for i in range(24)])
+    db.session.commit()
+
+
+def paginas(ids):
+    """Páginas a revisar: nombre -> URL"""
+    return {
+        'admin: canchas': '/admin/canchas',
+        'admin: reservas': '/admin/reservas',
+        'admin: usuarios': '/admin/usuarios',
+        'admin: ver usuario': f"/admin/usuario/{ids['admin']}",
+        'admin: categorías': '/admin/categorias',
+        'admin: tipos de cancha': '/admin/tipos-cancha',
+        'admin: notificaciones': '/admin/notificaciones',
+        'admin: conversación': f"/admin/conversacion/{ids['admin']}",
+        'admin: gestionar posts': '/admin/admin_gestionar_posts',
+        'admin: estadísticas del foro': '/admin/admin_estadisticas_foro',
+        'cliente: canchas': '/client/canchas',
+        'cliente: api canchas': '/client/api/canchas',
+        'cliente: detalle de cancha': f"/client/cancha/{ids['cancha']}",
+        'cliente: mis reservas': '/client/mis-reservas',
+        'cliente: chat': '/client/chat/mensajes',
+        'foro: inicio': '/foro/',
+        'foro: populares': '/foro/?orden=popular',
+        'foro: ver post': f"/foro/post/{ids['post']}",
+        'foro: comentarios recientes': '/foro/comentarios-recientes',
+    }
+
+
+def medir(app, ids):
+    """Consultas de cada página en una petición nueva (sin identity map compartido)"""
+    consultas = Counter()
+    sentencias = {}
+    actual = {}
+
+    def _contar(conn, cursor, statement, *_):
+        consultas[actual['nombre']] += 1
+        sentencias.setdefault(actual['nombre'], []).append(statement)
+
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['_user_id'] = str(ids['admin'])
+        sesion['_fresh'] = True
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _contar)
+    try:
+        for nombre, url in paginas(ids).items():
+            actual['nombre'] = nombre
+            # Las vistas de admin imprimen trazas de acceso en cada petición
+            with contextlib.redirect_stdout(io.StringIO()):
+                respuesta = cliente.get(url)
+            if respuesta.status_code != 200:
+                raise SystemExit(f"❌ {nombre}: {url} respondió {respuesta.status_code}")
+    finally:
+        event.remove(engine, 'before_cursor_execute', _contar)
+    return consultas, sentencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lotes', type=int, default=3, help='Lotes de datos de la segunda medición')
+    parser.add_argument('--detalle', action='store_true', help='Mostrar las sentencias de las páginas que crecen')
+    args = parser.parse_args()
+
+    app = create_app(ConfigVerificacion)
+    rnd = random.Random(7)
+    with app.app_context():
+        from app.models import Rol, Usuario, Cancha, Post
+        db.create_all()
+        rol_admin = Rol(Nombre='Administrador')
+        db.session.add_all([rol_admin, Rol(Nombre='Cliente')])
+        db.session.flush()
+        admin = Usuario(Nombre='Admin', Email='admin@verificacion.local', Telefono='3000000000',
+                        Contrasena='x', RolId=rol_admin.Id)
+        db.session.add(admin)
+        db.session.commit()
+        sembrar_lote(0, admin.Id, rnd)
+        ids = {'admin': admin.Id, 'cancha': Cancha.query.first().Id, 'post': Post.query.first().Id}
+
+    # Una pasada previa a cada medición para que las cachés de la app (ocupación, resumen,
+    # categorías del foro), que se invalidan al sembrar, no cuenten
+    medir(app, ids)
+    base, _ = medir(app, ids)
+    with app.app_context():
+        for n in range(1, args.lotes):
+            sembrar_lote(n, ids['admin'], rnd, post_id=ids['post'])
+    app.config['PAGINACION_POR_PAGINA'] *= 2
+    medir(app, ids)
+    grande, sentencias = medir(app, ids)
+
+    fallidas = 0
+    print(f"{'página':<32} {'1 lote':>7} {f'{args.lotes} lotes':>8}")
+    for nombre in paginas(ids):
+        crece = grande[nombre] > base[nombre]
+        fallidas += crece
+        print(f"{'❌' if crece else '✅'} {nombre:<30} {base[nombre]:>7} {grande[nombre]:>8}")
+        if crece and args.detalle:
+            for sentencia, veces in Counter(sentencias[nombre]).most_common(3):
+                print(f"      {veces}x {' '.join(sentencia.split())[:150]}")
+
+    if fallidas:
+        print(f"\n{fallidas} páginas ejecutan más consultas con más datos")
+        raise SystemExit(1)
+    print("\nEl número de consultas de cada página no depende del tamaño de los datos")
+
+
+if __name__ == '__main__':
+    main()
@@ -31,6 +31,82 @@ class Config:
     # Configuración de logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
+    # Notificaciones: entrega en background por lotes reclamados, con un pool acotado de workers
+    NOTIFICACIONES_ASINCRONAS = os.getenv('NOTIFICACIONES_ASINCRONAS', 'true').lower() in ['true', 'on', '1']
+    NOTIFICACIONES_WORKERS = int(os.getenv('NOTIFICACIONES_WORKERS', 2))
+    NOTIFICACIONES_TAMANO_LOTE = int(os.getenv('NOTIFICACIONES_TAMANO_LOTE', 100))
+    NOTIFICACIONES_INTERVALO_BARRIDO = int(os.getenv('NOTIFICACIONES_INTERVALO_BARRIDO', 30))
+    # Cada cuánto un worker busca pendientes creadas por otros procesos (p. ej. PROCESO_MODO=web): cota de la latencia
+    NOTIFICACIONES_INTERVALO_SONDEO = float(os.getenv('NOTIFICACIONES_INTERVALO_SONDEO', 1))
+    NOTIFICACIONES_TIEMPO_RECLAMO = int(os.getenv('NOTIFICACIONES_TIEMPO_RECLAMO', 600))
+
+    # Servicios de background por proceso: 'completo' (web + workers, se inician con la primera petición),
+    # 'web' (sin hilos ni consultas al arrancar) o 'worker' (los inicia worker.py al arrancar)
+    PROCESO_MODO = os.getenv('PROCESO_MODO', 'completo')
+
+    # Planificador de tareas: 'elegido' (un proceso gana el lease) o 'desactivado'
+    SCHEDULER_MODO = os.getenv('SCHEDULER_MODO', 'elegido')
+    SCHEDULER_DURACION_LEASE = int(os.getenv('SCHEDULER_DURACION_LEASE', 30))
+
+    # Recordatorios: barrido cada minuto; la ventana recupera barridos perdidos
+    RECORDATORIOS_VENTANA_MINUTOS = int(os.getenv('RECORDATORIOS_VENTANA_MINUTOS', 30))
+    RECORDATORIOS_TAMANO_LOTE = int(os.getenv('RECORDATORIOS_TAMANO_LOTE', 500))
+
+    # Reportes PDF: se generan en background y se guardan en disco REPORTES_TTL segundos
+    REPORTES_ASINCRONOS = os.getenv('REPORTES_ASINCRONOS', 'true').lower() in ['true', 'on', '1']
+    REPORTES_DIRECTORIO = os.getenv('REPORTES_DIRECTORIO')  # por defecto instance/reportes
+    REPORTES_TTL = int(os.getenv('REPORTES_TTL', 3600))
+    REPORTES_WORKERS = int(os.getenv('REPORTES_WORKERS', 1))
+    REPORTES_INTERVALO_BARRIDO = int(os.getenv('REPORTES_INTERVALO_BARRIDO', 5))
+
+    # Imágenes subidas: variantes WebP/JPEG de estos anchos generadas en background, en instance/imagenes por defecto
+    IMAGENES_ASINCRONAS = os.getenv('IMAGENES_ASINCRONAS', 'true').lower() in ['true', 'on', '1']
+    IMAGENES_DIRECTORIO = os.getenv('IMAGENES_DIRECTORIO')
+    IMAGENES_ANCHOS = tuple(int(ancho) for ancho in os.getenv('IMAGENES_ANCHOS', '160,480,960,1600').split(','))
+    IMAGENES_CALIDAD = int(os.getenv('IMAGENES_CALIDAD', 80))
+    IMAGENES_MAX_AGE = int(os.getenv('IMAGENES_MAX_AGE', 86400))
+    IMAGENES_WORKERS = int(os.getenv('IMAGENES_WORKERS', 1))
+    IMAGENES_INTERVALO_BARRIDO = int(os.getenv('IMAGENES_INTERVALO_BARRIDO', 300))
+    # Archivos subidos: URLs con la versión del contenido (?v=) cacheadas como inmutables y 304 con ETag;
+    # envío por 'flask', 'x-accel-redirect' (ubicaciones internas de nginx bajo el prefijo) o 'x-sendfile'
+    ARCHIVOS_ENVIO = os.getenv('ARCHIVOS_ENVIO', 'flask')
+    ARCHIVOS_PREFIJO_INTERNO = os.getenv('ARCHIVOS_PREFIJO_INTERNO', '/_archivos')
+    ARCHIVOS_MAX_AGE_INMUTABLE = int(os.getenv('ARCHIVOS_MAX_AGE_INMUTABLE', 31536000))
+    ARCHIVOS_MAX_VERSIONES = int(os.getenv('ARCHIVOS_MAX_VERSIONES', 5000))
+    # Backend de PDF: 'auto', 'wkhtmltopdf', 'xhtml2pdf' o 'xhtml2pdf_procesos' (pool de PDF_PROCESOS procesos)
+    PDF_BACKEND = os.getenv('PDF_BACKEND', 'auto')
+    PDF_PROCESOS = int(os.getenv('PDF_PROCESOS', 2))
+    # Caché de PDFs por hash del HTML; por defecto instance/pdf_cache
+    PDF_CACHE_DIRECTORIO = os.getenv('PDF_CACHE_DIRECTORIO')
+    PDF_CACHE_MAX_ARCHIVOS = int(os.getenv('PDF_CACHE_MAX_ARCHIVOS', 500))
+    # Ejecutable de wkhtmltopdf; si no se define se busca en el PATH
+    WKHTMLTOPDF_PATH = os.getenv('WKHTMLTOPDF_PATH')
+
+    # Segundos que se reutiliza la instantánea de contadores del dashboard (se invalida al confirmar cambios)
+    TABLERO_TTL = int(os.getenv('TABLERO_TTL', 30))
+
+    # Foro: tarjetas de posts renderizadas que se guardan por proceso y segundos que vale la lista de categorías
+    FORO_FRAGMENTOS_MAX = int(os.getenv('FORO_FRAGMENTOS_MAX', 2000))
+    FORO_CATEGORIAS_TTL = int(os.getenv('FORO_CATEGORIAS_TTL', 300))
+
+    # Listados paginados por cursor: filas por página y tope del conteo aproximado ("1000+")
+    PAGINACION_POR_PAGINA = int(os.getenv('PAGINACION_POR_PAGINA', 25))
+    PAGINACION_MAX_CONTEO = int(os.getenv('PAGINACION_MAX_CONTEO', 1000))
+
+    # Instrumentación SQL: consultas y tiempo por petición, sentencias agrupadas por huella y log de lentas
+    CONSULTAS_INSTRUMENTACION = os.getenv('CONSULTAS_INSTRUMENTACION', 'true').lower() in ['true', 'on', '1']
+    # Cabeceras X-Query-Count y Server-Timing en cada respuesta (exponen detalles internos)
+    CONSULTAS_CABECERAS = os.getenv('CONSULTAS_CABECERAS', 'false').lower() in ['true', 'on', '1']
+    CONSULTAS_LENTAS_MS = float(os.getenv('CONSULTAS_LENTAS_MS', 100))
+    CONSULTAS_MAX_HUELLAS = int(os.getenv('CONSULTAS_MAX_HUELLAS', 500))
+
+    # Métricas de Prometheus en /metrics (latencia por endpoint, pool, colas)
+    METRICAS_ACTIVAS = os.getenv('METRICAS_ACTIVAS', 'true').lower() in ['true', 'on', '1']
+    # Directorio compartido por los workers de gunicorn para sumar sus métricas (ver gunicorn.conf.py)
+    METRICAS_DIRECTORIO = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    # Si se define, /metrics exige 'Authorization: Bearer <token>'
+    METRICAS_TOKEN = os.getenv('METRICAS_TOKEN')
+
     # OAuth - Google
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
@@ -73,6 +149,11 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    NOTIFICACIONES_ASINCRONAS = False
+    REPORTES_ASINCRONOS = False
+    IMAGENES_ASINCRONAS = False
+    SCHEDULER_MODO = 'desactivado'
+    PROCESO_MODO = 'web'
 
 config = {
     'development': DevelopmentConfig,
@@ -139,8 +139,9 @@ def main():
     
     print("\n🎉 ¡Despliegue completado!")
     print("\n📋 PRÓXIMOS PASOS:")
-    print("1. Ejecuta: gunicorn -w 4 -b 0.0.0.0:5000 wsgi:application")
-    print("2. Configura un proxy reverso (nginx/apache)")
+    print("1. Ejecuta: gunicorn -c gunicorn.conf.py wsgi:application")
+    print("2. Configura un proxy reverso (nginx/apache); con ARCHIVOS_ENVIO=x-accel-redirect, las ubicaciones")
+    print("   internas /_archivos/static/ y /_archivos/imagenes/ (ver app/services/archivos_service.py)")
     print("3. Configura SSL/HTTPS")
     print("4. Configura monitoreo y logs")
     print("5. Configura backups de la base de datos")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Script para generar las variantes redimensionadas de las imágenes subidas
+
+Las listas de canchas, el foro y los avatares muestran las variantes WebP/JPEG
+de ``IMAGENES_ANCHOS`` que genera ``imagen_service`` al subir cada imagen. Este
+script las genera para las imágenes que ya estaban en static/uploads (o que se
+copiaron por fuera de la aplicación); con --todas las regenera aunque estén al
+día, por ejemplo después de cambiar los anchos o la calidad.
+
+Uso: python generar_variantes_imagenes.py [--todas]
+"""
+
+import argparse
+import time
+
+from app import create_app
+from app.services.imagen_service import imagen_service
+
+def generar_variantes_imagenes():
+    parser = argparse.ArgumentParser(description='Genera las variantes de las imágenes subidas')
+    parser.add_argument('--todas', action='store_true', help='Regenerar también las que ya tienen variantes al día')
+    args = parser.parse_args()
+
+    print("🖼️  GENERACIÓN DE VARIANTES DE IMÁGENES")
+    print("=" * 60)
+
+    app = create_app()
+    with app.app_context():
+        inicio = time.perf_counter()
+        generadas = fallidas = 0
+        for ruta in imagen_service.pendientes(todas=args.todas):
+            try:
+                imagen_service.generar(ruta)
+                generadas += 1
+            except Exception as e:
+                fallidas += 1
+                print(f"❌ {ruta}: {e}")
+        print(f"✅ {generadas} imágenes procesadas en {time.perf_counter() - inicio:.1f}s en {imagen_service.directorio}")
+        if fallidas:
+            print(f"⚠️  {fallidas} imágenes no se pudieron procesar")
+
+if __name__ == "__main__":
+    generar_variantes_imagenes()
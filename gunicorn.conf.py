@@ -0,0 +1,34 @@
+"""
+Configuración de gunicorn
+
+Las métricas de Prometheus de cada worker se escriben en
+PROMETHEUS_MULTIPROC_DIR y /metrics las suma entre todos: el directorio se
+vacía al arrancar el servidor (valores de una ejecución anterior) y se marcan
+los workers que terminan para que sus gauges 'livesum' dejen de contar.
+
+Uso: gunicorn -c gunicorn.conf.py wsgi:application
+"""
+
+import os
+import shutil
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+
+# Antes de importar la app en los workers: prometheus_client lo lee al importarse
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                               'instance', 'metricas'))
+
+
+def on_starting(server):
+    directorio = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directorio, ignore_errors=True)
+    os.makedirs(directorio, exist_ok=True)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
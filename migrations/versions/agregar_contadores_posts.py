@@ -0,0 +1,57 @@
+"""Agregar contadores de likes y comentarios a los posts, con índices para el orden popular
+
+Revision ID: agregar_contadores_posts
+Revises: agregar_indices_paginacion
+Create Date: 2026-10-18 21:00:00.000000
+
+Los contadores existentes se calculan desde likes y comentarios_foro; desde
+entonces los mantiene ``foro_service``. ``TotalComentarios`` cuenta solo los
+comentarios activos (los que muestra el post).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'agregar_contadores_posts'
+down_revision = 'agregar_indices_paginacion'
+branch_labels = None
+depends_on = None
+
+posts = sa.table('posts',
+    sa.column('Id', sa.Integer()),
+    sa.column('TotalLikes', sa.Integer()),
+    sa.column('TotalComentarios', sa.Integer())
+)
+likes = sa.table('likes', sa.column('PostId', sa.Integer()))
+comentarios = sa.table('comentarios_foro',
+    sa.column('PostId', sa.Integer()),
+    sa.column('Estado', sa.String(20))
+)
+
+INDICES = [
+    ('idx_posts_estado_total_likes', 'posts', ['Estado', 'TotalLikes']),
+    ('idx_posts_categoria_estado_total_likes', 'posts', ['Categoria', 'Estado', 'TotalLikes']),
+]
+
+
+def upgrade():
+    op.add_column('posts', sa.Column('TotalLikes', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('posts', sa.Column('TotalComentarios', sa.Integer(), nullable=False, server_default='0'))
+
+    op.execute(posts.update().values(
+        TotalLikes=sa.select(sa.func.count()).select_from(likes)
+        .where(likes.c.PostId == posts.c.Id).scalar_subquery(),
+        TotalComentarios=sa.select(sa.func.count()).select_from(comentarios)
+        .where(comentarios.c.PostId == posts.c.Id, comentarios.c.Estado == 'Activo').scalar_subquery()
+    ))
+
+    for nombre, tabla, columnas in INDICES:
+        op.create_index(nombre, tabla, columnas)
+
+
+def downgrade():
+    for nombre, tabla, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla)
+    op.drop_column('posts', 'TotalComentarios')
+    op.drop_column('posts', 'TotalLikes')
@@ -0,0 +1,37 @@
+"""Agregar índices para los listados paginados por cursor de posts
+
+Revision ID: agregar_indices_paginacion
+Revises: crear_tabla_trabajos_reporte
+Create Date: 2026-10-18 20:00:00.000000
+
+Cada índice termina en la columna de orden del listado; MySQL (InnoDB) y SQLite
+agregan la clave primaria al final de los índices secundarios, así que también
+cubren el desempate por ``Id`` del cursor. Las reservas ya usan
+``idx_reservas_fecha_creacion`` e ``idx_reservas_usuario_fecha`` y los mensajes
+``idx_mensajes_usuario_fecha_leido`` y los usuarios se ordenan por ``Id``.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'agregar_indices_paginacion'
+down_revision = 'crear_tabla_trabajos_reporte'
+branch_labels = None
+depends_on = None
+
+INDICES = [
+    ('idx_posts_fecha_creacion', 'posts', ['FechaCreacion']),
+    ('idx_posts_estado_fecha_creacion', 'posts', ['Estado', 'FechaCreacion']),
+    ('idx_posts_categoria_estado_fecha_creacion', 'posts', ['Categoria', 'Estado', 'FechaCreacion']),
+]
+
+
+def upgrade():
+    for nombre, tabla, columnas in INDICES:
+        op.create_index(nombre, tabla, columnas)
+
+
+def downgrade():
+    for nombre, tabla, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla)
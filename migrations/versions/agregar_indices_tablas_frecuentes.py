@@ -0,0 +1,38 @@
+"""Agregar índices compuestos para las consultas frecuentes de reservas, notificaciones y mensajes
+
+Revision ID: agregar_indices_tablas_frecuentes
+Revises: agregar_precio_reservas
+Create Date: 2026-10-18 18:00:00.000000
+
+``benchmarks/verificar_planes.py`` revisa con EXPLAIN que las consultas
+principales usen estos índices.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'agregar_indices_tablas_frecuentes'
+down_revision = 'agregar_precio_reservas'
+branch_labels = None
+depends_on = None
+
+INDICES = [
+    ('idx_reservas_cancha_fecha_estado', 'Reservas', ['CanchaId', 'Fecha', 'Estado']),
+    ('idx_reservas_usuario_fecha', 'Reservas', ['UsuarioId', 'Fecha']),
+    ('idx_reservas_fecha_creacion', 'Reservas', ['FechaCreacion']),
+    ('idx_notificaciones_estado_intentos', 'notificaciones', ['estado', 'intentos']),
+    ('idx_notificaciones_estado_fecha_creacion', 'notificaciones', ['estado', 'fecha_creacion']),
+    ('idx_mensajes_usuario_fecha_leido', 'mensajes', ['UsuarioId', 'FechaEnvio', 'Leido']),
+    ('idx_mensajes_leido_usuario', 'mensajes', ['Leido', 'UsuarioId']),
+]
+
+
+def upgrade():
+    for nombre, tabla, columnas in INDICES:
+        op.create_index(nombre, tabla, columnas)
+
+
+def downgrade():
+    for nombre, tabla, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,79 @@
+"""Agregar precio por hora y total fijados al reservar, con índice para sumar ingresos
+
+Revision ID: agregar_precio_reservas
+Revises: crear_tablas_resumen_reservas
+Create Date: 2026-10-18 17:00:00.000000
+
+Las reservas existentes toman el precio actual de su cancha. Después de aplicar
+la migración conviene correr ``python reconstruir_resumenes.py`` para que los
+ingresos de los resúmenes salgan de los precios guardados.
+"""
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'agregar_precio_reservas'
+down_revision = 'crear_tablas_resumen_reservas'
+branch_labels = None
+depends_on = None
+
+TAMANO_LOTE = 1000
+
+reservas = sa.table('Reservas',
+    sa.column('Id', sa.Integer()),
+    sa.column('CanchaId', sa.Integer()),
+    sa.column('HoraInicio', sa.Time()),
+    sa.column('HoraFin', sa.Time()),
+    sa.column('PrecioHora', sa.Numeric(10, 2)),
+    sa.column('PrecioTotal', sa.Numeric(12, 2))
+)
+canchas = sa.table('Canchas',
+    sa.column('Id', sa.Integer()),
+    sa.column('PrecioHora', sa.Numeric(10, 2))
+)
+
+
+def upgrade():
+    op.add_column('Reservas', sa.Column('PrecioHora', sa.Numeric(10, 2), nullable=True))
+    op.add_column('Reservas', sa.Column('PrecioTotal', sa.Numeric(12, 2), nullable=True))
+
+    # Histórico por lotes de Id: precio actual de la cancha x duración de la reserva
+    conexion = op.get_bind()
+    ultimo_id = 0
+    while True:
+        filas = conexion.execute(
+            sa.select(reservas.c.Id, reservas.c.HoraInicio, reservas.c.HoraFin, canchas.c.PrecioHora)
+            .select_from(reservas.join(canchas, reservas.c.CanchaId == canchas.c.Id))
+            .where(reservas.c.Id > ultimo_id)
+            .order_by(reservas.c.Id)
+            .limit(TAMANO_LOTE)
+        ).fetchall()
+        if not filas:
+            break
+        valores = []
+        for fila in filas:
+            duracion = datetime.combine(date.min, fila.HoraFin) - datetime.combine(date.min, fila.HoraInicio)
+            total = Decimal(fila.PrecioHora) * Decimal(str(duracion.total_seconds() / 3600))
+            valores.append({
+                'reserva_id': fila.Id,
+                'precio_hora': fila.PrecioHora,
+                'precio_total': total.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            })
+        conexion.execute(
+            reservas.update()
+            .where(reservas.c.Id == sa.bindparam('reserva_id'))
+            .values(PrecioHora=sa.bindparam('precio_hora'), PrecioTotal=sa.bindparam('precio_total')),
+            valores
+        )
+        ultimo_id = filas[-1].Id
+
+    op.create_index('idx_reservas_fecha_estado_precio', 'Reservas', ['Fecha', 'Estado', 'PrecioTotal'])
+
+
+def downgrade():
+    op.drop_index('idx_reservas_fecha_estado_precio', table_name='Reservas')
+    op.drop_column('Reservas', 'PrecioTotal')
+    op.drop_column('Reservas', 'PrecioHora')
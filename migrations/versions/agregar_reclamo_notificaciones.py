@@ -0,0 +1,31 @@
+"""Agregar columnas de reclamo por lote a notificaciones
+
+Revision ID: agregar_reclamo_notificaciones
+Revises: crear_tabla_bloqueos_reserva
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'agregar_reclamo_notificaciones'
+down_revision = 'crear_tabla_bloqueos_reserva'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Token y fecha del reclamo hecho por el worker que procesa el lote
+    op.add_column('notificaciones', sa.Column('lote', sa.String(32), nullable=True))
+    op.add_column('notificaciones', sa.Column('fecha_reclamo', sa.DateTime(), nullable=True))
+    op.create_index('ix_notificaciones_lote', 'notificaciones', ['lote'], unique=False)
+    op.create_index('idx_notificaciones_estado_id', 'notificaciones', ['estado', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_notificaciones_estado_id', table_name='notificaciones')
+    op.drop_index('ix_notificaciones_lote', table_name='notificaciones')
+    op.drop_column('notificaciones', 'fecha_reclamo')
+    op.drop_column('notificaciones', 'lote')
@@ -0,0 +1,33 @@
+"""Agregar estado de recordatorios enviados e índice por fecha y hora a reservas
+
+Revision ID: agregar_recordatorios_enviados
+Revises: crear_tabla_bloqueos_planificador
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'agregar_recordatorios_enviados'
+down_revision = 'crear_tabla_bloqueos_planificador'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Reservas', sa.Column('Recordatorio24hEnviadoEn', sa.DateTime(), nullable=True))
+    op.add_column('Reservas', sa.Column('Recordatorio2hEnviadoEn', sa.DateTime(), nullable=True))
+    op.create_index('idx_reservas_fecha_hora_estado', 'Reservas', ['Fecha', 'HoraInicio', 'Estado'], unique=False)
+
+    # Los recordatorios ahora los envía un barrido; se quitan las tareas por reserva del job store
+    conexion = op.get_bind()
+    if sa.inspect(conexion).has_table('apscheduler_jobs'):
+        conexion.execute(sa.text("DELETE FROM apscheduler_jobs WHERE id LIKE 'recordatorio_%'"))
+
+
+def downgrade():
+    op.drop_index('idx_reservas_fecha_hora_estado', table_name='Reservas')
+    op.drop_column('Reservas', 'Recordatorio2hEnviadoEn')
+    op.drop_column('Reservas', 'Recordatorio24hEnviadoEn')
@@ -0,0 +1,32 @@
+"""Crear tabla de lease del planificador de tareas
+
+Revision ID: crear_tabla_bloqueos_planificador
+Revises: agregar_reclamo_notificaciones
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'crear_tabla_bloqueos_planificador'
+down_revision = 'agregar_reclamo_notificaciones'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # La tabla apscheduler_jobs la crea APScheduler al iniciar el job store
+    op.create_table('BloqueosPlanificador',
+    sa.Column('Id', sa.Integer(), nullable=False),
+    sa.Column('Nombre', sa.String(length=50), nullable=False),
+    sa.Column('Propietario', sa.String(length=100), nullable=True),
+    sa.Column('ExpiraEn', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('Id'),
+    sa.UniqueConstraint('Nombre')
+    )
+
+
+def downgrade():
+    op.drop_table('BloqueosPlanificador')
@@ -0,0 +1,32 @@
+"""Crear tabla de bloqueos de reserva por cancha y fecha
+
+Revision ID: crear_tabla_bloqueos_reserva
+Revises: crear_tabla_notificaciones
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'crear_tabla_bloqueos_reserva'
+down_revision = 'crear_tabla_notificaciones'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('BloqueosReserva',
+    sa.Column('Id', sa.Integer(), nullable=False),
+    sa.Column('CanchaId', sa.Integer(), nullable=False),
+    sa.Column('Fecha', sa.Date(), nullable=False),
+    sa.Column('Version', sa.Integer(), nullable=False, server_default='0'),
+    sa.ForeignKeyConstraint(['CanchaId'], ['Canchas.Id'], ),
+    sa.PrimaryKeyConstraint('Id'),
+    sa.UniqueConstraint('CanchaId', 'Fecha', name='unique_bloqueo_cancha_fecha')
+    )
+
+
+def downgrade():
+    op.drop_table('BloqueosReserva')
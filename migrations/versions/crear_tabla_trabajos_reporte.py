@@ -0,0 +1,45 @@
+"""Crear tabla de trabajos de generación de reportes
+
+Revision ID: crear_tabla_trabajos_reporte
+Revises: agregar_indices_tablas_frecuentes
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'crear_tabla_trabajos_reporte'
+down_revision = 'agregar_indices_tablas_frecuentes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('TrabajosReporte',
+    sa.Column('Id', sa.Integer(), nullable=False),
+    sa.Column('Clave', sa.String(length=64), nullable=False),
+    sa.Column('Tipo', sa.String(length=50), nullable=False),
+    sa.Column('Parametros', sa.JSON(), nullable=True),
+    sa.Column('Estado', sa.String(length=20), nullable=False),
+    sa.Column('Archivo', sa.String(length=255), nullable=True),
+    sa.Column('NombreDescarga', sa.String(length=255), nullable=True),
+    sa.Column('Error', sa.Text(), nullable=True),
+    sa.Column('SolicitadoPor', sa.Integer(), nullable=True),
+    sa.Column('FechaCreacion', sa.DateTime(), nullable=True),
+    sa.Column('FechaReclamo', sa.DateTime(), nullable=True),
+    sa.Column('FechaFin', sa.DateTime(), nullable=True),
+    sa.Column('ExpiraEn', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['SolicitadoPor'], ['Usuarios.Id'], ),
+    sa.PrimaryKeyConstraint('Id'),
+    sa.UniqueConstraint('Clave')
+    )
+    op.create_index('idx_trabajos_reporte_estado_id', 'TrabajosReporte', ['Estado', 'Id'], unique=False)
+    op.create_index('idx_trabajos_reporte_expira', 'TrabajosReporte', ['ExpiraEn'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_trabajos_reporte_expira', table_name='TrabajosReporte')
+    op.drop_index('idx_trabajos_reporte_estado_id', table_name='TrabajosReporte')
+    op.drop_table('TrabajosReporte')
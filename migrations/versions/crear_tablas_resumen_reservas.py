@@ -0,0 +1,57 @@
+"""Crear tablas de resumen diario y por hora de reservas
+
+Revision ID: crear_tablas_resumen_reservas
+Revises: agregar_recordatorios_enviados
+Create Date: 2026-10-18 16:00:00.000000
+
+Después de aplicar la migración hay que poblar el histórico con
+``python reconstruir_resumenes.py``.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'crear_tablas_resumen_reservas'
+down_revision = 'agregar_recordatorios_enviados'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ResumenReservasDiario',
+    sa.Column('Id', sa.Integer(), nullable=False),
+    sa.Column('CanchaId', sa.Integer(), nullable=False),
+    sa.Column('Fecha', sa.Date(), nullable=False),
+    sa.Column('Reservas', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('Canceladas', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('Creadas', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('HorasReservadas', sa.Numeric(12, 2), nullable=False, server_default='0'),
+    sa.Column('Ingresos', sa.Numeric(14, 2), nullable=False, server_default='0'),
+    sa.ForeignKeyConstraint(['CanchaId'], ['Canchas.Id'], ),
+    sa.PrimaryKeyConstraint('Id'),
+    sa.UniqueConstraint('CanchaId', 'Fecha', name='unique_resumen_diario_cancha_fecha')
+    )
+    op.create_index('idx_resumen_diario_fecha', 'ResumenReservasDiario', ['Fecha'])
+
+    op.create_table('ResumenReservasHorario',
+    sa.Column('Id', sa.Integer(), nullable=False),
+    sa.Column('CanchaId', sa.Integer(), nullable=False),
+    sa.Column('Fecha', sa.Date(), nullable=False),
+    sa.Column('Hora', sa.Integer(), nullable=False),
+    sa.Column('Reservas', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('Canceladas', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('HorasReservadas', sa.Numeric(12, 2), nullable=False, server_default='0'),
+    sa.Column('Ingresos', sa.Numeric(14, 2), nullable=False, server_default='0'),
+    sa.ForeignKeyConstraint(['CanchaId'], ['Canchas.Id'], ),
+    sa.PrimaryKeyConstraint('Id'),
+    sa.UniqueConstraint('CanchaId', 'Fecha', 'Hora', name='unique_resumen_horario_cancha_fecha_hora')
+    )
+    op.create_index('idx_resumen_horario_fecha', 'ResumenReservasHorario', ['Fecha'])
+
+
+def downgrade():
+    op.drop_index('idx_resumen_horario_fecha', table_name='ResumenReservasHorario')
+    op.drop_table('ResumenReservasHorario')
+    op.drop_index('idx_resumen_diario_fecha', table_name='ResumenReservasDiario')
+    op.drop_table('ResumenReservasDiario')
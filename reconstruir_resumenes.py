@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir los resúmenes de reservas (ResumenReservasDiario y ResumenReservasHorario)
+
+Las estadísticas de administración se leen de estas tablas, que se actualizan al
+crear, confirmar o cancelar cada reserva. Este script las recalcula desde la
+tabla de Reservas: después de la migración que las crea, tras cargar reservas
+por fuera de la aplicación o si se sospecha que quedaron desfasadas.
+
+Uso: python reconstruir_resumenes.py [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD]
+"""
+
+import argparse
+import time
+from datetime import date
+
+from app import create_app
+from app.services.resumen_service import resumen_service
+
+def reconstruir_resumenes():
+    parser = argparse.ArgumentParser(description='Reconstruye los resúmenes de reservas')
+    parser.add_argument('--desde', type=date.fromisoformat, help='Primer día a reconstruir (por defecto, todo el histórico)')
+    parser.add_argument('--hasta', type=date.fromisoformat, help='Último día a reconstruir')
+    args = parser.parse_args()
+
+    print("📊 RECONSTRUCCIÓN DE RESÚMENES DE RESERVAS")
+    print("=" * 60)
+
+    app = create_app()
+    with app.app_context():
+        inicio = time.perf_counter()
+        filas = resumen_service.reconstruir(args.desde, args.hasta)
+        print(f"✅ {filas} filas diarias reconstruidas en {time.perf_counter() - inicio:.1f}s")
+
+if __name__ == "__main__":
+    reconstruir_resumenes()
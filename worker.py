@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Proceso worker: workers de notificaciones y planificador de tareas
+
+Con PROCESO_MODO=web los procesos web no inician hilos ni tocan la base de datos
+al arrancar; las notificaciones quedan 'pendiente' y este proceso las envía, y
+también compite por el lease del planificador (recordatorios, limpieza, reportes).
+Levantar dos copias no duplica envíos: los lotes se reclaman y el lease es único.
+
+Uso: python worker.py
+"""
+
+import os
+import signal
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+os.environ['PROCESO_MODO'] = 'worker'
+
+from app import create_app
+from config import config
+from app.services.planificador_service import planificador_service
+from app.services.servicios_background import servicios_background
+
+
+def main():
+    app = create_app(config.get(os.getenv('FLASK_ENV', 'development'), config['default']))
+    servicios_background.iniciar()
+
+    detener = threading.Event()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(senal, lambda *_: detener.set())
+
+    print(f"⚙️  Worker en ejecución ({planificador_service.propietario}). Ctrl+C para detener")
+    while not detener.wait(60):
+        estado = planificador_service.estado()
+        app.logger.info(f"Worker: lider={estado['lider']} tareas={len(planificador_service.obtener_tareas())}")
+
+    servicios_background.detener()
+    print("🛑 Worker detenido")
+
+
+if __name__ == '__main__':
+    main()